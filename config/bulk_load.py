@@ -0,0 +1,40 @@
+"""
+Utilidades para cargas masivas con ids y fechas explícitos, compartidas por
+scripts/import_postgresql_data.py y manage.py seed_large_dataset.
+"""
+
+from contextlib import contextmanager
+
+
+def copy_value(value):
+    """Formatear un valor para COPY en formato texto"""
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if not isinstance(value, str):
+        return str(value)
+    return (
+        value
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+@contextmanager
+def keep_timestamps(model):
+    """Desactivar auto_now/auto_now_add para conservar las fechas de las filas"""
+    changed = []
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            changed.append((field, field.auto_now, field.auto_now_add))
+            field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in changed:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
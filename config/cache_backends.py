@@ -0,0 +1,59 @@
+"""
+Backends de caché de Django instrumentados: cuentan aciertos y fallos de
+lectura en config.metrics (cache_requests_total) y registran un span por
+operación cuando la petición se está trazando (config.tracing).
+
+Se usan en CACHES['default']['BACKEND'] en lugar de los de Django.
+"""
+
+from django.core.cache.backends import locmem, redis
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from config.metrics import registry
+from config.tracing import SPAN_KIND_CLIENT, span
+
+_MISSING = object()
+
+
+class MetricsCacheMixin:
+    def _record(self, hits, misses):
+        backend = type(self).__name__
+        if hits:
+            registry.inc('cache_requests_total', {'backend': backend, 'result': 'hit'}, hits)
+        if misses:
+            registry.inc('cache_requests_total', {'backend': backend, 'result': 'miss'}, misses)
+
+    def get(self, key, default=None, version=None):
+        with span('cache.get', SPAN_KIND_CLIENT, **{'cache.key': key}) as current:
+            value = super().get(key, _MISSING, version)
+            hit = value is not _MISSING
+            if current:
+                current.set_attribute('cache.hit', hit)
+        if not hit:
+            self._record(0, 1)
+            return default
+        self._record(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with span('cache.get_many', SPAN_KIND_CLIENT, **{'cache.keys': len(keys)}):
+            values = super().get_many(keys, version)
+        self._record(len(values), len(keys) - len(values))
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with span('cache.set', SPAN_KIND_CLIENT, **{'cache.key': key}):
+            return super().set(key, value, timeout, version)
+
+    def delete(self, key, version=None):
+        with span('cache.delete', SPAN_KIND_CLIENT, **{'cache.key': key}):
+            return super().delete(key, version)
+
+
+class LocMemCache(MetricsCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class RedisCache(MetricsCacheMixin, redis.RedisCache):
+    pass
@@ -0,0 +1,93 @@
+"""
+Expresiones cron de cinco campos (minuto hora día-del-mes mes día-de-la-semana)
+para los procesos programados de manage.py.
+
+Cada campo admite *, valores, rangos a-b, listas separadas por comas y pasos
+(*/n, a-b/n). El día de la semana va de 0 a 6 empezando en domingo (7 también
+es domingo). Como en cron, si se restringen a la vez el día del mes y el de la
+semana basta con que coincida uno de los dos.
+"""
+
+from datetime import timedelta
+
+_FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 7),
+)
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        expr, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if expr == '*':
+            start, end = low, high
+        elif '-' in expr:
+            start, end = (int(value) for value in expr.split('-', 1))
+        else:
+            start = end = int(expr)
+            if step != 1:
+                end = high
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(f'Fuera de rango ({low}-{high}): {part}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSpec:
+    """Expresión cron con el cálculo de la siguiente ejecución"""
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != len(_FIELDS):
+            raise ValueError(f'Se esperaban 5 campos en la expresión cron: {expression!r}')
+        self.expression = expression
+        try:
+            fields = {
+                name: _parse_field(text, low, high)
+                for text, (name, low, high) in zip(parts, _FIELDS)
+            }
+        except ValueError as e:
+            raise ValueError(f'Expresión cron no válida {expression!r}: {e}') from None
+        self.minutes = fields['minute']
+        self.hours = fields['hour']
+        self.days = fields['day']
+        self.months = fields['month']
+        self.weekdays = {day % 7 for day in fields['weekday']}
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    def __str__(self):
+        return self.expression
+
+    def _day_matches(self, moment):
+        # isoweekday: lunes=1 ... domingo=7 -> domingo=0
+        day_ok = moment.day in self.days
+        weekday_ok = moment.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """Primer minuto posterior a moment (datetime) que cumple la expresión"""
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Cinco años bastan para cualquier expresión que pueda cumplirse (29 de febrero)
+        limit = moment + timedelta(days=5 * 366)
+        while moment < limit:
+            if moment.month not in self.months:
+                month = moment.month % 12 + 1
+                year = moment.year + (month == 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f'La expresión cron {self.expression!r} nunca se cumple')
@@ -0,0 +1 @@
+# Backends de base de datos propios del proyecto
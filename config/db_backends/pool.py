@@ -0,0 +1,239 @@
+"""
+Pool de conexiones en proceso para workers con hilos (gthread) o asíncronos.
+
+Cada proceso mantiene un pool por alias de base de datos. Las conexiones se
+reutilizan entre peticiones, se validan con SELECT 1 si llevan tiempo sin usarse
+y se cierran cuando superan el tiempo máximo de inactividad por encima del
+tamaño mínimo.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """No se obtuvo una conexión del pool dentro del tiempo de espera"""
+
+
+class ConnectionPool:
+    """Pool de conexiones DB-API thread-safe con tamaño mínimo y máximo"""
+
+    def __init__(self, min_size=1, max_size=10, max_idle=300, timeout=10,
+                 health_check_after=30):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError('Se requiere 0 <= min_size <= max_size y max_size >= 1')
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+
+        self._idle = deque()  # (conexión, instante en que se liberó)
+        self._in_use = 0
+        self._waiting = 0
+        self._lock = threading.Condition()
+
+        # Métricas acumuladas
+        self.created = 0
+        self.closed = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.health_check_failures = 0
+        self.wait_time = 0.0
+
+    @property
+    def size(self):
+        return len(self._idle) + self._in_use
+
+    def acquire(self, factory):
+        """
+        Obtener una conexión libre o, si el pool no ha llegado al máximo, crear
+        una nueva llamando a factory()
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._lock:
+            self._waiting += 1
+            try:
+                while True:
+                    self._evict_idle()
+                    if self._idle:
+                        connection, released_at = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self.size < self.max_size:
+                        connection, released_at = None, None
+                        self._in_use += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f'Pool agotado: {self.max_size} conexiones en uso'
+                        )
+                    self._lock.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+        # Crear o validar la conexión fuera del lock
+        try:
+            if connection is None:
+                connection = self._create(factory)
+            elif time.monotonic() - released_at > self.health_check_after:
+                if not self._is_usable(connection):
+                    with self._lock:
+                        self.health_check_failures += 1
+                    self._discard(connection)
+                    connection = self._create(factory)
+        except BaseException:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self.acquired += 1
+            self.wait_time += time.monotonic() - start
+        return connection
+
+    def release(self, connection):
+        """Devolver una conexión al pool, descartándola si quedó inservible"""
+        reusable = self._reset(connection)
+        with self._lock:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((connection, time.monotonic()))
+            self._lock.notify()
+        if not reusable:
+            self._discard(connection)
+
+    def discard(self, connection):
+        """Cerrar una conexión prestada sin devolverla al pool"""
+        with self._lock:
+            self._in_use -= 1
+            self._lock.notify()
+        self._discard(connection)
+
+    def close_all(self):
+        """Cerrar las conexiones libres del pool"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'created': self.created,
+                'closed': self.closed,
+                'acquired': self.acquired,
+                'timeouts': self.timeouts,
+                'health_check_failures': self.health_check_failures,
+                'wait_time_seconds': round(self.wait_time, 6),
+            }
+
+    def _create(self, factory):
+        connection = factory()
+        with self._lock:
+            self.created += 1
+        return connection
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self.closed += 1
+
+    def _evict_idle(self):
+        """Cerrar conexiones inactivas más allá del tamaño mínimo (con el lock tomado)"""
+        if not self.max_idle:
+            return
+        now = time.monotonic()
+        # Las más antiguas están al principio de la cola
+        while self._idle and self.size > self.min_size:
+            connection, released_at = self._idle[0]
+            if now - released_at <= self.max_idle:
+                break
+            self._idle.popleft()
+            self.closed += 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    @staticmethod
+    def _reset(connection):
+        """Dejar la conexión sin transacción abierta. Devuelve False si no es reutilizable"""
+        if getattr(connection, 'closed', False):
+            return False
+        try:
+            import psycopg2.extensions as ext
+        except ImportError:
+            ext = None
+        try:
+            if ext is not None and hasattr(connection, 'get_transaction_status'):
+                status = connection.get_transaction_status()
+                if status == ext.TRANSACTION_STATUS_UNKNOWN:
+                    return False
+                if status != ext.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            else:
+                connection.rollback()
+        except Exception:
+            return False
+        return True
+
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, **options):
+    """Pool del proceso actual para el alias indicado (se recrea tras un fork)"""
+    global _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Las conexiones heredadas del proceso padre no se pueden reutilizar
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(**options)
+        return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values()) if _pools_pid == os.getpid() else []
+    for pool in pools:
+        pool.close_all()
+
+
+def get_pool_stats():
+    """Métricas de todos los pools del proceso actual, por alias"""
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            return {}
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
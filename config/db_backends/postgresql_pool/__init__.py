@@ -0,0 +1 @@
+# Backend PostgreSQL con pool de conexiones en proceso
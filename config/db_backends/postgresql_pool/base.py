@@ -0,0 +1,53 @@
+"""
+Backend PostgreSQL que toma las conexiones de un pool en proceso.
+
+Configuración en DATABASES:
+
+    'ENGINE': 'config.db_backends.postgresql_pool',
+    'CONN_MAX_AGE': 0,  # Django devuelve la conexión al pool al final de cada petición
+    'POOL': {
+        'MIN_SIZE': 2,
+        'MAX_SIZE': 8,
+        'MAX_IDLE': 300,            # segundos antes de cerrar una conexión libre
+        'TIMEOUT': 10,              # segundos de espera si el pool está agotado
+        'HEALTH_CHECK_AFTER': 30,   # validar con SELECT 1 si estuvo libre más tiempo
+    },
+"""
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from config.db_backends.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self):
+        options = self.settings_dict.get('POOL', {})
+        return get_pool(
+            self.alias,
+            min_size=options.get('MIN_SIZE', 1),
+            max_size=options.get('MAX_SIZE', 10),
+            max_idle=options.get('MAX_IDLE', 300),
+            timeout=options.get('TIMEOUT', 10),
+            health_check_after=options.get('HEALTH_CHECK_AFTER', 30),
+        )
+
+    def get_new_connection(self, conn_params):
+        # Las conexiones reutilizadas conservan el nivel de aislamiento con el
+        # que se crearon; el wrapper necesita conocerlo igualmente.
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        parent = super()
+        return self.get_pool().acquire(lambda: parent.get_new_connection(conn_params))
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                if self.in_atomic_block:
+                    # El wrapper conserva la referencia hasta el rollback del
+                    # bloque atómico, así que no puede pasar a otro hilo.
+                    self.get_pool().discard(self.connection)
+                else:
+                    self.get_pool().release(self.connection)
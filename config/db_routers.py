@@ -0,0 +1,103 @@
+"""
+Router de base de datos para enviar lecturas de reportes y listados a réplicas.
+
+Las lecturas solo van a una réplica cuando ReplicaRoutingMiddleware lo habilita
+para la petición en curso (GET en REPLICA_ROUTED_PATHS y sin escrituras recientes
+del mismo cliente). Todo lo demás (escrituras, transacciones, comandos de
+management) usa la base de datos principal.
+"""
+
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+# Retraso medido por réplica: alias -> (instante de la medición, segundos)
+_replica_lag = {}
+
+
+def get_replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def use_replica(enabled):
+    """Habilitar o deshabilitar las lecturas en réplica para el contexto actual"""
+    return _use_replica.set(enabled)
+
+
+def reset_replica(token):
+    _use_replica.reset(token)
+
+
+def pin_to_primary():
+    """Forzar que el resto del contexto actual lea de la base de datos principal"""
+    _use_replica.set(False)
+
+
+def replica_lag_seconds(alias):
+    """
+    Retraso de replicación de una réplica PostgreSQL, cacheado unos segundos.
+    Devuelve 0 para motores sin replicación (p. ej. SQLite en local) y None si
+    la réplica no responde.
+    """
+    interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+    checked_at, lag = _replica_lag.get(alias, (0, None))
+    if time.monotonic() - checked_at < interval:
+        return lag
+
+    connection = connections[alias]
+    lag = 0
+    if connection.vendor == 'postgresql':
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT CASE WHEN pg_is_in_recovery() '
+                    'THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) '
+                    'ELSE 0 END'
+                )
+                lag = float(cursor.fetchone()[0])
+        except Exception:
+            lag = None
+    _replica_lag[alias] = (time.monotonic(), lag)
+    return lag
+
+
+def available_replicas():
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 10)
+    replicas = []
+    for alias in get_replica_aliases():
+        lag = replica_lag_seconds(alias)
+        if lag is not None and lag <= max_lag:
+            replicas.append(alias)
+    return replicas
+
+
+class ReplicaRouter:
+    """Router principal/réplicas con lecturas en réplica solo bajo demanda"""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get():
+            return DEFAULT_DB_ALIAS
+        # Dentro de una transacción se lee de la principal para ver sus propios cambios
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = available_replicas()
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Tras una escritura, las lecturas siguientes de la petición van a la principal
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Principal y réplicas contienen los mismos datos
+        return True
+
+    # Sin allow_migrate: en local se pueden migrar dos SQLite con
+    # `migrate --database replica_1`; en PostgreSQL las réplicas son de solo lectura.
@@ -0,0 +1,242 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus.
+
+Cada proceso acumula contadores e histogramas en memoria. Con METRICS_DIR
+definido (gunicorn con varios workers), cada proceso vuelca periódicamente su
+estado a un fichero JSON propio en ese directorio y /metrics suma los ficheros
+de todos los procesos, sin depender de ningún servicio externo. Cuando un
+worker termina, el master suma su fichero a metrics_retired.json y lo borra:
+los contadores no retroceden y el directorio no crece con cada reciclado.
+"""
+
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# nombre -> (tipo, ayuda, buckets)
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Peticiones HTTP por vista, acción, método y estado', None),
+    'http_request_duration_seconds': (
+        'histogram', 'Latencia de las peticiones HTTP', LATENCY_BUCKETS),
+    'http_response_size_bytes': (
+        'histogram', 'Tamaño del cuerpo de las respuestas', SIZE_BUCKETS),
+    'db_queries_total': (
+        'counter', 'Consultas SQL ejecutadas por vista y acción', None),
+    'db_query_duration_seconds_total': (
+        'counter', 'Tiempo total en consultas SQL por vista y acción', None),
+    'db_queries_per_request': (
+        'histogram', 'Consultas SQL por petición', QUERY_COUNT_BUCKETS),
+    'db_slow_queries_total': (
+        'counter', 'Consultas por encima de SLOW_QUERY_THRESHOLD_MS por vista y acción', None),
+    'db_repeated_queries_total': (
+        'counter', 'Consultas repetidas (posibles N+1) por vista y acción', None),
+    'cache_requests_total': (
+        'counter', 'Lecturas de caché por backend y resultado (hit/miss)', None),
+    'report_cache_requests_total': (
+        'counter', 'Peticiones a gráficos y reportes por reporte y resultado de la caché (hit/miss/stale/coalesced)', None),
+}
+
+
+class Registry:
+    """Contadores e histogramas de un proceso"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.values = {}
+        self.last_flush = 0.0
+        self.dirty = False
+        self.flusher_pid = None
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+            self.dirty = True
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            # [conteo por bucket..., +Inf, suma]
+            data = self.values.get(key)
+            if data is None:
+                data = self.values[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += 1
+            data[-1] += value
+            self.dirty = True
+
+    def snapshot(self):
+        with self.lock:
+            self.dirty = False
+            return [
+                [name, list(labels), list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self.values.items()
+            ]
+
+
+registry = Registry()
+
+# Suma de los workers que ya terminaron
+RETIRED_FILE = 'metrics_retired.json'
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', '') or ''
+
+
+def _start_flusher(interval):
+    """
+    Hilo que vuelca los cambios pendientes aunque el worker no reciba más
+    peticiones; uno por proceso (los hilos no sobreviven al fork).
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            if registry.dirty:
+                flush(force=True)
+
+    registry.flusher_pid = os.getpid()
+    threading.Thread(target=run, name='metrics-flusher', daemon=True).start()
+
+
+def flush(force=False):
+    """Volcar el estado del proceso a METRICS_DIR, como mucho cada METRICS_FLUSH_INTERVAL"""
+    directory = metrics_dir()
+    if not directory:
+        return
+    interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1)
+    if registry.flusher_pid != os.getpid():
+        with registry.lock:
+            if registry.flusher_pid != os.getpid():
+                _start_flusher(interval)
+    now = time.monotonic()
+    if not force and now - registry.last_flush < interval:
+        return
+    registry.last_flush = now
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(registry.snapshot(), f)
+    # rename es atómico: un lector nunca ve un fichero a medias
+    os.replace(tmp_path, path)
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _sum_snapshots(snapshots):
+    totals = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            if isinstance(value, list):
+                current = totals.setdefault(key, [0] * len(value))
+                for i, item in enumerate(value):
+                    current[i] += item
+            else:
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def retire(pid, directory=None):
+    """
+    Sumar el fichero de un worker que ya terminó a RETIRED_FILE y borrarlo.
+    Lo llama el master de gunicorn (child_exit), un solo proceso.
+    """
+    directory = directory or metrics_dir()
+    path = os.path.join(directory, f'metrics_{pid}.json')
+    snapshot = _read_json(path)
+    if snapshot is None:
+        return
+    retired_path = os.path.join(directory, RETIRED_FILE)
+    retired = _read_json(retired_path, {'pids': [], 'values': []})
+    totals = _sum_snapshots([retired['values'], snapshot])
+    # Mientras el fichero del worker exista, collect() lo ignora si su pid ya
+    # está sumado aquí; se guardan solo los pids cuyos ficheros quedan.
+    pids = [
+        p for p in retired['pids']
+        if os.path.exists(os.path.join(directory, f'metrics_{p}.json'))
+    ] + [pid]
+    tmp_path = f'{retired_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'pids': pids,
+            'values': [[name, list(labels), value] for (name, labels), value in totals.items()],
+        }, f)
+    os.replace(tmp_path, retired_path)
+    os.remove(path)
+
+
+def collect():
+    """Sumar las métricas de todos los procesos"""
+    directory = metrics_dir()
+    if not directory:
+        return _sum_snapshots([registry.snapshot()])
+
+    flush(force=True)
+    retired = _read_json(os.path.join(directory, RETIRED_FILE), {'pids': [], 'values': []})
+    snapshots = [retired['values']]
+    merged = {f'metrics_{pid}.json' for pid in retired['pids']}
+    for name in os.listdir(directory):
+        if not (name.startswith('metrics_') and name.endswith('.json')):
+            continue
+        if name == RETIRED_FILE or name in merged:
+            continue
+        snapshot = _read_json(os.path.join(directory, name))
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    return _sum_snapshots(snapshots)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def render():
+    """Métricas agregadas en formato de texto de Prometheus (versión 0.0.4)"""
+    totals = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in totals.items() if metric == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind == 'histogram':
+                for bound, count in zip(buckets, value):
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {count}')
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {value[-2]}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value[-2]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value[-1]}')
+            else:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,126 @@
+"""
+Middlewares propios del proyecto.
+"""
+
+import hashlib
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from config import metrics
+from config.db_routers import get_replica_aliases, reset_replica, use_replica
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def client_key(request):
+    """Identificador estable del cliente: token de la API, sesión o IP"""
+    credential = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return hashlib.sha256(credential.encode()).hexdigest()[:32]
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Habilita las lecturas en réplica para peticiones de solo lectura a reportes,
+    gráficos y listados. Un cliente que acaba de escribir lee de la principal
+    durante REPLICA_STICKY_SECONDS para ver sus propios cambios.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = bool(get_replica_aliases())
+        self.routed_paths = tuple(getattr(settings, 'REPLICA_ROUTED_PATHS', ()))
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        sticky_key = f'db_sticky:{client_key(request)}'
+        is_read = request.method in SAFE_METHODS
+        replica_allowed = (
+            is_read
+            and request.path.startswith(self.routed_paths)
+            and not cache.get(sticky_key)
+        )
+
+        token = use_replica(replica_allowed)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_replica(token)
+
+        if not is_read and response.status_code < 400:
+            cache.set(sticky_key, True, self.sticky_seconds)
+        return response
+
+
+def view_labels(request):
+    """Vista y acción DRF que atendieron la petición, para etiquetar métricas"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched', ''
+    func = match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    view = view_class.__name__ if view_class else getattr(func, '__name__', 'unknown')
+    actions = getattr(func, 'actions', None) or {}
+    return view, actions.get(request.method.lower(), '')
+
+
+class MetricsMiddleware:
+    """
+    Registra por vista y acción: peticiones, latencia, tamaño de la respuesta y
+    número y duración de las consultas SQL (con connection.execute_wrapper).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = {'count': 0, 'seconds': 0.0}
+
+        def record_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries['count'] += 1
+                queries['seconds'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record_query))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        view, action = view_labels(request)
+        labels = {'view': view, 'action': action}
+        metrics.registry.inc('http_requests_total', {
+            **labels, 'method': request.method, 'status': str(response.status_code),
+        })
+        metrics.registry.observe('http_request_duration_seconds', {**labels, 'method': request.method}, elapsed)
+        metrics.registry.observe('db_queries_per_request', labels, queries['count'])
+        if queries['count']:
+            metrics.registry.inc('db_queries_total', labels, queries['count'])
+            metrics.registry.inc('db_query_duration_seconds_total', labels, queries['seconds'])
+
+        if response.streaming:
+            size = response.get('Content-Length')
+        else:
+            size = len(response.content)
+        if size is not None:
+            metrics.registry.observe('http_response_size_bytes', labels, int(size))
+
+        metrics.flush()
+        return response
@@ -0,0 +1,121 @@
+"""
+Esquema OpenAPI precalculado.
+
+drf_yasg genera el esquema recorriendo todos los viewsets y serializers; con
+cache_timeout=0 lo hacía en cada visita a /api/docs/ o /api/redoc/. Ahora
+`manage.py generate_openapi_schema` lo genera una vez, al construir la imagen,
+y lo escribe en OPENAPI_SCHEMA_DIR como openapi-<versión>.json y .yaml.
+/api/schema.json y /api/schema.yaml sirven esos ficheros con ETag y
+Cache-Control, y las páginas de Swagger UI y ReDoc cargan el esquema de ahí.
+Si el fichero no existe (en desarrollo) se genera al pedirlo la primera vez y
+se guarda en memoria.
+
+drf_yasg solo se importa al generar el esquema o al pedir una página de la
+documentación, no al cargar el URLconf en cada worker.
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpRequest
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = 'v1'
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'yaml': 'application/yaml',
+}
+
+# formato -> (mtime del fichero o None, contenido, etag)
+_loaded = {}
+
+
+def schema_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Gestor de Proyectos API",
+        default_version=API_VERSION,
+        description="API REST para gestión de proyectos y tareas",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="contact@example.com"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+def generate():
+    """Esquema de todo el API (sin host: vale para cualquier dominio)"""
+    from drf_yasg.generators import OpenAPISchemaGenerator
+    from rest_framework.request import Request
+
+    class SchemaGenerator(OpenAPISchemaGenerator):
+        def determine_path_prefix(self, paths):
+            # basePath '/' y rutas completas (/api/...), como cuando /metrics
+            # contaba para el prefijo común: los operationId no cambian
+            return '/'
+
+    # Como una visita anónima a /api/docs/: los viewsets comprueban request.user
+    # y los filtros de django-filter necesitan la petición para documentarse
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    return SchemaGenerator(schema_info(), url='').get_schema(request=Request(http_request), public=True)
+
+
+def encode(schema, fmt):
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+
+    codec = OpenAPICodecJson if fmt == 'json' else OpenAPICodecYaml
+    return codec(validators=[]).encode(schema)
+
+
+def schema_path(fmt, directory=None):
+    directory = directory or getattr(settings, 'OPENAPI_SCHEMA_DIR', 'openapi')
+    return Path(directory) / f'openapi-{API_VERSION}.{fmt}'
+
+
+def write(directory=None):
+    """Generar el esquema y escribirlo en todos los formatos; devuelve las rutas"""
+    schema = generate()
+    paths = []
+    for fmt in CONTENT_TYPES:
+        path = schema_path(fmt, directory)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(f'{path}.tmp', 'wb') as f:
+            f.write(encode(schema, fmt))
+        os.replace(f'{path}.tmp', path)
+        paths.append(path)
+    return paths
+
+
+def load(fmt):
+    """(contenido, etag) del esquema; se vuelve a leer solo si cambia el fichero"""
+    path = schema_path(fmt)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    cached = _loaded.get(fmt)
+    if cached is None or cached[0] != mtime:
+        if mtime is None:
+            logger.warning('No existe %s; se genera el esquema en memoria (manage.py generate_openapi_schema)', path)
+            content = encode(generate(), fmt)
+        else:
+            content = path.read_bytes()
+        cached = _loaded[fmt] = (mtime, content, hashlib.sha256(content).hexdigest()[:16])
+    return cached[1], cached[2]
+
+
+def render_ui(request, ui):
+    """Página de Swagger UI ('swagger') o ReDoc ('redoc'); el esquema lo carga el navegador"""
+    from drf_yasg import openapi
+    from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+
+    renderer = SwaggerUIRenderer() if ui == 'swagger' else ReDocRenderer()
+    # Las plantillas solo usan el título y la versión
+    schema = openapi.Swagger(info=schema_info(), _prefix='/', paths=openapi.Paths({}))
+    return renderer.render(schema, renderer_context={'request': request})
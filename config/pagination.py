@@ -0,0 +1,158 @@
+"""
+Conteos estimados para paginar tablas muy grandes.
+
+En PostgreSQL COUNT(*) recorre todas las filas que cumplen la consulta. Por
+encima de PAGINATION_ESTIMATE_THRESHOLD filas el total se toma del
+planificador:
+
+- sin filtros, de las estadísticas de la tabla (pg_class.reltuples, que
+  mantienen ANALYZE y autovacuum), sumando las particiones si la tabla está
+  particionada;
+- con filtros, de las filas que estima EXPLAIN para la consulta.
+
+Por debajo del umbral se cuenta de verdad: el conteo es barato y la
+estimación se notaría inexacta. Con un total estimado las páginas no se
+limitan a él: cada página lee una fila de más para saber si hay siguiente, y
+la última devuelve el total exacto (lo que ya se ha visto).
+"""
+
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+
+def estimate_threshold():
+    return getattr(settings, 'PAGINATION_ESTIMATE_THRESHOLD', 100000)
+
+
+def table_estimate(model, using):
+    """Filas estimadas de la tabla de un modelo; None fuera de PostgreSQL o sin estadísticas"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        # reltuples es -1 si la tabla nunca se ha analizado (autovacuum lo hace
+        # tras unas decenas de cambios, así que cuenta como vacía salvo que no
+        # haya ninguna analizada); la tabla padre de una particionada no tiene
+        # filas propias
+        cursor.execute(
+            'SELECT sum(greatest(child.reltuples, 0)), bool_or(child.reltuples >= 0) '
+            'FROM pg_class parent '
+            'LEFT JOIN pg_inherits ON pg_inherits.inhparent = parent.oid '
+            "JOIN pg_class child ON child.oid = CASE WHEN parent.relkind = 'p' "
+            'THEN pg_inherits.inhrelid ELSE parent.oid END '
+            'WHERE parent.oid = to_regclass(%s)',
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        estimate, analyzed = cursor.fetchone()
+    if not analyzed:
+        return None
+    return int(estimate)
+
+
+def query_estimate(queryset):
+    """Filas que estima EXPLAIN para una consulta; None fuera de PostgreSQL"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    # El orden no cambia el número de filas y solo complica el plan
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def is_unfiltered(queryset):
+    query = queryset.query
+    return not query.where and not query.distinct and not query.combinator and not query.is_sliced
+
+
+def estimated_count(queryset):
+    """(conteo, exacto): estimado si el planificador calcula que supera el umbral"""
+    threshold = estimate_threshold()
+    if threshold and not queryset.query.is_sliced:
+        if is_unfiltered(queryset):
+            estimate = table_estimate(queryset.model, queryset.db)
+        else:
+            estimate = query_estimate(queryset)
+        if estimate is not None and estimate >= threshold:
+            return estimate, False
+    return queryset.count(), True
+
+
+class EstimatedPage(Page):
+    """Página de un total estimado: sabe si hay siguiente por la fila de más que leyó"""
+
+    def __init__(self, object_list, number, paginator, more):
+        super().__init__(object_list, number, paginator)
+        self.more = more
+
+    def has_next(self):
+        return self.more
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator que usa estimated_count; count_is_exact indica si el total es exacto"""
+
+    count_is_exact = True
+
+    @cached_property
+    def count(self):
+        count, self.count_is_exact = estimated_count(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Con un total estimado puede haber páginas más allá de num_pages
+            if self.count_is_exact or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_is_exact:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage('Esa página no contiene resultados')
+        seen = bottom + len(object_list)
+        more = len(object_list) > self.per_page
+        if not more:
+            # Última página: el total ya no es una estimación
+            self.count, self.count_is_exact = seen, True
+        elif seen > self.count:
+            # La estimación se quedó corta: el total pasa a ser lo ya visto
+            self.count = seen
+        self.__dict__.pop('num_pages', None)
+        return EstimatedPage(object_list[:self.per_page], number, self, more)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    PageNumberPagination con EstimatedCountPaginator: la respuesta añade
+    count_is_exact, que es false cuando count es una estimación.
+    """
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_exact'] = self.page.paginator.count_is_exact
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_exact'] = {
+            'type': 'boolean',
+            'example': True,
+        }
+        return response_schema
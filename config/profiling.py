@@ -0,0 +1,229 @@
+"""
+Perfilado bajo demanda de peticiones individuales.
+
+Un superusuario puede añadir ?_profile=1 (o la cabecera X-Profile: 1) a cualquier
+petición para ejecutarla bajo un perfilador:
+
+- sample (por defecto): un hilo muestrea la pila del hilo de la petición cada
+  PROFILE_SAMPLE_INTERVAL_MS y genera pilas colapsadas (.folded), el formato que
+  aceptan flamegraph.pl y speedscope;
+- cprofile: perfilador determinista de la biblioteca estándar (.prof, pstats).
+
+Junto al perfil se guarda una línea temporal de las consultas SQL (.json) en
+PROFILE_DIR. Con ?_profile=inline la respuesta es el propio informe en JSON en
+lugar de la respuesta de la vista. Sin el parámetro, el middleware solo
+comprueba su presencia. Tras guardar un perfil se borran los más antiguos
+para conservar como mucho PROFILE_RETENTION.
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from config.slow_queries import fingerprint, normalize_sql
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_MODES = ('sample', 'cprofile')
+
+
+def purge_profiles(profile_dir, keep):
+    """
+    Borrar los perfiles más antiguos (informe y fichero del perfil) para dejar
+    como mucho keep; devuelve cuántos se borraron. Los ids empiezan por la
+    fecha, así que el orden por nombre es el cronológico. Con keep=0 no se
+    borra nada.
+    """
+    if not keep:
+        return 0
+    try:
+        names = os.listdir(profile_dir)
+    except FileNotFoundError:
+        return 0
+    profile_ids = sorted(name[:-len('.json')] for name in names if name.endswith('.json'))
+    expired = profile_ids[:max(len(profile_ids) - keep, 0)]
+    for profile_id in expired:
+        for extension in ('.json', '.prof', '.folded'):
+            try:
+                os.remove(os.path.join(profile_dir, profile_id + extension))
+            except FileNotFoundError:
+                pass
+    return len(expired)
+
+
+def frame_label(code):
+    """Nombre de una función para el flamegraph: función (ruta:línea)"""
+    filename = code.co_filename
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        filename = filename.split(marker, 1)[1]
+    elif filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """Muestrea periódicamente la pila de un hilo y acumula pilas colapsadas"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class SQLTimeline:
+    """execute_wrapper que anota inicio, duración y huella de cada consulta"""
+
+    def __init__(self, start):
+        self.start = start
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ended = time.perf_counter()
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'start_ms': round((began - self.start) * 1000, 3),
+                'duration_ms': round((ended - began) * 1000, 3),
+                'fingerprint': fingerprint(sql),
+                'sql': normalize_sql(sql)[:2000],
+            })
+
+
+def requested_mode(request):
+    """Modo de perfilado pedido ('sample', 'cprofile') y si se devuelve inline"""
+    value = request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+    if not value or value in ('0', 'false'):
+        return None, False
+    if value in PROFILE_MODES:
+        return value, False
+    return 'sample', value == 'inline'
+
+
+def is_superuser(request):
+    """Superusuario por sesión o por token de la API (DRF autentica después, en la vista)"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_superuser
+    try:
+        result = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(result and result[0].is_superuser)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.profile_dir = settings.PROFILE_DIR
+        self.interval = getattr(settings, 'PROFILE_SAMPLE_INTERVAL_MS', 5) / 1000
+        self.retention = getattr(settings, 'PROFILE_RETENTION', 200)
+
+    def __call__(self, request):
+        if PROFILE_PARAM not in request.GET and PROFILE_HEADER not in request.META:
+            return self.get_response(request)
+        mode, inline = requested_mode(request)
+        if mode is None or not is_superuser(request):
+            return self.get_response(request)
+        return self.profile(request, mode, inline)
+
+    def profile(self, request, mode, inline):
+        profile_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base_path = os.path.join(self.profile_dir, profile_id)
+
+        start = time.perf_counter()
+        timeline = SQLTimeline(start)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timeline))
+            if mode == 'cprofile':
+                profiler = cProfile.Profile()
+                response = profiler.runcall(self.get_response, request)
+            else:
+                sampler = StackSampler(threading.get_ident(), self.interval)
+                sampler.start()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    sampler.stop()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if mode == 'cprofile':
+            profile_file = f'{base_path}.prof'
+            profiler.dump_stats(profile_file)
+        else:
+            profile_file = f'{base_path}.folded'
+            with open(profile_file, 'w', encoding='utf-8') as f:
+                f.write(sampler.folded())
+
+        report = {
+            'id': profile_id,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'mode': mode,
+            'duration_ms': round(elapsed_ms, 3),
+            'profile_file': os.path.basename(profile_file),
+            'samples': sampler.samples if mode == 'sample' else None,
+            'sample_interval_ms': self.interval * 1000 if mode == 'sample' else None,
+            'sql': {
+                'count': len(timeline.queries),
+                'duration_ms': round(sum(query['duration_ms'] for query in timeline.queries), 3),
+                'timeline': timeline.queries,
+            },
+        }
+        with open(f'{base_path}.json', 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        purge_profiles(self.profile_dir, self.retention)
+
+        if inline:
+            report['folded'] = sampler.folded()
+            return JsonResponse(report, json_dumps_params={'ensure_ascii': False})
+
+        response['X-Profile-Id'] = profile_id
+        response['X-Profile-Duration-Ms'] = f'{elapsed_ms:.1f}'
+        response['X-Profile-SQL-Queries'] = str(len(timeline.queries))
+        return response
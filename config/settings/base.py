@@ -26,12 +26,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.tracing.TracingMiddleware',
+    'config.middleware.MetricsMiddleware',
+    'config.slow_queries.SlowQueryMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.profiling.ProfilingMiddleware',
+    'config.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,6 +61,134 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Gestión de conexiones a la base de datos
+# Por defecto las conexiones son persistentes (CONN_MAX_AGE) con health checks,
+# evitando abrir una conexión nueva a PostgreSQL en cada petición. Con DB_POOL=True
+# se usa además un pool en proceso (config/db_backends/), útil con workers gthread.
+DATABASE_POOL_ENABLED = os.getenv('DB_POOL', 'False') == 'True'
+
+DATABASE_ENGINE = (
+    'config.db_backends.postgresql_pool' if DATABASE_POOL_ENABLED
+    else 'django.db.backends.postgresql'
+)
+
+DATABASE_CONNECTION_SETTINGS = {
+    # Con pool, Django devuelve la conexión al pool al terminar cada petición
+    'CONN_MAX_AGE': 0 if DATABASE_POOL_ENABLED else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+    'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+    'POOL': {
+        'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+        'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 8)),
+        'MAX_IDLE': int(os.getenv('DB_POOL_MAX_IDLE', 300)),
+        'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+    },
+}
+
+# Réplicas de lectura (ver config/db_routers.py)
+# DB_REPLICA_HOSTS=host1,host2 añade los alias replica_1, replica_2... con los
+# mismos credenciales que la principal. Las lecturas GET de estas rutas pueden ir
+# a una réplica; un cliente que escribe lee de la principal durante unos segundos.
+DATABASE_REPLICA_HOSTS = [host for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host]
+
+DATABASE_ROUTERS = ['config.db_routers.ReplicaRouter']
+
+REPLICA_ROUTED_PATHS = [
+    '/api/charts/',
+    '/api/tasks/',
+    '/api/projects/',
+    '/api/users/',
+]
+REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+REPLICA_MAX_LAG_SECONDS = int(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', 10))
+REPLICA_LAG_CHECK_INTERVAL = 5
+
+# Métricas por endpoint en /metrics (ver config/metrics.py)
+# Con varios workers de gunicorn, METRICS_DIR es el directorio donde cada proceso
+# vuelca sus métricas para agregarlas. /metrics requiere un usuario staff o la
+# cabecera "Authorization: Bearer <METRICS_TOKEN>" (para el scraper de Prometheus).
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+
+# Registro de consultas lentas y repetidas (ver config/slow_queries.py)
+SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', 'True') == 'True'
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+# Fracción de consultas lentas de las que se captura el plan con EXPLAIN ANALYZE
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.1))
+# Veces que se puede repetir una consulta en una petición antes de avisar de un N+1
+SLOW_QUERY_REPEAT_THRESHOLD = int(os.getenv('SLOW_QUERY_REPEAT_THRESHOLD', 10))
+
+# Perfilado bajo demanda para superusuarios con ?_profile=1 (ver config/profiling.py)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'True') == 'True'
+PROFILE_DIR = os.getenv('PROFILE_DIR', str(BASE_DIR / 'profiles'))
+PROFILE_SAMPLE_INTERVAL_MS = int(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5))
+# Perfiles que se conservan en PROFILE_DIR; al guardar uno se borran los más antiguos (0 = sin límite)
+PROFILE_RETENTION = int(os.getenv('PROFILE_RETENTION', 200))
+
+# Trazas de las peticiones en JSONL con forma OTLP (ver config/tracing.py)
+# Muestreo de cabecera: se traza una fracción TRACING_SAMPLE_RATE de las
+# peticiones, o lo que indique la cabecera traceparent de quien llama.
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'False') == 'True'
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 0.01))
+TRACING_FILE = os.getenv('TRACING_FILE', str(BASE_DIR / 'traces' / 'traces.jsonl'))
+TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'gestor-api')
+
+# Reportes en segundo plano (ver tasks/jobs.py y manage.py run_report_worker)
+# El directorio de resultados debe ser compartido entre la web y los workers.
+REPORT_JOBS_DIR = os.getenv('REPORT_JOBS_DIR', str(BASE_DIR / 'report_results'))
+REPORT_WORKER_CONCURRENCY = int(os.getenv('REPORT_WORKER_CONCURRENCY', 2))
+REPORT_JOB_TIMEOUT = int(os.getenv('REPORT_JOB_TIMEOUT', 600))
+REPORT_JOB_MAX_ATTEMPTS = int(os.getenv('REPORT_JOB_MAX_ATTEMPTS', 3))
+REPORT_JOB_RETENTION_HOURS = int(os.getenv('REPORT_JOB_RETENTION_HOURS', 24))
+
+# Caché de gráficos y reportes (ver tasks/report_cache.py); 0 la desactiva.
+# Pasado REPORT_CACHE_SOFT_TTL el resultado se sirve y se recalcula en segundo
+# plano (hasta REPORT_REVALIDATE_WORKERS hilos por proceso); solo pasado
+# REPORT_CACHE_TTL (TTL duro) la petición espera al cálculo.
+# manage.py warm_report_cache recalcula según REPORT_WARM_SCHEDULE (cron) las
+# REPORT_WARM_TOP_VARIANTS variantes más pedidas que caducan en menos de
+# REPORT_WARM_AHEAD segundos. Requiere una caché compartida (Redis).
+REPORT_CACHE_TTL = int(os.getenv('REPORT_CACHE_TTL', 300))
+REPORT_CACHE_SOFT_TTL = int(os.getenv('REPORT_CACHE_SOFT_TTL', 60))
+REPORT_REVALIDATE_WORKERS = int(os.getenv('REPORT_REVALIDATE_WORKERS', 2))
+REPORT_VARIANT_FLUSH_INTERVAL = int(os.getenv('REPORT_VARIANT_FLUSH_INTERVAL', 30))
+REPORT_WARM_SCHEDULE = os.getenv('REPORT_WARM_SCHEDULE', '* * * * *')
+REPORT_WARM_TOP_VARIANTS = int(os.getenv('REPORT_WARM_TOP_VARIANTS', 20))
+REPORT_WARM_WINDOW_HOURS = int(os.getenv('REPORT_WARM_WINDOW_HOURS', 24))
+REPORT_WARM_AHEAD = int(os.getenv('REPORT_WARM_AHEAD', 120))
+
+# Single-flight: una sola petición calcula cada variante que falta en caché; las
+# demás esperan hasta REPORT_SINGLE_FLIGHT_WAIT segundos y después la calculan
+# ('compute') o responden 503 ('unavailable').
+REPORT_SINGLE_FLIGHT_LEASE = int(os.getenv('REPORT_SINGLE_FLIGHT_LEASE', 120))
+REPORT_SINGLE_FLIGHT_WAIT = float(os.getenv('REPORT_SINGLE_FLIGHT_WAIT', 30))
+REPORT_SINGLE_FLIGHT_FALLBACK = os.getenv('REPORT_SINGLE_FLIGHT_FALLBACK', 'compute')
+
+# Historial de tareas: particiones mensuales en PostgreSQL y archivo de los
+# meses antiguos en NDJSON comprimido (manage.py archive_task_history)
+TASK_HISTORY_ARCHIVE_DIR = os.getenv('TASK_HISTORY_ARCHIVE_DIR', str(BASE_DIR / 'history_archive'))
+TASK_HISTORY_RETENTION_MONTHS = int(os.getenv('TASK_HISTORY_RETENTION_MONTHS', 12))
+TASK_HISTORY_PARTITIONS_AHEAD = int(os.getenv('TASK_HISTORY_PARTITIONS_AHEAD', 3))
+
+# Borrado de proyectos y tareas por lotes en la base de datos (ver tasks/deletion.py).
+# Los proyectos con más de PROJECT_DELETE_BACKGROUND_THRESHOLD tareas se ocultan
+# al momento y los borra run_report_worker.
+PROJECT_DELETE_BATCH_SIZE = int(os.getenv('PROJECT_DELETE_BATCH_SIZE', 1000))
+PROJECT_DELETE_BACKGROUND_THRESHOLD = int(os.getenv('PROJECT_DELETE_BACKGROUND_THRESHOLD', 5000))
+
+# Tareas vencidas: manage.py track_deadlines marca Task.is_overdue al vencer cada
+# tarea (ver tasks/deadlines.py). Carga las fechas límite de los próximos
+# DEADLINE_LOOKAHEAD segundos y recarga cada DEADLINE_RELOAD_INTERVAL segundos
+# (retraso máximo para las fechas límite creadas o cambiadas desde la última carga).
+DEADLINE_LOOKAHEAD = int(os.getenv('DEADLINE_LOOKAHEAD', 3600))
+DEADLINE_RELOAD_INTERVAL = int(os.getenv('DEADLINE_RELOAD_INTERVAL', 60))
+
+# Paginación de tablas grandes en la API y el admin (ver config/pagination.py): por
+# encima de PAGINATION_ESTIMATE_THRESHOLD filas el total sale del planificador de
+# PostgreSQL en lugar de un COUNT(*); 0 cuenta siempre.
+PAGINATION_ESTIMATE_THRESHOLD = int(os.getenv('PAGINATION_ESTIMATE_THRESHOLD', 100000))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -96,7 +229,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.tracing.TracedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.EstimatedCountPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -116,4 +253,15 @@ SWAGGER_SETTINGS = {
         }
     },
     'USE_SESSION_AUTH': True,
+    # Swagger UI y ReDoc cargan el esquema precalculado (ver config/openapi.py)
+    'SPEC_URL': ('openapi-schema', {'fmt': 'json'}),
 }
+
+REDOC_SETTINGS = {
+    'SPEC_URL': ('openapi-schema', {'fmt': 'json'}),
+}
+
+# Esquema OpenAPI precalculado por `manage.py generate_openapi_schema` (en el build
+# de la imagen) y segundos que pueden cachearlo navegadores y proxies
+OPENAPI_SCHEMA_DIR = os.getenv('OPENAPI_SCHEMA_DIR', str(BASE_DIR / 'openapi'))
+OPENAPI_SCHEMA_MAX_AGE = int(os.getenv('OPENAPI_SCHEMA_MAX_AGE', 3600))
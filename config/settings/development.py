@@ -16,15 +16,24 @@ ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0']
 # Database configuration - PostgreSQL
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': DATABASE_ENGINE,
         'NAME': os.getenv('DB_NAME', 'gestor_proyectos'),
         'USER': os.getenv('DB_USER', 'gestor_user'),
         'PASSWORD': os.getenv('DB_PASSWORD', 'gestor_password'),
         'HOST': os.getenv('DB_HOST', 'db'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        **DATABASE_CONNECTION_SETTINGS,
     }
 }
 
+# Read replicas (DB_REPLICA_HOSTS)
+for index, host in enumerate(DATABASE_REPLICA_HOSTS, start=1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
 # CORS Configuration for development
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -57,13 +66,19 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Cabeceras legibles desde el frontend (antigüedad de los gráficos en caché)
+CORS_EXPOSE_HEADERS = [
+    'age',
+    'x-cache',
+]
+
 # Email backend for development
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 # Cache configuration for development
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'config.cache_backends.LocMemCache',
     }
 }
 
@@ -29,7 +29,7 @@ CSRF_TRUSTED_ORIGINS = [
 # Database configuration - PostgreSQL
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': DATABASE_ENGINE,
         'NAME': os.getenv('DB_NAME', 'gestor_proyectos'),
         'USER': os.getenv('DB_USER', 'gestor_user'),
         'PASSWORD': os.getenv('DB_PASSWORD', 'gestor_password'),
@@ -38,9 +38,18 @@ DATABASES = {
         'OPTIONS': {
             'sslmode': 'disable',  # SSL disabled for internal container communication
         },
+        **DATABASE_CONNECTION_SETTINGS,
     }
 }
 
+# Read replicas (DB_REPLICA_HOSTS)
+for index, host in enumerate(DATABASE_REPLICA_HOSTS, start=1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
 # CORS Configuration for production
 CORS_ALLOWED_ORIGINS = [
     "https://gestorai.tecnolitas.com",
@@ -70,6 +79,12 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Cabeceras legibles desde el frontend (antigüedad de los gráficos en caché)
+CORS_EXPOSE_HEADERS = [
+    'age',
+    'x-cache',
+]
+
 # Email configuration for production
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
@@ -81,7 +96,7 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 # Cache configuration for production (Redis)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'config.cache_backends.RedisCache',
         'LOCATION': os.getenv('REDIS_URL', 'redis://redis:6379/1'),
     }
 }
@@ -119,6 +134,12 @@ LOGGING = {
             'filename': '/var/log/django/django.log',
             'formatter': 'verbose',
         },
+        'slow_queries_file': {
+            'level': 'WARNING',
+            'class': 'logging.FileHandler',
+            'filename': '/var/log/django/slow_queries.log',
+            'formatter': 'verbose',
+        },
         'console': {
             'level': 'ERROR',
             'class': 'logging.StreamHandler',
@@ -135,5 +156,10 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'slow_queries': {
+            'handlers': ['slow_queries_file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
@@ -0,0 +1,29 @@
+"""
+Test settings for the gestor de proyectos project.
+
+Dos SQLite locales, la principal y replica_1, para probar el enrutado a
+réplicas (config/db_routers.py) sin PostgreSQL:
+
+    python manage.py test --settings=config.settings.test
+"""
+
+from .development import *
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica_1.sqlite3',
+    },
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'root': {
+        'level': 'WARNING',
+    },
+}
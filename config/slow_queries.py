@@ -0,0 +1,189 @@
+"""
+Registro de consultas lentas y repetidas por petición.
+
+SlowQueryMiddleware instala un execute_wrapper en todas las conexiones durante
+la petición y:
+
+- registra en el logger 'slow_queries' las consultas que superan
+  SLOW_QUERY_THRESHOLD_MS, con la vista, la línea del código del proyecto que
+  la lanzó y la huella (fingerprint) del SQL normalizado;
+- para una fracción SLOW_QUERY_EXPLAIN_SAMPLE_RATE de ellas captura el plan con
+  EXPLAIN (ANALYZE, BUFFERS) en PostgreSQL (solo SELECT, ya que ANALYZE ejecuta
+  la consulta) o EXPLAIN QUERY PLAN en SQLite;
+- al terminar, agrupa las consultas por huella y avisa de las que se repiten al
+  menos SLOW_QUERY_REPEAT_THRESHOLD veces (patrones N+1).
+"""
+
+import hashlib
+import logging
+import os
+import random
+import re
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from config import metrics
+from config.middleware import view_labels
+
+logger = logging.getLogger('slow_queries')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+# Código propio: se ignoran los marcos de las dependencias y los del paquete
+# config (middlewares, instrumentación y backends de base de datos). Se excluye
+# el paquete entero y no fichero a fichero porque cada execute_wrapper nuevo
+# (SQLTimeline de config/profiling.py, tracing) queda en la pila de todas las
+# consultas y pasaba a ser su "origen".
+_PROJECT_DIR = str(settings.BASE_DIR)
+_IGNORED_PATHS = ('site-packages', 'dist-packages', os.path.join(_PROJECT_DIR, 'config', ''))
+_ORM_PATH = os.path.join('django', 'db', '')
+
+
+def normalize_sql(sql):
+    """SQL sin literales ni valores, con las listas IN colapsadas"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+def caller_location():
+    """
+    Primer marco del código del proyecto en la pila (archivo:línea función). Si
+    la consulta sale solo de dependencias (p. ej. un serializer de DRF que accede
+    a una relación), el marco más interno fuera del ORM: sin él, las consultas
+    lanzadas al serializar con DRF quedaban como 'desconocido' en el log.
+    """
+    fallback = None
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(_PROJECT_DIR) and not any(
+            path in frame.filename for path in _IGNORED_PATHS
+        ):
+            return f'{os.path.relpath(frame.filename, _PROJECT_DIR)}:{frame.lineno} {frame.name}'
+        if fallback is None and _ORM_PATH not in frame.filename and _IGNORED_PATHS[2] not in frame.filename:
+            fallback = frame
+    if fallback is None:
+        return 'desconocido'
+    return f'{fallback.filename.split("site-packages" + os.sep)[-1]}:{fallback.lineno} {fallback.name}'
+
+
+def explain(connection, sql, params):
+    """Plan de ejecución de una consulta, o None si no se puede obtener"""
+    if connection.vendor == 'postgresql':
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return None
+        explain_sql = f'EXPLAIN (ANALYZE, BUFFERS) {sql}'
+    elif connection.vendor == 'sqlite':
+        explain_sql = f'EXPLAIN QUERY PLAN {sql}'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(explain_sql, params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f'(no se pudo obtener el plan: {e})'
+
+
+class QueryLog:
+    """Consultas de una petición agrupadas por huella"""
+
+    def __init__(self, view):
+        self.view = view
+        self.fingerprints = {}
+        self.explaining = False
+        self.threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200) / 1000
+        self.sample_rate = getattr(settings, 'SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.1)
+        self.repeat_threshold = getattr(settings, 'SLOW_QUERY_REPEAT_THRESHOLD', 10)
+        # Solo se inspecciona la pila cuando la consulta empieza a repetirse,
+        # o en la primera si el umbral de repetición es 1
+        self.locate_at = min(2, max(1, self.repeat_threshold))
+
+    def __call__(self, execute, sql, params, many, context):
+        # Las consultas EXPLAIN también pasan por aquí
+        if self.explaining:
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - start
+
+        key = fingerprint(sql)
+        entry = self.fingerprints.setdefault(key, {'count': 0, 'seconds': 0.0, 'sql': sql})
+        entry['count'] += 1
+        entry['seconds'] += duration
+        if entry['count'] == self.locate_at:
+            entry['location'] = caller_location()
+
+        if duration >= self.threshold:
+            self.slow_query(key, sql, params, many, duration, context['connection'])
+        return result
+
+    def slow_query(self, key, sql, params, many, duration, connection):
+        plan = None
+        if not many and random.random() < self.sample_rate:
+            self.explaining = True
+            try:
+                plan = explain(connection, sql, params)
+            finally:
+                self.explaining = False
+
+        metrics.registry.inc('db_slow_queries_total', {'view': self.view[0], 'action': self.view[1]})
+        logger.warning(
+            'Consulta lenta %.1f ms [%s] en %s (%s) desde %s: %s%s',
+            duration * 1000, key, self.view[0], self.view[1] or '-', caller_location(),
+            normalize_sql(sql)[:2000],
+            f'\nPlan:\n{plan}' if plan else '',
+        )
+
+    def report_repeated(self):
+        """Avisar de las huellas repetidas en la petición (posibles N+1)"""
+        repeated = sorted(
+            ((key, entry) for key, entry in self.fingerprints.items() if entry['count'] >= self.repeat_threshold),
+            key=lambda item: item[1]['seconds'],
+            reverse=True,
+        )
+        for key, entry in repeated:
+            metrics.registry.inc(
+                'db_repeated_queries_total', {'view': self.view[0], 'action': self.view[1]}, entry['count']
+            )
+            logger.warning(
+                'Consulta repetida %d veces (%.1f ms en total) [%s] en %s (%s) desde %s, posible N+1: %s',
+                entry['count'], entry['seconds'] * 1000, key, self.view[0], self.view[1] or '-',
+                entry['location'], normalize_sql(entry['sql'])[:2000],
+            )
+        return repeated
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'SLOW_QUERY_LOG_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # La vista se conoce al resolver la URL; se completa en process_view
+        query_log = request._query_log = QueryLog(('unmatched', ''))
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_log))
+            response = self.get_response(request)
+        query_log.report_repeated()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_log.view = view_labels(request)
@@ -0,0 +1,317 @@
+"""
+Trazas ligeras de las peticiones, en formato compatible con OpenTelemetry.
+
+TracingMiddleware decide al principio de cada petición si se traza (muestreo de
+cabecera: TRACING_SAMPLE_RATE, o la decisión que venga en la cabecera W3C
+traceparent). Si no se traza, span() no hace nada. Si se traza, se registran:
+
+- la petición completa (span raíz, SERVER);
+- autenticación y permisos de DRF, la vista, get_object, la paginación (que es
+  donde se evalúan los querysets de los listados) y el serializer, con
+  TracedGenericViewMixin en los ViewSets de modelos (TracedViewMixin en los
+  demás);
+- cada consulta SQL (execute_wrapper) y cada operación de caché
+  (config.cache_backends);
+- el renderizado JSON (TracedJSONRenderer).
+
+Cada traza se añade como una línea a TRACING_FILE con la forma de OTLP/JSON
+(resourceSpans > scopeSpans > spans), la misma que escribe el file exporter del
+OpenTelemetry Collector.
+"""
+
+import contextvars
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.renderers import JSONRenderer
+
+from config.middleware import view_labels
+from config.slow_queries import normalize_sql
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def _new_id(length):
+    return f'{random.getrandbits(length * 4):0{length}x}'
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'start', 'end', 'attributes', 'status')
+
+    def __init__(self, trace, name, kind, parent_id, attributes):
+        self.trace = trace
+        self.span_id = _new_id(16)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes
+        self.status = STATUS_OK
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_otlp(self):
+        data = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end or time.time_ns()),
+            'attributes': [_attribute(key, value) for key, value in self.attributes.items()],
+            'status': {'code': self.status},
+        }
+        if self.parent_id:
+            data['parentSpanId'] = self.parent_id
+        return data
+
+
+class Trace:
+    def __init__(self, trace_id=None, parent_id=None):
+        self.trace_id = trace_id or _new_id(32)
+        self.parent_id = parent_id
+        self.spans = []
+
+    def to_otlp(self):
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [
+                    _attribute('service.name', getattr(settings, 'TRACING_SERVICE_NAME', 'gestor-api')),
+                    _attribute('process.pid', os.getpid()),
+                ]},
+                'scopeSpans': [{
+                    'scope': {'name': 'config.tracing'},
+                    'spans': [span.to_otlp() for span in self.spans],
+                }],
+            }],
+        }
+
+
+@contextmanager
+def span(name, kind=SPAN_KIND_INTERNAL, **attributes):
+    """Span hijo del actual; sin traza activa no hace nada y devuelve None"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(trace, name, kind, parent.span_id if parent else trace.parent_id, attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = STATUS_ERROR
+        current.attributes['exception.type'] = type(e).__name__
+        raise
+    finally:
+        current.end = time.time_ns()
+        _current_span.reset(token)
+
+
+def is_tracing():
+    return _current_trace.get() is not None
+
+
+class JSONLSink:
+    """Añade cada traza como una línea JSON; una sola escritura con O_APPEND por traza"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, trace):
+        line = (json.dumps(trace.to_otlp(), separators=(',', ':')) + '\n').encode()
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+
+def sql_span_wrapper(execute, sql, params, many, context):
+    """execute_wrapper: un span CLIENT por consulta SQL"""
+    connection = context['connection']
+    with span(
+        'db.query', SPAN_KIND_CLIENT,
+        **{'db.system': connection.vendor, 'db.name': connection.alias,
+           'db.statement': normalize_sql(sql)[:1000]},
+    ):
+        return execute(sql, params, many, context)
+
+
+def parse_traceparent(header):
+    """(trace_id, parent_span_id, sampled) de una cabecera W3C traceparent, o None"""
+    match = _TRACEPARENT.match(header.strip().lower()) if header else None
+    if not match:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class TracingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'TRACING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'TRACING_SAMPLE_RATE', 0.01)
+        self.sink = JSONLSink(settings.TRACING_FILE)
+
+    def __call__(self, request):
+        incoming = parse_traceparent(request.META.get('HTTP_TRACEPARENT'))
+        if incoming:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id, sampled = None, None, random.random() < self.sample_rate
+        if not sampled:
+            return self.get_response(request)
+
+        trace = Trace(trace_id, parent_id)
+        trace_token = _current_trace.set(trace)
+        try:
+            with span(f'{request.method} {request.path}', SPAN_KIND_SERVER, **{
+                'http.method': request.method,
+                'http.target': request.get_full_path()[:500],
+            }) as root:
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(sql_span_wrapper))
+                    response = self.get_response(request)
+                view, action = view_labels(request)
+                match = getattr(request, 'resolver_match', None)
+                if match is not None:
+                    route = '/' + match.route.lstrip('^').rstrip('$')
+                    root.name = f'{request.method} {route}'
+                    root.set_attribute('http.route', route)
+                root.set_attribute('code.namespace', view)
+                if action:
+                    root.set_attribute('code.function', action)
+                root.set_attribute('http.status_code', response.status_code)
+                if response.status_code >= 500:
+                    root.status = STATUS_ERROR
+            response['traceparent'] = f'00-{trace.trace_id}-{root.span_id}-01'
+            return response
+        finally:
+            _current_trace.reset(trace_token)
+            self.sink.write(trace)
+
+
+_traced_serializers = {}
+
+
+def traced_serializer_class(serializer_class):
+    """Subclase del serializer con un span alrededor de to_representation"""
+    traced = _traced_serializers.get(serializer_class)
+    if traced is None:
+        traced = type(serializer_class.__name__, (TracedSerializerMixin, serializer_class), {
+            '__module__': serializer_class.__module__,
+            '__qualname__': serializer_class.__qualname__,
+        })
+        _traced_serializers[serializer_class] = traced
+    return traced
+
+
+_in_serializer = contextvars.ContextVar('in_serializer', default=False)
+
+
+class TracedSerializerMixin:
+    """Un único span por serialización: los serializers anidados no abren otro"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_serializer = super().many_init(*args, **kwargs)
+        list_serializer.__class__ = traced_serializer_class(list_serializer.__class__)
+        return list_serializer
+
+    def to_representation(self, instance):
+        if _in_serializer.get() or not is_tracing():
+            return super().to_representation(instance)
+        token = _in_serializer.set(True)
+        try:
+            with span('drf.serialize', serializer=type(self).__name__):
+                return super().to_representation(instance)
+        finally:
+            _in_serializer.reset(token)
+
+
+class TracedViewMixin:
+    """Spans de DRF para cualquier vista o ViewSet: autenticación, permisos y vista"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_tracing():
+            return super().dispatch(request, *args, **kwargs)
+        action = self.action_map.get(request.method.lower(), '') if hasattr(self, 'action_map') else ''
+        with span(f'{type(self).__name__}.{action or request.method.lower()}'):
+            return super().dispatch(request, *args, **kwargs)
+
+    def perform_authentication(self, request):
+        with span('drf.authenticate'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with span('drf.check_permissions'):
+            super().check_permissions(request)
+
+
+class TracedGenericViewMixin(TracedViewMixin):
+    """
+    Además, spans de get_object, paginación y serializer para las vistas
+    genéricas (GenericAPIView y sus ViewSets). Las vistas sin esos métodos usan
+    TracedViewMixin: drf_yasg llama a get_serializer si la vista lo tiene.
+    """
+
+    def get_object(self):
+        with span('drf.get_object'):
+            return super().get_object()
+
+    def paginate_queryset(self, queryset):
+        with span('drf.paginate_queryset'):
+            return super().paginate_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        # Los ViewSets redefinen get_serializer_class, así que se envuelve aquí
+        if not is_tracing():
+            return super().get_serializer(*args, **kwargs)
+        serializer_class = traced_serializer_class(self.get_serializer_class())
+        kwargs.setdefault('context', self.get_serializer_context())
+        return serializer_class(*args, **kwargs)
+
+
+class TracedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('drf.render', renderer='json'):
+            return super().render(data, accepted_media_type, renderer_context)
@@ -16,23 +16,8 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 
-# Configuración de Swagger/OpenAPI
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Gestor de Proyectos API",
-        default_version='v1',
-        description="API REST para gestión de proyectos y tareas",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@example.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from config.views import api_docs_view, metrics_view, openapi_schema_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -42,10 +27,14 @@ urlpatterns = [
     path('', include('projects.urls')),
     path('', include('tasks.urls')),
     
-    # Documentación automática del API
-    path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('api/redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # Documentación del API sobre el esquema precalculado (ver config/openapi.py)
+    path('api/schema.<str:fmt>', openapi_schema_view, name='openapi-schema'),
+    path('api/docs/', api_docs_view, {'ui': 'swagger'}, name='schema-swagger-ui'),
+    path('api/redoc/', api_docs_view, {'ui': 'redoc'}, name='schema-redoc'),
     
+    # Métricas en formato Prometheus
+    path('metrics', metrics_view, name='metrics'),
+
     # URLs de autenticación de Django REST Framework
     path('api/auth/', include('rest_framework.urls')),
 ] 
\ No newline at end of file
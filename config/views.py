@@ -0,0 +1,59 @@
+"""
+Vistas propias del proyecto que no pertenecen a ninguna app.
+"""
+
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
+from rest_framework.permissions import BasePermission
+from rest_framework.views import APIView
+
+from config import metrics, openapi
+
+
+class MetricsPermission(BasePermission):
+    """Usuarios staff o el scraper con 'Authorization: Bearer <METRICS_TOKEN>'"""
+
+    def has_permission(self, request, view):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if token and header.startswith('Bearer '):
+            return hmac.compare_digest(header[len('Bearer '):], token)
+        return bool(request.user and request.user.is_staff)
+
+
+class MetricsView(APIView):
+    """Métricas de todos los workers en formato de texto de Prometheus"""
+    permission_classes = [MetricsPermission]
+    # Fuera del esquema OpenAPI (sin importar drf_yasg para @swagger_auto_schema)
+    swagger_schema = None
+
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+metrics_view = MetricsView.as_view()
+
+
+@require_GET
+def openapi_schema_view(request, fmt):
+    """Esquema OpenAPI precalculado (ver config/openapi.py), con ETag y Cache-Control"""
+    if fmt not in openapi.CONTENT_TYPES:
+        raise Http404
+    content, etag = openapi.load(fmt)
+    response = HttpResponse(content, content_type=openapi.CONTENT_TYPES[fmt])
+    response['ETag'] = f'"{etag}"'
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'OPENAPI_SCHEMA_MAX_AGE', 3600))
+    return get_conditional_response(request, etag=response['ETag'], response=response)
+
+
+@require_GET
+def api_docs_view(request, ui):
+    """Swagger UI o ReDoc sobre el esquema de openapi_schema_view"""
+    if request.GET.get('format') == 'openapi':
+        # URL del esquema que usaba drf_yasg antes de precalcularlo
+        return openapi_schema_view(request, 'json')
+    return HttpResponse(openapi.render_ui(request, ui))
@@ -92,6 +92,18 @@ class ApiService {
     return response.data;
   }
 
+  // Tarea con la primera página de comentarios e historial; next continúa cada lista
+  async getTaskFull(id: number, cursors?: { comments?: string; history?: string }): Promise<{
+    task?: Task;
+    comments?: { next: string | null; results: Comment[] };
+    history?: { next: string | null; results: TaskHistory[] };
+  }> {
+    const response = await this.api.get(`/api/tasks/${id}/full/`, {
+      params: { comments_cursor: cursors?.comments, history_cursor: cursors?.history },
+    });
+    return response.data;
+  }
+
   async createTask(task: Partial<Task>): Promise<Task> {
     const response: AxiosResponse<Task> = await this.api.post('/api/tasks/', task);
     return response.data;
@@ -209,6 +221,46 @@ class ApiService {
     return response.data;
   }
 
+  // Todos los widgets del dashboard en una sola petición
+  async getDashboard(): Promise<{
+    dashboardStats: {
+      totalProjects: number;
+      totalTasks: number;
+      completedTasks: number;
+      pendingTasks: number;
+      completedThisWeek: number;
+      activeProjects: number;
+    };
+    tasksCompletedByPeriod: { labels: string[]; datasets: any[] };
+    projectProgress: { labels: string[]; datasets: any[] };
+    priorityDistribution: { labels: string[]; datasets: any[] };
+    userActivity: { labels: string[]; datasets: any[] };
+    // Segundos desde que el servidor calculó los datos (cabecera Age)
+    ageSeconds: number;
+  }> {
+    const response = await this.api.get('/api/charts/dashboard/');
+    return { ...response.data, ageSeconds: Number(response.headers['age'] ?? 0) };
+  }
+
+  // Reportes en segundo plano: se encolan y se consulta su estado hasta que terminan
+  async submitReportJob(
+    report: 'projects_report' | 'project_time_report' | 'user_productivity_report',
+    params: { start_date?: string; end_date?: string; project_id?: string; user_id?: string } = {}
+  ): Promise<{ id: string; status: string; result_url: string | null }> {
+    const response = await this.api.post('/api/report-jobs/', { report, params });
+    return response.data;
+  }
+
+  async getReportJob(id: string): Promise<{ id: string; status: string; error: string; result_url: string | null }> {
+    const response = await this.api.get(`/api/report-jobs/${id}/`);
+    return response.data;
+  }
+
+  async getReportJobResult(id: string): Promise<any> {
+    const response = await this.api.get(`/api/report-jobs/${id}/result/`);
+    return response.data;
+  }
+
   async getTasksDetailedReport(filters?: {
     startDate?: string;
     endDate?: string;
@@ -29,6 +29,7 @@ export interface Task {
   status: string;
   priority: 'low' | 'medium' | 'high';
   due_date?: string;
+  is_overdue?: boolean;
   created_at: string;
   updated_at: string;
   completed: boolean;
@@ -73,6 +74,7 @@ export interface LoginResponse {
 // Tipos de respuesta paginada
 export interface PaginatedResponse<T> {
   count: number;
+  count_is_exact?: boolean;
   next?: string;
   previous?: string;
   results: T[];
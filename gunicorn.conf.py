@@ -0,0 +1,149 @@
+"""
+Configuración de Gunicorn para producción.
+
+Uso:
+    gunicorn -c gunicorn.conf.py config.wsgi:application
+
+Todos los valores se pueden ajustar con variables de entorno GUNICORN_*.
+"""
+
+import gc
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+# Servidor
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+backlog = _env_int('GUNICORN_BACKLOG', 2048)
+
+# Workers: sync por defecto, que es lo que mejor midió scripts/compare_gunicorn.py
+# con PostgreSQL (1 CPU, GUNICORN_WORKERS=3, 12 clientes durante 8 s contra
+# /api/tasks/): sync 10.5-11.9 req/s y p95 1234-1529 ms; gthread x4 10.9 req/s
+# y p95 1834 ms.
+# GUNICORN_WORKER_CLASS=gthread da varios hilos por proceso; compensa solo si
+# las peticiones pasan la mayor parte del tiempo esperando a PostgreSQL, así
+# que hay que medirlo en el servidor antes de activarlo.
+cpu_count = multiprocessing.cpu_count()
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+workers = _env_int('GUNICORN_WORKERS', cpu_count * 2 + 1)
+threads = _env_int('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1)
+
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Cargar Django en el master antes de hacer fork, para que las páginas de
+# memoria del código y los módulos importados se compartan (copy-on-write).
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Con preload_app Gunicorn importa la aplicación justo después de leer este
+# fichero y antes de cualquier hook (incluido on_starting): el gc se desactiva
+# aquí para que no toque los objetos durante la importación, y pre_fork lo
+# vuelve a activar tras congelarlos. Cada escritura de gc invalida páginas
+# compartidas.
+if preload_app:
+    gc.disable()
+
+# Reciclado de workers: tras N peticiones (con jitter para no reiniciar todos
+# a la vez) o cuando la memoria residente supera el umbral configurado.
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+max_worker_rss_mb = _env_int('GUNICORN_MAX_WORKER_RSS_MB', 512)
+
+# Logging
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+errorlog = os.getenv('GUNICORN_ERRORLOG', '-')
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+# Directorio temporal en memoria para el heartbeat de los workers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def _close_db_connections():
+    """Cerrar conexiones abiertas durante la carga de la aplicación"""
+    try:
+        from django.db import connections
+    except ImportError:
+        return
+    connections.close_all()
+
+    from config.db_backends.pool import close_all_pools
+    close_all_pools()
+
+
+def _clear_metrics_dir():
+    """Empezar las métricas agregadas de cero en cada arranque del master"""
+    directory = os.getenv('METRICS_DIR', '')
+    if not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith('metrics_'):
+            os.remove(os.path.join(directory, name))
+
+
+def _current_rss_mb():
+    """Memoria residente actual del proceso en MB (0 si no se puede medir)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def on_starting(server):
+    _clear_metrics_dir()
+
+
+def when_ready(server):
+    server.log.info(
+        'Gunicorn listo: %s workers %s x %s hilos (CPUs: %s)',
+        workers, worker_class, threads, cpu_count,
+    )
+
+
+def pre_fork(server, worker):
+    # Las conexiones heredadas por fork no se pueden compartir entre procesos
+    _close_db_connections()
+    if preload_app:
+        # Mover todos los objetos actuales a la generación permanente para que
+        # el gc de los workers no los recorra ni escriba en sus cabeceras.
+        gc.collect()
+        gc.freeze()
+        gc.enable()
+
+
+def post_fork(server, worker):
+    _close_db_connections()
+    # Cada worker vuelca solo sus propias métricas (config/metrics.py)
+    from config.metrics import registry
+    registry.reset()
+
+
+def post_request(worker, req, environ, resp):
+    rss_mb = _current_rss_mb()
+    if max_worker_rss_mb and rss_mb > max_worker_rss_mb:
+        worker.log.info(
+            'Worker %s supera %s MB de RSS (%.1f MB), reciclando',
+            worker.pid, max_worker_rss_mb, rss_mb,
+        )
+        worker.alive = False
+
+
+def worker_exit(server, worker):
+    _close_db_connections()
+    from config.metrics import flush
+    flush(force=True)
+
+
+def child_exit(server, worker):
+    # En el master, cuando el worker ya ha terminado y volcado sus métricas
+    directory = os.getenv('METRICS_DIR', '')
+    if directory and os.path.isdir(directory):
+        from config.metrics import retire
+        retire(worker.pid, directory)
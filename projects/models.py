@@ -2,6 +2,12 @@ from django.db import models
 from django.conf import settings
 
 
+class ProjectQuerySet(models.QuerySet):
+    def alive(self):
+        """Proyectos que no se están borrando en segundo plano (ver tasks/deletion.py)"""
+        return self.filter(deleting_at__isnull=True)
+
+
 class Project(models.Model):
     """
     Project model for managing projects.
@@ -16,6 +22,10 @@ class Project(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Marcado para borrar en segundo plano (ver tasks/deletion.py): ya no se muestra
+    deleting_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = ProjectQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -1,13 +1,15 @@
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from config.tracing import TracedGenericViewMixin
+from tasks import deletion
 from .models import Project
 from .serializers import ProjectSerializer, ProjectListSerializer
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(TracedGenericViewMixin, viewsets.ModelViewSet):
     """ViewSet para el modelo Project"""
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -23,12 +25,15 @@ class ProjectViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_authenticated:
             return Project.objects.none()
         
+        # Los proyectos que se están borrando en segundo plano ya no se muestran
+        projects = Project.objects.alive()
+        
         # Si es superusuario, puede ver todos los proyectos
         if self.request.user.is_superuser:
-            return Project.objects.all()
+            return projects
         
         # Usuarios normales solo ven sus propios proyectos
-        return Project.objects.filter(owner=self.request.user)
+        return projects.filter(owner=self.request.user)
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -39,6 +44,18 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """Asignar automáticamente el usuario autenticado como propietario"""
         serializer.save(owner=self.request.user)
     
+    def destroy(self, request, *args, **kwargs):
+        """Borrar el proyecto por lotes en la base de datos; los grandes, en segundo plano"""
+        project = self.get_object()
+        if deletion.runs_in_background(project):
+            deletion.schedule_project(project)
+            return Response(
+                {'id': project.pk, 'status': 'deleting', 'deleting_at': project.deleting_at},
+                status=status.HTTP_202_ACCEPTED
+            )
+        deletion.delete_project(project.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
     @action(detail=True, methods=['get'])
     def tasks(self, request, pk=None):
         """Obtener todas las tareas de un proyecto"""
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Script para comparar bajo carga la configuración anterior de Gunicorn
+(--workers 3 --timeout 120, workers sync) con gunicorn.conf.py
+
+Uso:
+    python scripts/compare_gunicorn.py --token <token> --path /api/tasks/
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGURATIONS = {
+    # Gunicorn carga ./gunicorn.conf.py automáticamente; /dev/null lo evita
+    'actual': ['-c', os.devnull, '--workers', '3', '--timeout', '120'],
+    'gunicorn.conf.py': ['-c', os.path.join(BASE_DIR, 'gunicorn.conf.py')],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return True
+        except urllib.error.HTTPError:
+            # Cualquier respuesta HTTP (incluido 401) indica que el servidor responde
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def workers_rss_mb(master_pid):
+    """Memoria residente total (MB) del master y sus workers"""
+    try:
+        output = subprocess.check_output(
+            ['ps', '-o', 'rss=', '--ppid', str(master_pid), '-p', str(master_pid)],
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return 0
+    return sum(int(line) for line in output.split()) / 1024
+
+
+def run_load(url, token, concurrency, duration):
+    headers = {'Authorization': f'Token {token}'} if token else {}
+    deadline = time.time() + duration
+
+    def client():
+        latencies = []
+        errors = 0
+        while time.time() < deadline:
+            request = urllib.request.Request(url, headers=headers)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+            except (urllib.error.URLError, OSError):
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies, errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: client(), range(concurrency)))
+
+    latencies = sorted(lat for lats, _ in results for lat in lats)
+    errors = sum(err for _, err in results)
+    return latencies, errors
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def benchmark(name, args, options):
+    port = free_port()
+    command = [
+        sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+        *args, '--bind', f'127.0.0.1:{port}',
+    ]
+    process = subprocess.Popen(command, cwd=BASE_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}{options.path}'
+    try:
+        if not wait_until_ready(url):
+            print(f'❌ {name}: Gunicorn no arrancó')
+            return None
+        # Calentamiento para que todos los workers hayan cargado y conectado
+        run_load(url, options.token, options.concurrency, 2)
+        latencies, errors = run_load(url, options.token, options.concurrency, options.duration)
+        rss = workers_rss_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {
+        'name': name,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / options.duration,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'mean': statistics.mean(latencies) if latencies else 0,
+        'rss_mb': rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/tasks/', help='Endpoint a probar (default: /api/tasks/)')
+    parser.add_argument('--token', default='', help='Token de autenticación de la API')
+    parser.add_argument('--concurrency', type=int, default=20, help='Clientes concurrentes (default: 20)')
+    parser.add_argument('--duration', type=int, default=20, help='Segundos de carga por configuración (default: 20)')
+    options = parser.parse_args()
+
+    results = []
+    for name, args in CONFIGURATIONS.items():
+        print(f'🔄 Probando configuración {name}...')
+        result = benchmark(name, args, options)
+        if result:
+            results.append(result)
+
+    print(f"\n{'Configuración':<20}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>10}{'RSS MB':>10}")
+    for r in results:
+        print(f"{r['name']:<20}{r['rps']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}"
+              f"{r['p99']:>10.1f}{r['errors']:>10}{r['rss_mb']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Utilidades compartidas por los scripts de exportación e importación de datos.
+
+Los datos se guardan en NDJSON (un objeto JSON por línea), opcionalmente
+comprimido con gzip o zstd, para poder escribirlos y leerlos por streaming sin
+cargar tablas completas en memoria.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+# Tablas exportadas, en orden de dependencias: (nombre, modelo, campos)
+TABLES = [
+    ('users', 'users.CustomUser', [
+        'id', 'username', 'email', 'first_name', 'last_name', 'is_active',
+        'is_staff', 'is_superuser', 'date_joined', 'last_login',
+    ]),
+    ('projects', 'projects.Project', [
+        'id', 'name', 'description', 'owner_id', 'created_at', 'updated_at',
+    ]),
+    ('tasks', 'tasks.Task', [
+        'id', 'title', 'description', 'completed', 'status', 'priority',
+        'created_at', 'updated_at', 'due_date', 'project_id', 'assignee_id',
+    ]),
+    ('comments', 'tasks.Comment', [
+        'id', 'content', 'created_at', 'updated_at', 'task_id', 'user_id',
+    ]),
+    ('task_history', 'tasks.TaskHistory', [
+        'id', 'field_name', 'old_value', 'new_value', 'changed_at', 'task_id', 'user_id',
+    ]),
+]
+
+# Campo que marca la última modificación de cada tabla (exportación incremental).
+# Las tablas sin entrada (usuarios, pocas filas) se exportan siempre completas.
+CHANGE_TRACKING_FIELDS = {
+    'projects': 'updated_at',
+    'tasks': 'updated_at',
+    'comments': 'updated_at',
+    'task_history': 'changed_at',
+}
+
+# Tombstones de objetos borrados (solo en exportaciones incrementales)
+DELETIONS_TABLE = ('deletions', 'tasks.DeletedRecord', ['id', 'model', 'object_id', 'deleted_at'])
+
+COMPRESSION_EXTENSIONS = {
+    'none': '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+
+def json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Tipo no serializable: {type(value).__name__}')
+
+
+def compression_for(path):
+    for compression, extension in COMPRESSION_EXTENSIONS.items():
+        if extension and path.endswith(extension):
+            return compression
+    return 'none'
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            'La compresión zstd requiere el paquete "zstandard" (pip install zstandard)'
+        )
+    return zstandard
+
+
+def open_write(path, compression):
+    """Abrir un fichero de texto para escritura con la compresión indicada"""
+    if compression == 'gzip':
+        # compresslevel 6: buen equilibrio entre CPU y tamaño para texto JSON
+        return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+    if compression == 'zstd':
+        zstandard = _zstd()
+        raw = open(path, 'wb')
+        writer = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(writer, encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def open_read(path):
+    """Abrir un fichero de texto (comprimido o no) para lectura"""
+    compression = compression_for(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if compression == 'zstd':
+        zstandard = _zstd()
+        raw = open(path, 'rb')
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_records(path):
+    """
+    Iterar los registros de un fichero exportado. Acepta NDJSON (comprimido o no)
+    y el formato antiguo de un único array JSON (.json).
+    """
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+    with open_read(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """SHA-256 del fichero tal y como está en disco"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_path(export_dir, timestamp):
+    return os.path.join(export_dir, f'export_manifest_{timestamp}.json')
+
+
+def load_manifest(export_dir, timestamp):
+    """
+    Leer el manifiesto de una exportación. Para exportaciones antiguas (sin
+    manifiesto) se construye uno equivalente con los ficheros .json esperados.
+    """
+    path = manifest_path(export_dir, timestamp)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {
+        'export_timestamp': timestamp,
+        'tables': {
+            name: {'file': f'{name}_{timestamp}.json'}
+            for name, _, _ in TABLES
+        },
+    }
+
+
+def latest_manifest(export_dir):
+    """Manifiesto más reciente del directorio que tenga marca de agua, o None"""
+    if not os.path.isdir(export_dir):
+        return None
+    names = sorted(
+        (name for name in os.listdir(export_dir)
+         if name.startswith('export_manifest_') and name.endswith('.json')),
+        reverse=True,
+    )
+    for name in names:
+        with open(os.path.join(export_dir, name), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('high_water_mark'):
+            return manifest
+    return None
@@ -1,166 +1,206 @@
 #!/usr/bin/env python
 """
-Script para exportar datos de SQLite a formato JSON
+Script para exportar datos de SQLite a formato NDJSON
 para posterior importación a PostgreSQL
+
+Cada tabla se lee por streaming (iterator + values) y se escribe en su propio
+fichero NDJSON, opcionalmente comprimido, en paralelo con un pool de procesos.
+El manifiesto de la exportación registra filas y checksums de cada fichero.
+
+Con --incremental solo se exportan las filas modificadas desde la marca de agua
+(high_water_mark) de la última exportación del directorio, junto con los
+tombstones de los objetos borrados desde entonces.
+
+Uso:
+    python scripts/export_sqlite_data.py [--compression gzip] [--workers 4] [--chunk-size 5000]
+    python scripts/export_sqlite_data.py --incremental [--overlap 300]
+    python scripts/export_sqlite_data.py --since 2025-01-01T00:00:00+00:00
 """
 
 import os
 import sys
 import django
 import json
-from datetime import datetime
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
 
 # Configurar Django
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-from users.models import CustomUser
-from projects.models import Project
-from tasks.models import Task, Comment, TaskHistory
+from django.apps import apps
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from data_transfer import (
+    TABLES, CHANGE_TRACKING_FIELDS, DELETIONS_TABLE, COMPRESSION_EXTENSIONS,
+    json_default, open_write, file_checksum, manifest_path, latest_manifest
+)
+
+
+def export_table(name, model_label, fields, export_dir, timestamp, compression, chunk_size,
+                 since=None):
+    """Exportar una tabla a NDJSON sin cargarla entera en memoria"""
+    model = apps.get_model(model_label)
+    filename = f"{name}_{timestamp}.ndjson{COMPRESSION_EXTENSIONS[compression]}"
+    path = os.path.join(export_dir, filename)
+
+    start = time.monotonic()
+    rows = 0
+    # Rango de ids exportados: la importación lo usa para decidir si conserva los ids
+    min_id = max_id = None
+    queryset = model.objects.order_by('pk').values(*fields)
+    change_field = 'deleted_at' if name == DELETIONS_TABLE[0] else CHANGE_TRACKING_FIELDS.get(name)
+    if since is not None and change_field:
+        queryset = queryset.filter(**{f'{change_field}__gte': since})
+    try:
+        with open_write(path, compression) as f:
+            for row in queryset.iterator(chunk_size=chunk_size):
+                f.write(json.dumps(row, default=json_default, ensure_ascii=False))
+                f.write('\n')
+                rows += 1
+                if 'id' in row:
+                    if min_id is None:
+                        min_id = row['id']
+                    max_id = row['id']
+    finally:
+        connections.close_all()
+
+    return name, {
+        'file': filename,
+        'model': model_label,
+        'fields': fields,
+        'rows': rows,
+        'min_id': min_id,
+        'max_id': max_id,
+        'since_field': change_field if since is not None else None,
+        'bytes': os.path.getsize(path),
+        'sha256': file_checksum(path),
+        'seconds': round(time.monotonic() - start, 3),
+    }
+
 
-def export_data():
+def resolve_since(export_dir, incremental=False, since=None, overlap=300):
+    """
+    Fecha desde la que exportar cambios, o None para una exportación completa.
+    La marca de agua se retrasa `overlap` segundos para no perder transacciones
+    que terminaron justo después de la exportación anterior; reimportar esas
+    filas es inocuo porque la importación incremental es idempotente.
+    """
+    if since:
+        value = parse_datetime(since)
+        if value is None:
+            raise ValueError(f'Fecha no válida para --since: {since}')
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+    if not incremental:
+        return None
+    previous = latest_manifest(export_dir)
+    if previous is None:
+        print("⚠️  No hay exportación previa con marca de agua, se hace una exportación completa")
+        return None
+    return parse_datetime(previous['high_water_mark']) - timedelta(seconds=overlap)
+
+
+def export_data(export_dir="fixtures/export", compression='none', workers=1, chunk_size=5000,
+                incremental=False, since=None, overlap=300):
     """Exportar todos los datos de la base de datos SQLite"""
-    
+
     print("🔄 Iniciando exportación de datos de SQLite...")
-    
+
     # Crear directorio de exportación si no existe
-    export_dir = "fixtures/export"
     os.makedirs(export_dir, exist_ok=True)
-    
+
+    since = resolve_since(export_dir, incremental, since, overlap)
+    # La marca de agua se toma antes de leer: lo que cambie durante la
+    # exportación entrará (otra vez, como mucho) en la siguiente
+    high_water_mark = timezone.now()
+    mode = 'incremental' if since is not None else 'full'
+    if since is not None:
+        print(f"📅 Exportación incremental: cambios desde {since.isoformat()}")
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Exportar usuarios
-    print("📤 Exportando usuarios...")
-    users_data = []
-    for user in CustomUser.objects.all():
-        users_data.append({
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'is_active': user.is_active,
-            'is_staff': user.is_staff,
-            'is_superuser': user.is_superuser,
-            'date_joined': user.date_joined.isoformat() if user.date_joined else None,
-            'last_login': user.last_login.isoformat() if user.last_login else None,
-        })
-    
-    with open(f"{export_dir}/users_{timestamp}.json", 'w', encoding='utf-8') as f:
-        json.dump(users_data, f, indent=2, ensure_ascii=False)
-    
-    print(f"✅ Exportados {len(users_data)} usuarios")
-    
-    # Exportar proyectos
-    print("📤 Exportando proyectos...")
-    projects_data = []
-    for project in Project.objects.all():
-        projects_data.append({
-            'id': project.id,
-            'name': project.name,
-            'description': project.description,
-            'owner_id': project.owner_id,
-            'created_at': project.created_at.isoformat() if project.created_at else None,
-            'updated_at': project.updated_at.isoformat() if project.updated_at else None,
-        })
-    
-    with open(f"{export_dir}/projects_{timestamp}.json", 'w', encoding='utf-8') as f:
-        json.dump(projects_data, f, indent=2, ensure_ascii=False)
-    
-    print(f"✅ Exportados {len(projects_data)} proyectos")
-    
-    # Exportar tareas
-    print("📤 Exportando tareas...")
-    tasks_data = []
-    for task in Task.objects.all():
-        tasks_data.append({
-            'id': task.id,
-            'title': task.title,
-            'description': task.description,
-            'completed': task.completed,
-            'priority': task.priority,
-            'created_at': task.created_at.isoformat() if task.created_at else None,
-            'due_date': task.due_date.isoformat() if task.due_date else None,
-            'project_id': task.project_id,
-            'assignee_id': task.assignee_id,
-        })
-    
-    with open(f"{export_dir}/tasks_{timestamp}.json", 'w', encoding='utf-8') as f:
-        json.dump(tasks_data, f, indent=2, ensure_ascii=False)
-    
-    print(f"✅ Exportadas {len(tasks_data)} tareas")
-    
-    # Exportar comentarios
-    print("📤 Exportando comentarios...")
-    comments_data = []
-    for comment in Comment.objects.all():
-        comments_data.append({
-            'id': comment.id,
-            'content': comment.content,
-            'created_at': comment.created_at.isoformat() if comment.created_at else None,
-            'updated_at': comment.updated_at.isoformat() if comment.updated_at else None,
-            'task_id': comment.task_id,
-            'user_id': comment.user_id,
-        })
-    
-    with open(f"{export_dir}/comments_{timestamp}.json", 'w', encoding='utf-8') as f:
-        json.dump(comments_data, f, indent=2, ensure_ascii=False)
-    
-    print(f"✅ Exportados {len(comments_data)} comentarios")
-    
-    # Exportar historial de tareas
-    print("📤 Exportando historial de tareas...")
-    task_history_data = []
-    for history in TaskHistory.objects.all():
-        task_history_data.append({
-            'id': history.id,
-            'field_name': history.field_name,
-            'old_value': history.old_value,
-            'new_value': history.new_value,
-            'changed_at': history.changed_at.isoformat() if history.changed_at else None,
-            'task_id': history.task_id,
-            'user_id': history.user_id,
-        })
-    
-    with open(f"{export_dir}/task_history_{timestamp}.json", 'w', encoding='utf-8') as f:
-        json.dump(task_history_data, f, indent=2, ensure_ascii=False)
-    
-    print(f"✅ Exportado historial de {len(task_history_data)} cambios")
-    
-    # Crear archivo de resumen
+    table_specs = list(TABLES) + ([DELETIONS_TABLE] if since is not None else [])
+    jobs = [
+        (name, model_label, fields, export_dir, timestamp, compression, chunk_size, since)
+        for name, model_label, fields in table_specs
+    ]
+
+    tables = {}
+    if workers > 1:
+        # Cada proceso abre su propia conexión; no heredar la del proceso padre
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(export_table, *job) for job in jobs]
+            for future in as_completed(futures):
+                name, info = future.result()
+                tables[name] = info
+                print(f"✅ Exportadas {info['rows']} filas de {name} ({info['seconds']}s)")
+    else:
+        for job in jobs:
+            print(f"📤 Exportando {job[0]}...")
+            name, info = export_table(*job)
+            tables[name] = info
+            print(f"✅ Exportadas {info['rows']} filas de {name} ({info['seconds']}s)")
+
+    # Mantener el orden de dependencias en el manifiesto
+    tables = {name: tables[name] for name, _, _ in table_specs}
+
+    # Crear manifiesto de la exportación
     summary = {
         'export_timestamp': timestamp,
         'export_date': datetime.now().isoformat(),
-        'counts': {
-            'users': len(users_data),
-            'projects': len(projects_data),
-            'tasks': len(tasks_data),
-            'comments': len(comments_data),
-            'task_history': len(task_history_data),
-        },
-        'files': [
-            f"users_{timestamp}.json",
-            f"projects_{timestamp}.json",
-            f"tasks_{timestamp}.json",
-            f"comments_{timestamp}.json",
-            f"task_history_{timestamp}.json",
-        ]
+        'mode': mode,
+        'since': since.isoformat() if since is not None else None,
+        'high_water_mark': high_water_mark.isoformat(),
+        'format': 'ndjson',
+        'compression': compression,
+        'counts': {name: info['rows'] for name, info in tables.items()},
+        'files': [info['file'] for info in tables.values()],
+        'tables': tables,
     }
-    
-    with open(f"{export_dir}/export_summary_{timestamp}.json", 'w', encoding='utf-8') as f:
+
+    with open(manifest_path(export_dir, timestamp), 'w', encoding='utf-8') as f:
         json.dump(summary, f, indent=2, ensure_ascii=False)
-    
+
     print(f"\n🎉 Exportación completada!")
     print(f"📁 Archivos guardados en: {export_dir}/")
     print(f"📊 Resumen: {summary['counts']}")
-    print(f"📄 Archivo de resumen: export_summary_{timestamp}.json")
-    
+    print(f"📄 Manifiesto: export_manifest_{timestamp}.json")
+
     return timestamp, summary
 
+
+def main():
+    parser = argparse.ArgumentParser(description='Exportar datos a NDJSON por streaming')
+    parser.add_argument('--output-dir', default='fixtures/export',
+                        help='Directorio de salida (default: fixtures/export)')
+    parser.add_argument('--compression', choices=list(COMPRESSION_EXTENSIONS), default='none',
+                        help='Compresión de los ficheros (default: none)')
+    parser.add_argument('--workers', type=int, default=min(len(TABLES), os.cpu_count() or 1),
+                        help='Procesos en paralelo, uno por tabla (default: nº de CPUs)')
+    parser.add_argument('--chunk-size', type=int, default=5000,
+                        help='Filas leídas por lote de la base de datos (default: 5000)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Exportar solo los cambios desde la última exportación del directorio')
+    parser.add_argument('--since',
+                        help='Exportar solo los cambios desde esta fecha ISO 8601')
+    parser.add_argument('--overlap', type=int, default=300,
+                        help='Segundos de solape con la marca de agua anterior (default: 300)')
+    args = parser.parse_args()
+
+    export_data(args.output_dir, args.compression, args.workers, args.chunk_size,
+                args.incremental, args.since, args.overlap)
+
+
 if __name__ == "__main__":
     try:
-        timestamp, summary = export_data()
+        main()
         sys.exit(0)
     except Exception as e:
         print(f"❌ Error durante la exportación: {e}")
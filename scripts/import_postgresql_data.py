@@ -1,228 +1,449 @@
 #!/usr/bin/env python
 """
 Script para importar datos exportados de SQLite a PostgreSQL
+
+Los ficheros de la exportación se leen por streaming y se cargan por lotes:
+con COPY FROM STDIN en PostgreSQL y con bulk_create(ignore_conflicts=True) en
+otros motores. Las claves foráneas se reasignan con mapas de ids en memoria y
+las secuencias se reajustan al terminar.
+
+Los ids de origen se conservan si están libres en la tabla destino; si no, se
+desplazan por encima del id máximo. Cada tabla se importa en una transacción
+que guarda también un ImportedTable con el SHA-256 del fichero y su mapa de
+ids: volver a lanzar la misma importación (p. ej. tras un fallo a medias) se
+salta las tablas ya cargadas en lugar de duplicarlas.
+
+Las exportaciones incrementales (mode 'incremental' en el manifiesto) se aplican
+como upserts por id, conservando los ids de origen, y después se borran los
+objetos de los tombstones. Aplicar dos veces el mismo delta no cambia nada, pero
+requiere que la base de datos destino se haya cargado antes con una importación
+completa sobre tablas vacías (ids idénticos a los de origen).
+
+Uso:
+    python scripts/import_postgresql_data.py <timestamp> [--batch-size 10000] [--no-copy]
 """
 
 import os
 import sys
 import django
+import io
 import json
+import time
+import argparse
 from datetime import datetime
+from itertools import islice
 
 # Configurar Django
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from config.bulk_load import copy_value, keep_timestamps
 from users.models import CustomUser
 from projects.models import Project
-from tasks.models import Task, Comment, TaskHistory
+from tasks.models import Task, Comment, TaskHistory, ImportedTable
+
+from data_transfer import TABLES, DELETIONS_TABLE, load_manifest, iter_records, file_checksum
+
+DEFAULT_PASSWORD = 'admin123'
+
+MODELS = {
+    'users': CustomUser,
+    'projects': Project,
+    'tasks': Task,
+    'comments': Comment,
+    'task_history': TaskHistory,
+}
+
+# Claves foráneas a reasignar: campo -> tabla de origen del id
+FOREIGN_KEYS = {
+    'projects': {'owner_id': 'users'},
+    'tasks': {'project_id': 'projects', 'assignee_id': 'users'},
+    'comments': {'task_id': 'tasks', 'user_id': 'users'},
+    'task_history': {'task_id': 'tasks', 'user_id': 'users'},
+}
+
+
+class IdMap:
+    """
+    Correspondencia id original -> id en la base de datos destino.
+
+    Los ids nuevos son el original más un desplazamiento (0 si los ids de
+    origen estaban libres, con lo que se conservan); solo las excepciones se
+    guardan explícitamente: usuarios que ya existían (overrides) y filas que no
+    se insertaron (dropped, por id nuevo), que se mapean a None. Así el mapa de
+    tablas con millones de filas no ocupa memoria.
+    """
+
+    def __init__(self, offset=0, overrides=None, dropped=()):
+        self.offset = offset
+        self.overrides = dict(overrides or {})
+        self.dropped = set(dropped)
+
+    def __getitem__(self, old_id):
+        if old_id is None:
+            return None
+        new_id = self.overrides.get(old_id, old_id + self.offset)
+        return None if new_id in self.dropped else new_id
+
+    def to_json(self):
+        return {
+            'offset': self.offset,
+            'overrides': [[old_id, new_id] for old_id, new_id in self.overrides.items()],
+            'dropped': sorted(self.dropped),
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['offset'], {old_id: new_id for old_id, new_id in data['overrides']}, data['dropped'])
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def supports_copy():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        return hasattr(cursor.cursor, 'copy_expert')
+
+
+def copy_rows(model, fields, rows, batch_size):
+    """Insertar filas con COPY FROM STDIN, un lote cada vez"""
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    sql = f'COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN'
+
+    count = 0
+    with connection.cursor() as cursor:
+        for batch in batched(rows, batch_size):
+            buffer = io.StringIO()
+            for row in batch:
+                buffer.write('\t'.join(copy_value(value) for value in row))
+                buffer.write('\n')
+            buffer.seek(0)
+            cursor.cursor.copy_expert(sql, buffer)
+            count += len(batch)
+    return count
+
+
+def bulk_create_rows(model, fields, rows, batch_size, dropped):
+    """
+    Alternativa a COPY para motores distintos de PostgreSQL. ignore_conflicts
+    descarta en silencio las filas cuyo id ya existe: se añaden a dropped para
+    que no se les asignen hijos.
+    """
+    count = 0
+    id_index = fields.index('id')
+    with keep_timestamps(model):
+        for batch in batched(rows, batch_size):
+            existing = set(
+                model.objects.filter(id__in=[row[id_index] for row in batch]).values_list('id', flat=True)
+            )
+            dropped.update(existing)
+            objects = [model(**dict(zip(fields, row))) for row in batch if row[id_index] not in existing]
+            model.objects.bulk_create(objects, batch_size=batch_size, ignore_conflicts=True)
+            count += len(objects)
+    return count
+
+
+def source_id_range(path, table_info):
+    """
+    (min_id, max_id) de los ids de origen: del manifiesto o, en exportaciones
+    antiguas sin ese dato, de una pasada por el fichero sin guardar los ids
+    """
+    if 'min_id' in table_info:
+        return table_info['min_id'], table_info['max_id']
+    min_id = max_id = None
+    for record in iter_records(path):
+        if min_id is None or record['id'] < min_id:
+            min_id = record['id']
+        if max_id is None or record['id'] > max_id:
+            max_id = record['id']
+    return min_id, max_id
+
+
+def id_offset(model, path, table_info):
+    """
+    0 si los ids de origen no existen en la tabla destino (se conservan); si
+    no, el id máximo del destino
+    """
+    max_id = model.objects.aggregate(max_id=Max('id'))['max_id']
+    if max_id is None:
+        return 0
+    source_min, source_max = source_id_range(path, table_info)
+    if source_min is None or not model.objects.filter(id__gte=source_min, id__lte=source_max).exists():
+        return 0
+    return max_id
+
+
+def table_fields(name, export_fields):
+    """Campos a insertar: los exportados más los obligatorios que falten"""
+    model = MODELS[name]
+    fields = list(export_fields)
+    if name == 'users':
+        fields.append('password')
+    # Exportaciones antiguas no incluyen algunos campos (p. ej. Task.status)
+    for field in model._meta.concrete_fields:
+        if field.attname not in fields and not field.null and field.has_default():
+            fields.append(field.attname)
+    return fields
+
+
+def import_table(name, path, table_info, checksum, id_maps, use_copy, batch_size, stats):
+    model = MODELS[name]
+    imported = ImportedTable.objects.filter(source_sha256=checksum, table=name).first()
+    if imported:
+        # Ya cargada por una ejecución anterior con el mismo fichero
+        id_maps[name] = IdMap.from_json(imported.id_map)
+        stats.update(rows=0, seconds=0, rows_per_second=0, skipped=imported.rows)
+        return 0
+
+    export_fields = dict((table, fields) for table, _, fields in TABLES)[name]
+    fields = table_fields(name, export_fields)
+    defaults = {
+        field.attname: field.get_default()
+        for field in model._meta.concrete_fields
+        if field.attname in fields and field.has_default()
+    }
+    id_map = id_maps[name] = IdMap(id_offset(model, path, table_info))
+    foreign_keys = FOREIGN_KEYS.get(name, {})
+    required = {field_name for field_name in foreign_keys if not model._meta.get_field(field_name).null}
+
+    existing_usernames = {}
+    password_hash = None
+    if name == 'users':
+        existing_usernames = dict(CustomUser.objects.values_list('username', 'id'))
+        # Un único hash para todos los usuarios nuevos en lugar de uno por fila
+        password_hash = make_password(DEFAULT_PASSWORD)
+
+    def rows():
+        for record in iter_records(path):
+            if name == 'users' and record['username'] in existing_usernames:
+                id_map.overrides[record['id']] = existing_usernames[record['username']]
+                stats['existing'] += 1
+                continue
+            record['id'] = id_map[record['id']]
+            for field_name, source in foreign_keys.items():
+                record[field_name] = id_maps[source][record.get(field_name)]
+            if any(record[field_name] is None for field_name in required):
+                # Su padre no se insertó: tampoco la fila ni sus hijos
+                id_map.dropped.add(record['id'])
+                stats['dropped'] += 1
+                continue
+            if password_hash:
+                record['password'] = password_hash
+            if 'updated_at' in fields and record.get('updated_at') is None:
+                # Exportaciones anteriores a Task.updated_at
+                record['updated_at'] = record.get('created_at')
+            yield tuple(record.get(field, defaults.get(field)) for field in fields)
+
+    start = time.monotonic()
+    with transaction.atomic():
+        if use_copy:
+            count = copy_rows(model, fields, rows(), batch_size)
+        else:
+            dropped = set()
+            count = bulk_create_rows(model, fields, rows(), batch_size, dropped)
+            stats['dropped'] += len(dropped)
+            id_map.dropped |= dropped
+        ImportedTable.objects.create(source_sha256=checksum, table=name, id_map=id_map.to_json(), rows=count)
+    elapsed = time.monotonic() - start
+    stats['rows'] = count
+    stats['seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = round(count / elapsed) if elapsed else count
+    return count
+
+
+def upsert_table(name, path, batch_size, stats):
+    """
+    Insertar o actualizar por id las filas de un delta. Los ids se conservan y
+    las contraseñas de los usuarios que ya existen no se tocan.
+    """
+    model = MODELS[name]
+    export_fields = dict((table, fields) for table, _, fields in TABLES)[name]
+    fields = table_fields(name, export_fields)
+    update_fields = [
+        model._meta.get_field(field).name
+        for field in fields if field not in ('id', 'password')
+    ]
+    defaults = {
+        field.attname: field.get_default()
+        for field in model._meta.concrete_fields
+        if field.attname in fields and field.has_default()
+    }
+    password_hash = make_password(DEFAULT_PASSWORD) if name == 'users' else None
+
+    start = time.monotonic()
+    count = 0
+    with transaction.atomic(), keep_timestamps(model):
+        for batch in batched(iter_records(path), batch_size):
+            objects = []
+            for record in batch:
+                if password_hash:
+                    record['password'] = password_hash
+                objects.append(model(**{field: record.get(field, defaults.get(field)) for field in fields}))
+            model.objects.bulk_create(
+                objects,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=update_fields,
+            )
+            count += len(objects)
+    elapsed = time.monotonic() - start
+    stats['rows'] = count
+    stats['seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = round(count / elapsed) if elapsed else count
+    return count
+
+
+def apply_deletions(path):
+    """Borrar los objetos de los tombstones; las cascadas las resuelve el destino"""
+    models = {model._meta.label: model for model in MODELS.values()}
+    pending = {}
+    for record in iter_records(path):
+        if record['model'] in models:
+            pending.setdefault(record['model'], set()).add(record['object_id'])
+
+    deleted = {}
+    with transaction.atomic():
+        # Hijos antes que padres: así cada tombstone cuenta su propio borrado
+        for model in reversed(list(MODELS.values())):
+            ids = pending.get(model._meta.label)
+            if ids:
+                deleted[model._meta.label], _ = model.objects.filter(id__in=ids).delete()
+    return deleted
+
+
+def import_delta(files, batch_size):
+    """Aplicar una exportación incremental como upserts + tombstones"""
+    table_stats = {}
+    for name, _, _ in TABLES:
+        print(f"📥 Aplicando cambios de {name}...")
+        stats = table_stats[name] = {}
+        upsert_table(name, files[name], batch_size, stats)
+        print(f"✅ {stats['rows']} filas insertadas/actualizadas en {name} en {stats['seconds']}s")
+
+    deleted = {}
+    if DELETIONS_TABLE[0] in files:
+        print("🗑️  Aplicando borrados...")
+        deleted = apply_deletions(files[DELETIONS_TABLE[0]])
+        print(f"✅ Borrados: {deleted or 'ninguno'}")
+    return table_stats, deleted
+
+
+def reset_sequences():
+    """Reajustar las secuencias de ids tras insertar con ids explícitos"""
+    statements = connection.ops.sequence_reset_sql(no_style(), list(MODELS.values()))
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def import_data(export_timestamp, export_dir="fixtures/export", batch_size=10000, use_copy=True):
+    """Importar datos desde archivos exportados a PostgreSQL"""
 
-def import_data(export_timestamp):
-    """Importar datos desde archivos JSON a PostgreSQL"""
-    
     print(f"🔄 Iniciando importación de datos a PostgreSQL...")
     print(f"📅 Timestamp de exportación: {export_timestamp}")
-    
-    export_dir = "fixtures/export"
-    
-    # Verificar que existen los archivos de exportación
-    required_files = [
-        f"users_{export_timestamp}.json",
-        f"projects_{export_timestamp}.json",
-        f"tasks_{export_timestamp}.json",
-        f"comments_{export_timestamp}.json",
-        f"task_history_{export_timestamp}.json",
-    ]
-    
-    for file in required_files:
-        file_path = os.path.join(export_dir, file)
+
+    # Verificar que existen los archivos de exportación (según el manifiesto)
+    manifest = load_manifest(export_dir, export_timestamp)
+    files = {
+        name: os.path.join(export_dir, table['file'])
+        for name, table in manifest['tables'].items()
+    }
+
+    for file_path in files.values():
         if not os.path.exists(file_path):
-            print(f"❌ Error: No se encontró el archivo {file}")
+            print(f"❌ Error: No se encontró el archivo {os.path.basename(file_path)}")
             return False
-    
+
+    mode = manifest.get('mode', 'full')
+    use_copy = use_copy and supports_copy() and mode == 'full'
+    if mode == 'incremental':
+        print(f"⚙️  Exportación incremental desde {manifest.get('since')}: upserts por id")
+    else:
+        print(f"⚙️  Método de carga: {'COPY FROM STDIN' if use_copy else 'bulk_create'}")
+
     try:
-        # Importar usuarios
-        print("📥 Importando usuarios...")
-        with open(os.path.join(export_dir, f"users_{export_timestamp}.json"), 'r', encoding='utf-8') as f:
-            users_data = json.load(f)
-        
-        user_count = 0
-        for user_data in users_data:
-            # Evitar duplicar el superusuario admin
-            if user_data['username'] == 'admin' and CustomUser.objects.filter(username='admin').exists():
-                print("⚠️  Usuario admin ya existe, saltando...")
-                continue
-                
-            user, created = CustomUser.objects.get_or_create(
-                username=user_data['username'],
-                defaults={
-                    'email': user_data['email'],
-                    'first_name': user_data['first_name'],
-                    'last_name': user_data['last_name'],
-                    'is_active': user_data['is_active'],
-                    'is_staff': user_data['is_staff'],
-                    'is_superuser': user_data['is_superuser'],
-                }
-            )
-            if created:
-                user_count += 1
-                # Establecer contraseña por defecto
-                user.set_password('admin123')
-                user.save()
-        
-        print(f"✅ Importados {user_count} usuarios nuevos")
-        
-        # Importar proyectos
-        print("📥 Importando proyectos...")
-        with open(os.path.join(export_dir, f"projects_{export_timestamp}.json"), 'r', encoding='utf-8') as f:
-            projects_data = json.load(f)
-        
-        project_count = 0
-        for project_data in projects_data:
-            # Buscar el owner por ID original
-            try:
-                owner = CustomUser.objects.get(id=project_data['owner_id'])
-                project, created = Project.objects.get_or_create(
-                    name=project_data['name'],
-                    defaults={
-                        'description': project_data['description'],
-                        'owner': owner,
-                    }
-                )
-                if created:
-                    project_count += 1
-            except CustomUser.DoesNotExist:
-                print(f"⚠️  Usuario con ID {project_data['owner_id']} no encontrado, saltando proyecto {project_data['name']}")
-        
-        print(f"✅ Importados {project_count} proyectos nuevos")
-        
-        # Importar tareas
-        print("📥 Importando tareas...")
-        with open(os.path.join(export_dir, f"tasks_{export_timestamp}.json"), 'r', encoding='utf-8') as f:
-            tasks_data = json.load(f)
-        
-        task_count = 0
-        for task_data in tasks_data:
-            try:
-                project = Project.objects.get(id=task_data['project_id'])
-                assignee = CustomUser.objects.get(id=task_data['assignee_id']) if task_data['assignee_id'] else None
-                
-                task, created = Task.objects.get_or_create(
-                    title=task_data['title'],
-                    project=project,
-                    defaults={
-                        'description': task_data['description'],
-                        'completed': task_data['completed'],
-                        'priority': task_data['priority'],
-                        'assignee': assignee,
-                    }
-                )
-                if created:
-                    task_count += 1
-            except (Project.DoesNotExist, CustomUser.DoesNotExist) as e:
-                print(f"⚠️  Error importando tarea {task_data['title']}: {e}")
-        
-        print(f"✅ Importadas {task_count} tareas nuevas")
-        
-        # Importar comentarios
-        print("📥 Importando comentarios...")
-        with open(os.path.join(export_dir, f"comments_{export_timestamp}.json"), 'r', encoding='utf-8') as f:
-            comments_data = json.load(f)
-        
-        comment_count = 0
-        for comment_data in comments_data:
-            try:
-                task = Task.objects.get(id=comment_data['task_id'])
-                user = CustomUser.objects.get(id=comment_data['user_id'])
-                
-                comment, created = Comment.objects.get_or_create(
-                    task=task,
-                    content=comment_data['content'],
-                    user=user,
-                    defaults={
-                        'created_at': comment_data['created_at'],
-                    }
-                )
-                if created:
-                    comment_count += 1
-            except (Task.DoesNotExist, CustomUser.DoesNotExist) as e:
-                print(f"⚠️  Error importando comentario: {e}")
-        
-        print(f"✅ Importados {comment_count} comentarios nuevos")
-        
-        # Importar historial de tareas
-        print("📥 Importando historial de tareas...")
-        with open(os.path.join(export_dir, f"task_history_{export_timestamp}.json"), 'r', encoding='utf-8') as f:
-            task_history_data = json.load(f)
-        
-        history_count = 0
-        for history_data in task_history_data:
-            try:
-                task = Task.objects.get(id=history_data['task_id'])
-                user = CustomUser.objects.get(id=history_data['user_id'])
-                
-                history, created = TaskHistory.objects.get_or_create(
-                    task=task,
-                    field_name=history_data['field_name'],
-                    old_value=history_data['old_value'],
-                    new_value=history_data['new_value'],
-                    user=user,
-                    defaults={
-                        'changed_at': history_data['changed_at'],
-                    }
-                )
-                if created:
-                    history_count += 1
-            except (Task.DoesNotExist, CustomUser.DoesNotExist) as e:
-                print(f"⚠️  Error importando historial: {e}")
-        
-        print(f"✅ Importado historial de {history_count} cambios nuevos")
-        
+        deleted = {}
+        if mode == 'incremental':
+            table_stats, deleted = import_delta(files, batch_size)
+        else:
+            id_maps = {}
+            table_stats = {}
+            for name, _, _ in TABLES:
+                print(f"📥 Importando {name}...")
+                stats = table_stats[name] = {'existing': 0, 'dropped': 0}
+                table_info = manifest['tables'][name]
+                checksum = table_info.get('sha256') or file_checksum(files[name])
+                import_table(name, files[name], table_info, checksum, id_maps, use_copy, batch_size, stats)
+                if 'skipped' in stats:
+                    print(f"⏭️  {name} ya se importó desde este fichero ({stats['skipped']} filas), se omite")
+                    continue
+                print(f"✅ Importadas {stats['rows']} filas de {name} en {stats['seconds']}s "
+                      f"({stats['rows_per_second']} filas/s)")
+                if stats['existing']:
+                    print(f"⚠️  {stats['existing']} usuarios ya existían, se reutilizan")
+                if stats['dropped']:
+                    print(f"⚠️  {stats['dropped']} filas no se insertaron (id ocupado o padre no importado)")
+
+        reset_sequences()
+
         # Crear resumen de importación
         import_summary = {
             'import_timestamp': datetime.now().isoformat(),
             'export_timestamp': export_timestamp,
-            'imported_counts': {
-                'users': user_count,
-                'projects': project_count,
-                'tasks': task_count,
-                'comments': comment_count,
-                'task_history': history_count,
-            },
+            'mode': mode,
+            'method': 'upsert' if mode == 'incremental' else ('copy' if use_copy else 'bulk_create'),
+            'imported_counts': {name: stats['rows'] for name, stats in table_stats.items()},
+            'deleted_counts': deleted,
+            'tables': table_stats,
             'total_counts': {
-                'users': CustomUser.objects.count(),
-                'projects': Project.objects.count(),
-                'tasks': Task.objects.count(),
-                'comments': Comment.objects.count(),
-                'task_history': TaskHistory.objects.count(),
+                name: model.objects.count() for name, model in MODELS.items()
             }
         }
-        
+
         with open(f"{export_dir}/import_summary_{export_timestamp}.json", 'w', encoding='utf-8') as f:
             json.dump(import_summary, f, indent=2, ensure_ascii=False)
-        
+
         print(f"\n🎉 Importación completada!")
         print(f"📊 Importados: {import_summary['imported_counts']}")
         print(f"📊 Totales en DB: {import_summary['total_counts']}")
         print(f"📄 Resumen guardado en: import_summary_{export_timestamp}.json")
-        
+
         return True
-        
+
     except Exception as e:
         print(f"❌ Error durante la importación: {e}")
         return False
 
 def main():
-    if len(sys.argv) != 2:
-        print("Uso: python import_postgresql_data.py <timestamp>")
-        print("Ejemplo: python import_postgresql_data.py 20250101_120000")
-        sys.exit(1)
-    
-    export_timestamp = sys.argv[1]
-    
+    parser = argparse.ArgumentParser(description='Importar una exportación a PostgreSQL')
+    parser.add_argument('timestamp', help='Timestamp de la exportación, p. ej. 20250101_120000')
+    parser.add_argument('--export-dir', default='fixtures/export',
+                        help='Directorio de la exportación (default: fixtures/export)')
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help='Filas por lote de COPY/bulk_create (default: 10000)')
+    parser.add_argument('--no-copy', action='store_true',
+                        help='Usar bulk_create aunque el motor sea PostgreSQL')
+    args = parser.parse_args()
+
     try:
-        success = import_data(export_timestamp)
+        success = import_data(args.timestamp, args.export_dir, args.batch_size, not args.no_copy)
         if success:
             print("\n✅ Importación exitosa!")
             sys.exit(0)
@@ -1,27 +1,121 @@
+from django import forms
 from django.contrib import admin
-from .models import Task, Comment, TaskHistory
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.utils.translation import gettext as _
+
+from config.pagination import EstimatedCountPaginator
+from .models import Task, Comment, TaskHistory, ReportJob, ReportVariant
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Filtro por una clave ajena con un desplegable de autocompletado (la vista
+    autocomplete del admin, que busca con los search_fields del modelo
+    relacionado) en lugar de listar en la barra lateral todos sus objetos.
+    """
+    template = 'admin/tasks/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        related = field.remote_field.model
+        form_field = forms.ModelChoiceField(
+            queryset=related._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site, attrs={'style': 'width: 100%'}),
+            required=False,
+        )
+        self.widget = form_field.widget.render(
+            self.lookup_kwarg, self.lookup_val, attrs={'id': f'autocomplete_filter_{field_path}'}
+        )
+
+    def field_choices(self, field, request, model_admin):
+        # El widget solo carga el objeto seleccionado; el resto se busca al escribir
+        return []
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None and not self.lookup_val_isnull,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            'display': _('All'),
+        }
+
+
+class HistoryFieldFilter(admin.SimpleListFilter):
+    """Campos editables de Task, sin un SELECT DISTINCT sobre todo el historial"""
+    title = 'campo'
+    parameter_name = 'field_name'
+    FIELDS = ['title', 'description', 'completed', 'status', 'priority', 'due_date', 'project', 'assignee']
+
+    def lookups(self, request, model_admin):
+        return [(name, name) for name in self.FIELDS]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(field_name=self.value())
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist de tablas grandes: total estimado y sin el segundo COUNT(*) del total sin filtrar"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        # AutocompleteFilter necesita select2 también en el changelist
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=['admin/tasks/autocomplete_filter.js'])
+        )
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(LargeTableAdmin):
     list_display = ['title', 'project', 'assignee', 'priority', 'completed', 'created_at', 'due_date']
-    list_filter = ['completed', 'priority', 'project', 'assignee', 'created_at', 'due_date']
+    list_filter = [
+        'completed', 'priority', ('project', AutocompleteFilter), ('assignee', AutocompleteFilter),
+        'created_at', 'due_date',
+    ]
+    list_select_related = ['project', 'assignee']
+    autocomplete_fields = ['project', 'assignee']
     search_fields = ['title', 'description']
     readonly_fields = ['created_at']
     list_editable = ['completed', 'priority']
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ['task', 'user', 'content', 'created_at']
-    list_filter = ['created_at', 'user', 'task']
+    list_filter = ['created_at', ('user', AutocompleteFilter), ('task', AutocompleteFilter)]
+    list_select_related = ['task', 'user']
+    autocomplete_fields = ['task', 'user']
     search_fields = ['content', 'task__title', 'user__username']
     readonly_fields = ['created_at', 'updated_at']
 
 
 @admin.register(TaskHistory)
-class TaskHistoryAdmin(admin.ModelAdmin):
+class TaskHistoryAdmin(LargeTableAdmin):
     list_display = ['task', 'user', 'field_name', 'changed_at']
-    list_filter = ['field_name', 'changed_at', 'user', 'task']
+    list_filter = [HistoryFieldFilter, 'changed_at', ('user', AutocompleteFilter), ('task', AutocompleteFilter)]
+    list_select_related = ['task', 'user']
+    autocomplete_fields = ['task', 'user']
     search_fields = ['field_name', 'task__title', 'user__username']
-    readonly_fields = ['changed_at'] 
\ No newline at end of file
+    readonly_fields = ['changed_at']
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['report', 'status', 'requested_by', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'report', 'created_at']
+    search_fields = ['id', 'requested_by__username']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'worker', 'result_file', 'error']
+
+
+@admin.register(ReportVariant)
+class ReportVariantAdmin(admin.ModelAdmin):
+    list_display = ['report', 'params', 'hits', 'last_requested_at', 'last_warmed_at', 'last_duration_ms']
+    list_filter = ['report']
+    readonly_fields = ['key', 'last_requested_at', 'last_warmed_at', 'last_duration_ms']
@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'tasks' 
\ No newline at end of file
+    name = 'tasks'
+
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
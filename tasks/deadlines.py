@@ -0,0 +1,62 @@
+"""
+Seguimiento de fechas límite.
+
+Task.is_overdue marca las tareas pendientes cuya fecha límite ya pasó, de modo
+que las listas y los conteos de vencidas son búsquedas por igualdad en un
+campo indexado en lugar de comparar due_date con la hora actual en cada
+petición. Task.save() lo recalcula al guardar; manage.py track_deadlines lo
+activa en el momento en que vence cada tarea:
+
+- carga en un heap las fechas límite de los próximos DEADLINE_LOOKAHEAD
+  segundos (rango sobre el índice parcial tasks_task_upcoming_due);
+- duerme hasta la primera y entonces marca todas las tareas ya vencidas y
+  envía la señal task_overdue con sus ids;
+- cada DEADLINE_RELOAD_INTERVAL segundos vuelve a cargar el heap, para ver
+  las tareas creadas o cambiadas desde la última carga, y corrige las marcas
+  que dejaron mal las actualizaciones que no pasan por save() (update(),
+  bulk_create()...).
+"""
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Task
+from .signals import task_overdue
+
+BATCH_SIZE = 1000
+
+
+def upcoming(until):
+    """[(due_date, id)] de las tareas pendientes que vencen hasta until, por fecha"""
+    return list(
+        Task.objects.filter(completed=False, is_overdue=False, due_date__isnull=False, due_date__lte=until)
+        .order_by('due_date', 'pk')
+        .values_list('due_date', 'pk')
+    )
+
+
+def mark_overdue(now=None):
+    """Marcar las tareas pendientes que ya vencieron y avisar con task_overdue; devuelve sus ids"""
+    now = now or timezone.now()
+    marked = []
+    due = Task.objects.filter(completed=False, is_overdue=False, due_date__isnull=False, due_date__lte=now)
+    while True:
+        with transaction.atomic():
+            # Bloqueadas para que un save() concurrente no cambie la fecha entre la consulta y la marca
+            task_ids = list(due.select_for_update(skip_locked=True).order_by().values_list('pk', flat=True)[:BATCH_SIZE])
+            if not task_ids:
+                break
+            Task.objects.filter(pk__in=task_ids).update(is_overdue=True)
+        marked.extend(task_ids)
+    if marked:
+        task_overdue.send(sender=Task, task_ids=marked, now=now)
+    return marked
+
+
+def clear_stale(now=None):
+    """Quitar la marca a las tareas que ya no están vencidas; devuelve cuántas"""
+    now = now or timezone.now()
+    return Task.objects.filter(is_overdue=True).filter(
+        Q(completed=True) | Q(due_date__isnull=True) | Q(due_date__gt=now)
+    ).update(is_overdue=False)
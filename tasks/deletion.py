@@ -0,0 +1,110 @@
+"""
+Borrado rápido de proyectos y tareas.
+
+Project.delete() y Task.delete() emulan on_delete=CASCADE con el Collector de
+Django, que carga en memoria cada tarea, comentario y cambio del historial
+(record_deletion e invalidate_reports le impiden usar el borrado rápido). Con
+decenas de miles de tareas eso tarda minutos. Aquí se borra directamente en la
+base de datos, por lotes de PROJECT_DELETE_BATCH_SIZE tareas: primero su
+historial y sus comentarios y después las tareas; al final, el proyecto.
+
+Como record_deletion, solo se registra el tombstone del objeto que originó el
+borrado; lo demás se borra en cascada al aplicarlo en otro entorno.
+
+Los proyectos con más de PROJECT_DELETE_BACKGROUND_THRESHOLD tareas se marcan
+con deleting_at y se ocultan al momento; run_report_worker los borra después.
+Borrar dos veces el mismo proyecto no tiene efecto: los lotes ya borrados no
+se repiten y el tombstone solo se crea si el proyecto seguía existiendo.
+"""
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from projects.models import Project
+from . import report_cache
+from .models import Comment, DeletedRecord, Task, TaskHistory
+
+
+def batch_size():
+    return getattr(settings, 'PROJECT_DELETE_BATCH_SIZE', 1000)
+
+
+def _raw_delete(queryset):
+    # DELETE directo, sin cargar los objetos ni enviar señales
+    return queryset._raw_delete(router.db_for_write(queryset.model))
+
+
+def _delete_tasks(task_ids):
+    """Borrar unas tareas con su historial y sus comentarios; devuelve las tareas borradas"""
+    _raw_delete(TaskHistory.objects.filter(task_id__in=task_ids))
+    _raw_delete(Comment.objects.filter(task_id__in=task_ids))
+    return _raw_delete(Task.objects.filter(pk__in=task_ids))
+
+
+def delete_task(task):
+    """Borrar una tarea sin pasar por el Collector"""
+    with transaction.atomic():
+        deleted = _delete_tasks([task.pk])
+        if deleted:
+            DeletedRecord.objects.create(model=Task._meta.label, object_id=task.pk)
+    report_cache.invalidate()
+    return deleted
+
+
+def _delete_task_batches(tasks):
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            task_ids = list(tasks.values_list('pk', flat=True)[:batch_size()])
+            if not task_ids:
+                return deleted
+            deleted += _delete_tasks(task_ids)
+
+
+def delete_project(project_id):
+    """
+    Borrar un proyecto y todas sus tareas por lotes, cada uno en su propia
+    transacción. Devuelve el número de tareas borradas.
+    """
+    tasks = Task.objects.filter(project_id=project_id).order_by()
+    deleted = _delete_task_batches(tasks)
+    with transaction.atomic():
+        # Con el proyecto bloqueado no se le pueden añadir tareas; las creadas
+        # mientras se borraban los lotes se borran aquí
+        if Project.objects.select_for_update().filter(pk=project_id).values_list('pk', flat=True):
+            deleted += _delete_task_batches(tasks)
+            if _raw_delete(Project.objects.filter(pk=project_id)):
+                DeletedRecord.objects.create(model=Project._meta.label, object_id=project_id)
+    report_cache.invalidate()
+    return deleted
+
+
+def run(project_id):
+    """Borrar un proyecto marcado desde el pool de run_report_worker"""
+    try:
+        return delete_project(project_id)
+    finally:
+        # Cada hilo o proceso del pool tiene sus propias conexiones
+        connections.close_all()
+
+
+def runs_in_background(project):
+    return project.tasks.count() > getattr(settings, 'PROJECT_DELETE_BACKGROUND_THRESHOLD', 5000)
+
+
+def schedule_project(project):
+    """Marcar un proyecto para borrarlo en segundo plano; deja de mostrarse al momento"""
+    project.deleting_at = timezone.now()
+    project.save(update_fields=['deleting_at'])
+
+
+def next_pending(exclude=()):
+    """Id del proyecto marcado para borrar más antiguo (o None)"""
+    return (
+        Project.objects.filter(deleting_at__isnull=False)
+        .exclude(pk__in=exclude)
+        .order_by('deleting_at')
+        .values_list('pk', flat=True)
+        .first()
+    )
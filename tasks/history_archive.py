@@ -0,0 +1,250 @@
+"""
+Archivo de TaskHistory en ficheros NDJSON comprimidos.
+
+manage.py archive_task_history mueve los meses más antiguos que
+TASK_HISTORY_RETENTION_MONTHS a TASK_HISTORY_ARCHIVE_DIR:
+
+- task_history_AAAA_MM.ndjson.gz: una fila JSON por línea, ordenadas por
+  tarea y fecha, en bloques gzip independientes de ~BLOCK_BYTES (un gzip de
+  varios miembros, legible con zcat);
+- task_history_AAAA_MM.index.json: primera y última tarea, posición y tamaño
+  de cada bloque. Se escribe el último: un mes sin índice no está archivado.
+
+Después se borra la partición del mes (o sus filas, si la tabla no está
+particionada). Para leer el historial archivado de una tarea basta con
+descomprimir los bloques cuyo rango de tareas la incluye.
+"""
+
+import bisect
+import gzip
+import heapq
+import json
+import os
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from . import history_partitions
+from .models import TaskHistory
+
+BLOCK_BYTES = 256 * 1024
+ITERATOR_CHUNK_SIZE = 5000
+DELETE_BATCH_SIZE = 10000
+FIELDS = ('id', 'task_id', 'user_id', 'field_name', 'old_value', 'new_value', 'changed_at')
+
+_FILE_RE = re.compile(r'^task_history_(\d{4})_(\d{2})\.index\.json$')
+
+# Índices leídos: ruta -> (mtime, índice)
+_index_cache = {}
+
+
+def archive_dir():
+    return str(getattr(settings, 'TASK_HISTORY_ARCHIVE_DIR', settings.BASE_DIR / 'history_archive'))
+
+
+def _paths(month):
+    base = os.path.join(archive_dir(), f'task_history_{month.year:04d}_{month.month:02d}')
+    return f'{base}.ndjson.gz', f'{base}.index.json'
+
+
+def archived_months():
+    """Meses archivados (primer instante en UTC), del más antiguo al más nuevo"""
+    try:
+        names = os.listdir(archive_dir())
+    except FileNotFoundError:
+        return []
+    months = []
+    for name in names:
+        match = _FILE_RE.match(name)
+        if match:
+            months.append(datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc))
+    return sorted(months)
+
+
+def load_index(month):
+    _, index_path = _paths(month)
+    try:
+        mtime = os.stat(index_path).st_mtime
+    except FileNotFoundError:
+        return None
+    cached = _index_cache.get(index_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    _index_cache[index_path] = (mtime, index)
+    return index
+
+
+def _row_to_json(row):
+    row = dict(row, changed_at=row['changed_at'].isoformat())
+    return json.dumps(row, ensure_ascii=False, separators=(',', ':'))
+
+
+def _sort_key(row):
+    return row['task_id'], row['changed_at'], row['id']
+
+
+def read_month(month):
+    """Todas las filas archivadas de un mes, en el orden del fichero"""
+    data_path, _ = _paths(month)
+    if load_index(month) is None:
+        return
+    with gzip.open(data_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            row = json.loads(line)
+            row['changed_at'] = parse_datetime(row['changed_at'])
+            yield row
+
+
+def write_month(month, rows):
+    """
+    Escribir las filas (dicts ordenados por tarea, fecha e id) de un mes.
+    Se escribe en ficheros temporales y se renombran al terminar.
+    """
+    os.makedirs(archive_dir(), exist_ok=True)
+    data_path, index_path = _paths(month)
+    blocks = []
+    total = 0
+    with open(f'{data_path}.tmp', 'wb') as f:
+        lines = []
+        size = 0
+        first_task = last_task = None
+
+        def write_block():
+            compressed = gzip.compress('\n'.join(lines).encode('utf-8') + b'\n', mtime=0)
+            blocks.append([first_task, last_task, f.tell(), len(compressed), len(lines)])
+            f.write(compressed)
+
+        for row in rows:
+            line = _row_to_json(row)
+            if first_task is None:
+                first_task = row['task_id']
+            last_task = row['task_id']
+            lines.append(line)
+            size += len(line)
+            total += 1
+            if size >= BLOCK_BYTES:
+                write_block()
+                lines, size, first_task = [], 0, None
+        if lines:
+            write_block()
+        f.flush()
+        os.fsync(f.fileno())
+
+    index = {
+        'month': f'{month.year:04d}-{month.month:02d}',
+        'rows': total,
+        'fields': FIELDS,
+        # [primera tarea, última tarea, posición, bytes, filas]
+        'blocks': blocks,
+    }
+    with open(f'{index_path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(f'{data_path}.tmp', data_path)
+    os.replace(f'{index_path}.tmp', index_path)
+    return total
+
+
+def month_rows(month):
+    """Filas en la base de datos de un mes, ordenadas como en el archivo"""
+    end = history_partitions.add_months(month, 1)
+    return (
+        TaskHistory.objects.filter(changed_at__gte=month, changed_at__lt=end)
+        .order_by('task_id', 'changed_at', 'id')
+        .values(*FIELDS)
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+
+
+def _unique(rows):
+    last_id = None
+    for row in rows:
+        if row['id'] != last_id:
+            yield row
+        last_id = row['id']
+
+
+def archive_month(month):
+    """
+    Archivar las filas de un mes y quitarlas de la base de datos. Si el mes
+    ya estaba archivado (filas que llegaron después), se combinan con las del
+    fichero existente. Devuelve las filas archivadas en total.
+    """
+    end = history_partitions.add_months(month, 1)
+    live = TaskHistory.objects.filter(changed_at__gte=month, changed_at__lt=end)
+    if load_index(month) is not None:
+        # Si una ejecución anterior se interrumpió antes de borrar las filas,
+        # están en los dos lados: al combinar quedan seguidas y se descartan
+        merged = heapq.merge(read_month(month), month_rows(month), key=_sort_key)
+        written = write_month(month, _unique(merged))
+    else:
+        expected = live.count()
+        if not expected:
+            history_partitions.drop_partition(month)
+            return 0
+        written = write_month(month, month_rows(month))
+        if written != expected:
+            raise RuntimeError(f'Se esperaban {expected} filas de {month:%Y-%m} y se archivaron {written}')
+
+    history_partitions.drop_partition(month)
+    # Tabla sin particionar, o filas del mes que quedaron en la partición por defecto
+    while True:
+        with transaction.atomic():
+            ids = list(live.order_by().values_list('id', flat=True)[:DELETE_BATCH_SIZE])
+            if not ids:
+                break
+            live.filter(id__in=ids).delete()
+    return written
+
+
+def task_history(task_id, since=None):
+    """
+    Filas archivadas de una tarea (dicts), de la más reciente a la más antigua.
+    Con since (datetime) solo se leen los meses desde ese instante, p. ej. la
+    creación de la tarea.
+    """
+    rows = []
+    first_month = history_partitions.month_start(since) if since else None
+    for month in archived_months():
+        if first_month and month < first_month:
+            continue
+        index = load_index(month)
+        if index is None:
+            continue
+        blocks = index['blocks']
+        # Los bloques están ordenados por tarea: los candidatos empiezan en el
+        # primero cuya última tarea es >= task_id
+        start = bisect.bisect_left([block[1] for block in blocks], task_id)
+        data_path, _ = _paths(month)
+        with open(data_path, 'rb') as f:
+            for first_task, last_task, offset, length, _ in blocks[start:]:
+                if first_task > task_id:
+                    break
+                f.seek(offset)
+                for line in gzip.decompress(f.read(length)).decode('utf-8').splitlines():
+                    row = json.loads(line)
+                    if row['task_id'] == task_id:
+                        row['changed_at'] = parse_datetime(row['changed_at'])
+                        rows.append(row)
+    rows.sort(key=lambda row: (row['changed_at'], row['id']), reverse=True)
+    return rows
+
+
+def archived_history(task):
+    """
+    Historial archivado de una tarea como instancias de TaskHistory (sin
+    guardar), de la más reciente a la más antigua. Como en la base de datos,
+    se omiten los cambios de usuarios que ya no existen.
+    """
+    from django.contrib.auth import get_user_model
+
+    rows = task_history(task.pk, since=task.created_at)
+    users = get_user_model().objects.in_bulk({row['user_id'] for row in rows})
+    return [
+        TaskHistory(task=task, user=users[row.pop('user_id')], **{k: v for k, v in row.items() if k != 'task_id'})
+        for row in rows if row['user_id'] in users
+    ]
@@ -0,0 +1,133 @@
+"""
+Particionado mensual de TaskHistory en PostgreSQL.
+
+La migración 0007 convierte tasks_taskhistory en una tabla particionada por
+rango de changed_at, con una partición por mes natural en UTC
+(tasks_taskhistory_pAAAA_MM) y una partición por defecto para las filas que no
+caen en ninguna. manage.py archive_task_history crea por adelantado las
+particiones de los próximos meses y desmonta las antiguas al archivarlas.
+
+En otros motores (SQLite en local) la tabla es normal y estas funciones no
+hacen nada: is_partitioned() devuelve False.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+
+TABLE = 'tasks_taskhistory'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def month_start(moment):
+    """Primer instante (UTC) del mes de moment"""
+    moment = moment.astimezone(dt_timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month.year:04d}_{month.month:02d}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """[(nombre, primer mes)] de las particiones mensuales, de la más antigua a la más nueva"""
+    if not is_partitioned():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(%s)', [TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    prefix = f'{TABLE}_p'
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        year, month = name[len(prefix):].split('_')
+        partitions.append((name, datetime(int(year), int(month), 1, tzinfo=dt_timezone.utc)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(cursor, month):
+    """
+    Crear la partición de un mes. Si la partición por defecto tiene filas de
+    ese mes, se mueven a la nueva antes de adjuntarla (PostgreSQL no permite
+    adjuntar un rango que la partición por defecto ya contiene).
+    """
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+    cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+        f'WHERE changed_at >= %s AND changed_at < %s RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved',
+        [start, end],
+    )
+    cursor.execute(
+        f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+        [start, end],
+    )
+    return name
+
+
+def ensure_partitions(through):
+    """Crear las particiones que falten desde el mes actual hasta el mes through; devuelve las creadas"""
+    if not is_partitioned():
+        return []
+    existing = {month for _, month in list_partitions()}
+    month = month_start(datetime.now(dt_timezone.utc))
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        while month <= through:
+            if month not in existing:
+                created.append(create_partition(cursor, month))
+            month = add_months(month, 1)
+    return created
+
+
+def drop_partition(month):
+    """Desmontar y borrar la partición de un mes; False si no existe"""
+    name = partition_name(month)
+    if name not in {partition for partition, _ in list_partitions()}:
+        return False
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+        cursor.execute(f'DROP TABLE "{name}"')
+    return True
+
+
+def default_partition_months(before):
+    """Meses (UTC) con filas anteriores a before en la partición por defecto"""
+    if not is_partitioned():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', changed_at AT TIME ZONE 'UTC') "
+            f'FROM "{DEFAULT_PARTITION}" WHERE changed_at < %s', [before]
+        )
+        return sorted(row[0].replace(tzinfo=dt_timezone.utc) for row in cursor.fetchall())
+
+
+def estimated_rows(name):
+    """Filas estimadas de una partición según las estadísticas de PostgreSQL"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [name])
+        row = cursor.fetchone()
+    return max(row[0], 0) if row else 0
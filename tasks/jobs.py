@@ -0,0 +1,130 @@
+"""
+Cola de reportes en segundo plano respaldada por la base de datos.
+
+Las peticiones crean un ReportJob en estado 'queued' y responden al momento.
+Uno o varios workers (manage.py run_report_worker) reclaman trabajos con
+SELECT ... FOR UPDATE SKIP LOCKED, de modo que dos workers nunca toman el mismo,
+calculan el reporte y guardan el resultado en REPORT_JOBS_DIR/<id>.json. No hace
+falta ningún broker: basta con la base de datos y un directorio compartido.
+
+Un trabajo 'running' cuyo worker murió se vuelve a reclamar pasado
+REPORT_JOB_TIMEOUT, hasta REPORT_JOB_MAX_ATTEMPTS intentos.
+"""
+
+import json
+import logging
+import os
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+# Reporte -> método de ChartsViewSet que calcula sus datos a partir de los filtros
+REPORTS = {
+    'projects_report': 'projects_report_data',
+    'project_time_report': 'project_time_report_data',
+    'user_productivity_report': 'user_productivity_report_data',
+}
+REPORT_PARAMS = ('start_date', 'end_date', 'project_id', 'user_id')
+
+
+def jobs_dir():
+    return str(getattr(settings, 'REPORT_JOBS_DIR', settings.BASE_DIR / 'report_results'))
+
+
+def result_path(job):
+    return os.path.join(jobs_dir(), job.result_file or f'{job.pk}.json')
+
+
+def submit(report, params, user):
+    """Encolar un reporte; si el mismo usuario ya tiene uno idéntico pendiente, se reutiliza"""
+    params = {key: str(value) for key, value in params.items() if key in REPORT_PARAMS and value not in (None, '')}
+    existing = ReportJob.objects.filter(
+        report=report, params=params, requested_by=user, status__in=['queued', 'running']
+    ).first()
+    if existing:
+        return existing, False
+    return ReportJob.objects.create(report=report, params=params, requested_by=user), True
+
+
+def claim(worker):
+    """Reclamar el trabajo más antiguo disponible (o None), marcándolo como 'running'"""
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 600))
+    max_attempts = getattr(settings, 'REPORT_JOB_MAX_ATTEMPTS', 3)
+    with transaction.atomic():
+        job = (
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='queued') | Q(status='running', started_at__lt=now - lease))
+            .filter(attempts__lt=max_attempts)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        # En motores sin FOR UPDATE (SQLite) esta actualización condicional
+        # es la que garantiza que solo un worker se quede con el trabajo
+        claimed = ReportJob.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+            status='running', started_at=now, attempts=F('attempts') + 1, worker=worker
+        )
+        if not claimed:
+            return None
+    job.refresh_from_db()
+    return job
+
+
+def run(job_id):
+    """Calcular el reporte de un trabajo reclamado y guardar su resultado"""
+    from .views_charts import ChartsViewSet
+
+    job = ReportJob.objects.get(pk=job_id)
+    try:
+        data = getattr(ChartsViewSet(), REPORTS[job.report])(job.params)
+        os.makedirs(jobs_dir(), exist_ok=True)
+        filename = f'{job.pk}.json'
+        tmp_path = os.path.join(jobs_dir(), f'{filename}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, os.path.join(jobs_dir(), filename))
+        ReportJob.objects.filter(pk=job.pk, worker=job.worker).update(
+            status='done', result_file=filename, finished_at=timezone.now(), error=''
+        )
+        return 'done'
+    except Exception:
+        logger.exception('Error calculando el reporte %s (%s)', job.report, job.pk)
+        ReportJob.objects.filter(pk=job.pk, worker=job.worker).update(
+            status='failed', finished_at=timezone.now(), error=traceback.format_exc()[-4000:]
+        )
+        return 'failed'
+    finally:
+        # Cada hilo o proceso del pool tiene sus propias conexiones
+        connections.close_all()
+
+
+def expire_stale():
+    """Marcar como fallidos los trabajos que agotaron sus intentos sin terminar"""
+    lease = timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 600))
+    return ReportJob.objects.filter(
+        status='running',
+        started_at__lt=timezone.now() - lease,
+        attempts__gte=getattr(settings, 'REPORT_JOB_MAX_ATTEMPTS', 3),
+    ).update(status='failed', finished_at=timezone.now(), error='Tiempo de ejecución agotado')
+
+
+def purge_expired():
+    """Borrar los trabajos terminados (y sus ficheros) más antiguos que REPORT_JOB_RETENTION_HOURS"""
+    cutoff = timezone.now() - timedelta(hours=getattr(settings, 'REPORT_JOB_RETENTION_HOURS', 24))
+    expired = ReportJob.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff)
+    for job in expired.exclude(result_file=''):
+        try:
+            os.remove(result_path(job))
+        except FileNotFoundError:
+            pass
+    return expired.delete()[0]
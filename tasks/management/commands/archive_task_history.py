@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db.models.functions import TruncMonth
+from datetime import datetime, timezone as dt_timezone
+import time
+
+from tasks import history_archive, history_partitions
+from tasks.models import TaskHistory
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea las particiones mensuales de TaskHistory de los próximos meses y archiva '
+        'en ficheros NDJSON comprimidos los meses más antiguos que la retención'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months',
+            type=int,
+            default=getattr(settings, 'TASK_HISTORY_RETENTION_MONTHS', 12),
+            help='Meses que se mantienen en la base de datos, además del actual '
+                 '(por defecto TASK_HISTORY_RETENTION_MONTHS)'
+        )
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=getattr(settings, 'TASK_HISTORY_PARTITIONS_AHEAD', 3),
+            help='Meses futuros con partición ya creada (por defecto TASK_HISTORY_PARTITIONS_AHEAD)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar qué meses se archivarían sin tocar nada'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Mostrar las particiones y los meses archivados'
+        )
+
+    def handle(self, *args, **options):
+        if options['keep_months'] < 1:
+            raise CommandError('--keep-months debe ser al menos 1')
+        if options['list']:
+            self._list()
+            return
+
+        partitioned = history_partitions.is_partitioned()
+        current = history_partitions.month_start(datetime.now(dt_timezone.utc))
+        cutoff = history_partitions.add_months(current, -options['keep_months'])
+
+        if not partitioned:
+            self.stdout.write('ℹ️  La tabla de historial no está particionada (solo PostgreSQL): se archivan filas')
+        elif not options['dry_run']:
+            created = history_partitions.ensure_partitions(
+                history_partitions.add_months(current, options['ahead'])
+            )
+            for name in created:
+                self.stdout.write(self.style.SUCCESS(f'🧱 Partición creada: {name}'))
+
+        months = self._months_before(cutoff, partitioned)
+        if not months:
+            self.stdout.write(f'✅ Nada que archivar anterior a {cutoff:%Y-%m}')
+            return
+
+        for month in months:
+            if options['dry_run']:
+                self.stdout.write(f'📦 Se archivaría {month:%Y-%m}')
+                continue
+            started = time.monotonic()
+            rows = history_archive.archive_month(month)
+            self.stdout.write(self.style.SUCCESS(
+                f'📦 {month:%Y-%m}: {rows} filas archivadas en {time.monotonic() - started:.1f}s'
+            ))
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {len(months)} meses archivados en {history_archive.archive_dir()}'
+            ))
+
+    def _months_before(self, cutoff, partitioned):
+        """Meses anteriores a cutoff con filas o con partición en la base de datos"""
+        if partitioned:
+            months = {month for _, month in history_partitions.list_partitions() if month < cutoff}
+            months.update(history_partitions.default_partition_months(cutoff))
+        else:
+            months = set(
+                TaskHistory.objects.filter(changed_at__lt=cutoff)
+                .annotate(month=TruncMonth('changed_at', tzinfo=dt_timezone.utc))
+                .order_by().values_list('month', flat=True).distinct()
+            )
+        return sorted(months)
+
+    def _list(self):
+        if history_partitions.is_partitioned():
+            for name, month in history_partitions.list_partitions():
+                self.stdout.write(f'🧱 {month:%Y-%m}  {name}  (~{history_partitions.estimated_rows(name)} filas)')
+            default = history_partitions.DEFAULT_PARTITION
+            self.stdout.write(f'🧱 defecto  {default}  (~{history_partitions.estimated_rows(default)} filas)')
+        else:
+            self.stdout.write('ℹ️  La tabla de historial no está particionada')
+        for month in history_archive.archived_months():
+            index = history_archive.load_index(month)
+            self.stdout.write(f'📦 {month:%Y-%m}  archivado  ({index["rows"]} filas, {len(index["blocks"])} bloques)')
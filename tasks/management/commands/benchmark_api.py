@@ -0,0 +1,351 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+import json
+import os
+import random
+import statistics
+import time
+from rest_framework.authtoken.models import Token
+
+from projects.models import Project
+from tasks.models import Task
+
+User = get_user_model()
+
+# Mezcla de peticiones: (nombre, peso, método, ruta). Los pesos reproducen el
+# tráfico habitual: sobre todo listados y detalle, algo de gráficos y reportes.
+# Los escenarios que no son GET cambian datos reales (e invalidan la caché de
+# reportes a mitad de la medición): solo se ejecutan con --include-writes o si
+# se nombran en --only.
+SCENARIOS = [
+    ('tasks_list', 20, 'GET', '/api/tasks/'),
+    ('tasks_list_filtered', 8, 'GET', '/api/tasks/?project={project_id}&completed=false&ordering=-due_date'),
+    ('tasks_search', 4, 'GET', '/api/tasks/?search=implementar'),
+    ('task_detail', 15, 'GET', '/api/tasks/{task_id}/'),
+    ('task_history', 3, 'GET', '/api/tasks/{task_id}/history/'),
+    ('task_full', 5, 'GET', '/api/tasks/{task_id}/full/'),
+    ('task_comments', 5, 'GET', '/api/tasks/{task_id}/comments/'),
+    ('my_tasks', 6, 'GET', '/api/tasks/my_tasks/'),
+    ('overdue', 3, 'GET', '/api/tasks/overdue/'),
+    ('toggle_complete', 2, 'POST', '/api/tasks/{task_id}/toggle_complete/'),
+    ('projects_list', 10, 'GET', '/api/projects/'),
+    ('project_detail', 5, 'GET', '/api/projects/{project_id}/'),
+    ('project_stats', 3, 'GET', '/api/projects/{project_id}/stats/'),
+    ('users_me', 4, 'GET', '/api/users/me/'),
+    ('charts_dashboard', 4, 'GET', '/api/charts/dashboard/'),
+    ('charts_dashboard_stats', 4, 'GET', '/api/charts/dashboard_stats/'),
+    ('charts_priority_distribution', 2, 'GET', '/api/charts/priority_distribution/'),
+    ('charts_project_progress', 2, 'GET', '/api/charts/project_progress/'),
+    ('charts_completed_by_period', 2, 'GET', '/api/charts/tasks_completed_by_period/?period=month'),
+    ('charts_user_activity', 1, 'GET', '/api/charts/user_activity/'),
+    ('charts_projects_report', 1, 'GET', '/api/charts/projects_report/'),
+]
+
+
+def percentile(values, fraction):
+    """Percentil por interpolación lineal sobre valores ordenados"""
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia, rendimiento y consultas SQL por endpoint con una mezcla realista de peticiones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Número total de peticiones medidas (default: 1000)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Peticiones simultáneas (default: 4)',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=50,
+            help='Peticiones de calentamiento no medidas (default: 50)',
+        )
+        parser.add_argument(
+            '--base-url',
+            help='URL de un servidor en marcha (p. ej. http://localhost:8000); '
+                 'por defecto se usa el cliente de pruebas de Django en proceso',
+        )
+        parser.add_argument(
+            '--username',
+            help='Usuario con el que se autentican las peticiones (default: primer superusuario)',
+        )
+        parser.add_argument(
+            '--seed-scale',
+            type=float,
+            help='Si la base de datos no tiene tareas, generarlas con seed_large_dataset a esta escala',
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            metavar='ESCENARIO',
+            help='Ejecutar solo estos escenarios',
+        )
+        parser.add_argument(
+            '--include-writes',
+            action='store_true',
+            help='Incluir los escenarios que modifican datos (p. ej. toggle_complete)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semilla para elegir peticiones e ids (default: 42)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Fichero JSON de resultados (default: benchmarks/api_<timestamp>.json)',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Fichero JSON de una ejecución anterior con el que comparar',
+        )
+        parser.add_argument(
+            '--fail-threshold',
+            type=float,
+            help='Terminar con error si el p95 de algún endpoint empeora más de este %% '
+                 'o aumentan sus consultas respecto a --compare',
+        )
+
+    def handle(self, *args, **options):
+        scenarios = self.select_scenarios(options)
+
+        if not Task.objects.exists():
+            if options['seed_scale'] is None:
+                raise CommandError(
+                    'No hay tareas en la base de datos; usa --seed-scale para generar datos'
+                )
+            call_command('seed_large_dataset', scale=options['seed_scale'], seed=options['seed'])
+
+        user = self.get_user(options['username'])
+        token, _ = Token.objects.get_or_create(user=user)
+        ids = {
+            'task_id': list(Task.objects.order_by('?').values_list('id', flat=True)[:500]),
+            'project_id': list(Project.objects.order_by('?').values_list('id', flat=True)[:100]),
+        }
+        if not ids['project_id']:
+            raise CommandError('No hay proyectos en la base de datos')
+
+        rng = random.Random(options['seed'])
+        weights = [scenario[1] for scenario in scenarios]
+        plan = []
+        for _ in range(options['warmup'] + options['requests']):
+            name, _, method, path = rng.choices(scenarios, weights=weights)[0]
+            plan.append((name, method, path.format(**{key: rng.choice(values) for key, values in ids.items()})))
+        warmup, measured = plan[:options['warmup']], plan[options['warmup']:]
+
+        if options['base_url']:
+            send = self.live_sender(options['base_url'], token.key)
+        else:
+            send = self.client_sender(token.key)
+        target = options['base_url'] or 'cliente de pruebas (en proceso)'
+        self.stdout.write(self.style.SUCCESS(
+            f"🚀 {options['requests']} peticiones, concurrencia {options['concurrency']}, "
+            f"{len(scenarios)} escenarios contra {target}"
+        ))
+
+        self.run(send, warmup, options['concurrency'])
+        start = time.perf_counter()
+        samples = self.run(send, measured, options['concurrency'])
+        elapsed = time.perf_counter() - start
+
+        results = self.summarize(samples, elapsed, options)
+        self.print_results(results)
+
+        output = options['output'] or os.path.join(
+            'benchmarks', f"api_{timezone.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        self.stdout.write(f'\n📄 Resultados guardados en: {output}')
+
+        if options['compare']:
+            regressions = self.compare(results, options['compare'], options['fail_threshold'])
+            if regressions and options['fail_threshold'] is not None:
+                raise CommandError(f"Regresiones en: {', '.join(regressions)}")
+
+    def select_scenarios(self, options):
+        scenarios = SCENARIOS
+        if options['only']:
+            unknown = set(options['only']) - {scenario[0] for scenario in SCENARIOS}
+            if unknown:
+                raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario[0] in options['only']]
+        elif not options['include_writes']:
+            scenarios = [scenario for scenario in scenarios if scenario[2] == 'GET']
+        if not scenarios:
+            raise CommandError('No queda ningún escenario que ejecutar')
+        return scenarios
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'No existe el usuario {username}')
+        user = User.objects.filter(is_superuser=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No hay superusuarios; indica uno con --username')
+        return user
+
+    def client_sender(self, token):
+        """Peticiones con el cliente de pruebas, contando las consultas SQL de cada una"""
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'testserver')
+
+        def send(method, path):
+            client = Client(HTTP_AUTHORIZATION=f'Token {token}', HTTP_HOST=host)
+            with ExitStack() as stack:
+                contexts = [stack.enter_context(CaptureQueriesContext(connection))
+                            for connection in connections.all()]
+                start = time.perf_counter()
+                response = client.generic(method, path)
+                latency = (time.perf_counter() - start) * 1000
+            return response.status_code, latency, sum(len(context) for context in contexts)
+
+        return send
+
+    def live_sender(self, base_url, token):
+        """Peticiones HTTP reales contra un servidor; sin recuento de consultas"""
+        base_url = base_url.rstrip('/')
+
+        def send(method, path):
+            request = Request(
+                base_url + path, method=method, headers={'Authorization': f'Token {token}'}
+            )
+            start = time.perf_counter()
+            try:
+                with urlopen(request, timeout=60) as response:
+                    response.read()
+                    status = response.status
+            except HTTPError as e:
+                status = e.code
+            except URLError:
+                status = 0
+            return status, (time.perf_counter() - start) * 1000, None
+
+        return send
+
+    def run(self, send, plan, concurrency):
+        # Como en un worker gthread, cada hilo reutiliza sus propias conexiones
+        def execute(item):
+            name, method, path = item
+            status, latency, queries = send(method, path)
+            return name, status, latency, queries
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(execute, plan))
+
+    def summarize(self, samples, elapsed, options):
+        endpoints = {}
+        for name, status, latency, queries in samples:
+            endpoint = endpoints.setdefault(name, {'latencies': [], 'queries': [], 'errors': 0})
+            endpoint['latencies'].append(latency)
+            if queries is not None:
+                endpoint['queries'].append(queries)
+            if not 200 <= status < 400:
+                endpoint['errors'] += 1
+
+        def stats(latencies, queries, errors):
+            latencies = sorted(latencies)
+            return {
+                'requests': len(latencies),
+                'errors': errors,
+                'p50_ms': round(percentile(latencies, 0.50), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'p99_ms': round(percentile(latencies, 0.99), 2),
+                'mean_ms': round(statistics.mean(latencies), 2),
+                'max_ms': round(latencies[-1], 2),
+                'queries_mean': round(statistics.mean(queries), 2) if queries else None,
+                'queries_max': max(queries) if queries else None,
+            }
+
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'target': options['base_url'] or 'test_client',
+            'database': connections['default'].vendor,
+            'requests': len(samples),
+            'concurrency': options['concurrency'],
+            'seed': options['seed'],
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+            'total': stats(
+                [sample[2] for sample in samples],
+                [sample[3] for sample in samples if sample[3] is not None],
+                sum(endpoint['errors'] for endpoint in endpoints.values()),
+            ),
+            'endpoints': {
+                name: stats(endpoint['latencies'], endpoint['queries'], endpoint['errors'])
+                for name, endpoint in sorted(endpoints.items())
+            },
+        }
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"\n{'Endpoint':<32}{'n':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'SQL':>7}"
+        )
+        rows = list(results['endpoints'].items()) + [('TOTAL', results['total'])]
+        for name, data in rows:
+            queries = '-' if data['queries_mean'] is None else f"{data['queries_mean']:.1f}"
+            line = (
+                f"{name:<32}{data['requests']:>6}{data['errors']:>5}{data['p50_ms']:>9.1f}"
+                f"{data['p95_ms']:>9.1f}{data['p99_ms']:>9.1f}{queries:>7}"
+            )
+            self.stdout.write(self.style.ERROR(line) if data['errors'] else line)
+        self.stdout.write(
+            f"\n📊 Rendimiento: {results['throughput_rps']} peticiones/s en {results['elapsed_seconds']}s"
+        )
+
+    def compare(self, results, path, threshold):
+        """Comparar con una ejecución anterior; devuelve los endpoints que empeoran"""
+        with open(path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+
+        self.stdout.write(f"\n🔍 Comparación con {path} ({previous.get('timestamp')})")
+        self.stdout.write(f"{'Endpoint':<32}{'p95 antes':>11}{'p95 ahora':>11}{'Δ %':>8}{'SQL antes':>11}{'SQL ahora':>11}")
+        regressions = []
+        for name, current in results['endpoints'].items():
+            before = previous.get('endpoints', {}).get(name)
+            if not before:
+                continue
+            change = (current['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            more_queries = (
+                current['queries_mean'] is not None
+                and before.get('queries_mean') is not None
+                and current['queries_mean'] > before['queries_mean']
+            )
+            line = (
+                f"{name:<32}{before['p95_ms']:>11.1f}{current['p95_ms']:>11.1f}{change:>+8.1f}"
+                f"{str(before.get('queries_mean')):>11}{str(current['queries_mean']):>11}"
+            )
+            if threshold is not None and (change > threshold or more_queries):
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return regressions
@@ -0,0 +1,139 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.utils import ConnectionHandler
+from concurrent.futures import ThreadPoolExecutor
+import statistics
+import threading
+import time
+
+from config.db_backends.pool import get_pool_stats
+
+
+class Command(BaseCommand):
+    help = 'Compara la latencia de peticiones con conexión por petición, persistente y con pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Número de peticiones simuladas por modo y por hilo (default: 500)',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Hilos concurrentes, como en un worker gthread (default: 4)',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=3,
+            help='Consultas por petición simulada (default: 3)',
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Alias de la base de datos a usar (default: default)',
+        )
+
+    def handle(self, *args, **options):
+        base_settings = connections[options['database']].settings_dict
+        is_postgresql = connections[options['database']].vendor == 'postgresql'
+
+        modes = {
+            'por_peticion': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+            'persistente': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+        }
+        if is_postgresql:
+            modes['pool'] = {
+                'ENGINE': 'config.db_backends.postgresql_pool',
+                'CONN_MAX_AGE': 0,
+                'CONN_HEALTH_CHECKS': False,
+                'POOL': {
+                    **base_settings.get('POOL', {}),
+                    'MAX_SIZE': max(options['threads'], base_settings.get('POOL', {}).get('MAX_SIZE', 1)),
+                },
+            }
+        else:
+            self.stdout.write(
+                self.style.WARNING('⚠️  El modo pool solo está disponible con PostgreSQL')
+            )
+
+        self.stdout.write(
+            f"🚀 {options['requests']} peticiones x {options['threads']} hilos, "
+            f"{options['queries']} consultas por petición"
+        )
+
+        results = []
+        for name, overrides in modes.items():
+            results.append(self.run_mode(name, base_settings, overrides, options))
+
+        self.stdout.write(
+            f"\n{'Modo':<15}{'req/s':>10}{'media ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'conexiones':>12}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['name']:<15}{result['rps']:>10.1f}{result['mean']:>10.2f}"
+                f"{result['p95']:>10.2f}{result['p99']:>10.2f}{result['connections']:>12}"
+            )
+
+        pool_stats = get_pool_stats().get('bench_pool')
+        if pool_stats:
+            self.stdout.write(f'\n📊 Métricas del pool: {pool_stats}')
+
+    def run_mode(self, name, base_settings, overrides, options):
+        alias = f'bench_{name}'
+        # ConnectionHandler exige un alias 'default'; solo se usa el del modo
+        handler = ConnectionHandler({'default': base_settings, alias: {**base_settings, **overrides}})
+
+        opened = []
+        lock = threading.Lock()
+
+        def on_connection_created(sender, connection, **kwargs):
+            if connection.alias == alias:
+                with lock:
+                    opened.append(1)
+
+        connection_created.connect(on_connection_created)
+
+        def worker(_):
+            connection = handler[alias]
+            latencies = []
+            for _ in range(options['requests']):
+                start = time.perf_counter()
+                # Mismo ciclo que request_started/request_finished en Django
+                connection.close_if_unusable_or_obsolete()
+                with connection.cursor() as cursor:
+                    for _ in range(options['queries']):
+                        cursor.execute('SELECT 1')
+                        cursor.fetchone()
+                connection.close_if_unusable_or_obsolete()
+                latencies.append((time.perf_counter() - start) * 1000)
+            connection.close()
+            return latencies
+
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                latencies = sorted(
+                    lat for lats in executor.map(worker, range(options['threads'])) for lat in lats
+                )
+        finally:
+            connection_created.disconnect(on_connection_created)
+        elapsed = time.perf_counter() - start
+
+        # Con pool, connection_created se emite en cada préstamo; las conexiones
+        # reales abiertas son las creadas por el pool.
+        pool_stats = get_pool_stats().get(alias)
+        connections_opened = pool_stats['created'] if pool_stats else len(opened)
+
+        return {
+            'name': name,
+            'rps': len(latencies) / elapsed,
+            'mean': statistics.mean(latencies),
+            'p95': latencies[int(len(latencies) * 0.95) - 1],
+            'p99': latencies[int(len(latencies) * 0.99) - 1],
+            'connections': connections_opened,
+        }
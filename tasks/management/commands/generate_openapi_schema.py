@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from config import openapi
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera el esquema OpenAPI del API y lo escribe en JSON y YAML para que '
+        '/api/schema.json, /api/docs/ y /api/redoc/ lo sirvan desde disco'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            default=getattr(settings, 'OPENAPI_SCHEMA_DIR', 'openapi'),
+            help='Directorio de salida (por defecto OPENAPI_SCHEMA_DIR)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'📄 Generando el esquema OpenAPI {openapi.API_VERSION}...')
+        for path in openapi.write(options['output_dir']):
+            self.stdout.write(f'   {path} ({path.stat().st_size // 1024} KB)')
+        self.stdout.write(self.style.SUCCESS('✅ Esquema OpenAPI generado'))
@@ -0,0 +1,173 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import connections
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import django
+
+from tasks import deletion, jobs
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se purgan los trabajos antiguos y se expiran los colgados
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Procesa los reportes encolados (ReportJob) y los proyectos marcados para borrar '
+        'con un pool de hilos o de procesos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=getattr(settings, 'REPORT_WORKER_CONCURRENCY', 2),
+            help='Reportes en paralelo (por defecto REPORT_WORKER_CONCURRENCY)'
+        )
+        parser.add_argument(
+            '--pool',
+            choices=['thread', 'process'],
+            default='thread',
+            help='Ejecutar los reportes en hilos o en procesos separados (por defecto: thread)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Segundos entre consultas a la cola cuando está vacía (por defecto: 1)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesar los trabajos pendientes y terminar'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        if concurrency < 1:
+            raise CommandError('--concurrency debe ser al menos 1')
+        poll_interval = options['poll_interval']
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+
+        if options['pool'] == 'process':
+            # spawn: los procesos hijos no heredan las conexiones abiertas del padre
+            executor = ProcessPoolExecutor(
+                max_workers=concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='report-job')
+
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            if not stopping:
+                self.stdout.write(self.style.WARNING('⏹️  Deteniendo: se terminan los reportes en curso...'))
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'🚀 Worker de reportes {worker} ({options["pool"]}, concurrencia {concurrency})'
+        ))
+
+        running = {}
+        # Borrados de proyectos en curso (futuro -> (id, inicio)) y los que fallaron,
+        # que se reintentan en la siguiente pasada de mantenimiento
+        deleting = {}
+        failed_deletions = set()
+        processed = 0
+        last_maintenance = 0.0
+        try:
+            while not stopping:
+                if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                    last_maintenance = time.monotonic()
+                    expired = jobs.expire_stale()
+                    purged = jobs.purge_expired()
+                    if expired or purged:
+                        self.stdout.write(f'🧹 {expired} trabajos expirados, {purged} purgados')
+                    failed_deletions.clear()
+
+                while len(running) + len(deleting) < concurrency:
+                    job = jobs.claim(worker)
+                    if job is None:
+                        break
+                    self.stdout.write(f'▶️  {job.report} {job.pk} (intento {job.attempts})')
+                    running[executor.submit(jobs.run, job.pk)] = (job, time.monotonic())
+                # Con hueco libre, los proyectos marcados para borrar (ver tasks/deletion.py)
+                while len(running) + len(deleting) < concurrency:
+                    project_id = deletion.next_pending(
+                        exclude=[pk for pk, _ in deleting.values()] + list(failed_deletions)
+                    )
+                    if project_id is None:
+                        break
+                    self.stdout.write(f'🗑️  Borrando el proyecto {project_id}')
+                    deleting[executor.submit(deletion.run, project_id)] = (project_id, time.monotonic())
+                # La conexión del hilo principal no se queda abierta mientras espera
+                connections.close_all()
+
+                if not running and not deleting:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait([*running, *deleting], timeout=poll_interval, return_when=FIRST_COMPLETED)
+                processed += self._collect(done, running, deleting, failed_deletions)
+
+            if running or deleting:
+                done, _ = wait([*running, *deleting])
+                processed += self._collect(done, running, deleting, failed_deletions)
+        finally:
+            executor.shutdown(wait=True)
+            connections.close_all()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Worker detenido: {processed} reportes procesados'))
+
+    def _collect(self, done, running, deleting, failed_deletions):
+        """Informar de los reportes y borrados terminados; devuelve los reportes procesados"""
+        processed = 0
+        for future in done:
+            if future in deleting:
+                project_id, started = deleting.pop(future)
+                self._report_deletion(project_id, future, time.monotonic() - started, failed_deletions)
+                continue
+            job, started = running.pop(future)
+            processed += 1
+            self._report(job, future, time.monotonic() - started)
+        return processed
+
+    def _report_deletion(self, project_id, future, elapsed, failed_deletions):
+        try:
+            tasks = future.result()
+        except Exception as e:
+            failed_deletions.add(project_id)
+            logger.exception('Error borrando el proyecto %s', project_id)
+            self.stdout.write(self.style.ERROR(f'❌ Proyecto {project_id}: {e}'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'🗑️  Proyecto {project_id} borrado con {tasks} tareas en {elapsed:.1f}s'
+        ))
+
+    def _report(self, job, future, elapsed):
+        try:
+            status = future.result()
+        except Exception as e:
+            # Solo si falla el propio proceso del pool; los errores del reporte los registra jobs.run
+            self.stdout.write(self.style.ERROR(f'❌ {job.report} {job.pk}: {e}'))
+            return
+        if status == 'done':
+            self.stdout.write(self.style.SUCCESS(f'✅ {job.report} {job.pk} en {elapsed:.1f}s'))
+        else:
+            self.stdout.write(self.style.ERROR(f'❌ {job.report} {job.pk} falló tras {elapsed:.1f}s'))
@@ -0,0 +1,408 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from bisect import bisect_left
+from functools import lru_cache
+import io
+import random
+import time
+from faker import Faker
+
+from config.bulk_load import copy_value, keep_timestamps
+from users.models import CustomUser
+from projects.models import Project
+from tasks.models import Task, Comment, TaskHistory
+
+# Columnas escritas por tabla (attname), en el orden de COPY
+COLUMNS = {
+    'users': [
+        'id', 'password', 'username', 'email', 'first_name', 'last_name', 'is_active',
+        'is_staff', 'is_superuser', 'date_joined',
+    ],
+    'projects': ['id', 'name', 'description', 'owner_id', 'created_at', 'updated_at'],
+    'tasks': [
+        'id', 'title', 'description', 'completed', 'status', 'priority', 'created_at',
+        'updated_at', 'due_date', 'is_overdue', 'project_id', 'assignee_id',
+    ],
+    'comments': ['id', 'content', 'created_at', 'updated_at', 'task_id', 'user_id'],
+    'task_history': [
+        'id', 'field_name', 'old_value', 'new_value', 'changed_at', 'task_id', 'user_id',
+    ],
+}
+
+MODELS = {
+    'users': CustomUser,
+    'projects': Project,
+    'tasks': Task,
+    'comments': Comment,
+    'task_history': TaskHistory,
+}
+
+# Fases de carga: cada una depende de las claves de la anterior
+PHASES = [['users'], ['projects'], ['tasks'], ['comments', 'task_history']]
+
+# Valores base para --scale 1: ~10M filas en total
+DEFAULT_COUNTS = {
+    'users': 2000,
+    'projects': 10000,
+    'tasks': 2000000,
+    'comments': 4000000,
+    'task_history': 4000000,
+}
+
+PROJECT_TYPES = [
+    'Sistema de Gestión', 'Aplicación Web', 'App Móvil', 'API REST', 'Dashboard Analytics',
+    'Sistema de Reportes', 'Plataforma E-learning', 'Sistema de Inventario', 'CRM',
+    'Sistema de Facturación',
+]
+TASK_TEMPLATES = [
+    'Implementar {feature}', 'Configurar {feature}', 'Diseñar {feature}', 'Optimizar {feature}',
+    'Crear {feature}', 'Integrar {feature}', 'Desarrollar {feature}', 'Probar {feature}',
+    'Documentar {feature}', 'Refactorizar {feature}',
+]
+FEATURES = [
+    'autenticación', 'base de datos', 'API REST', 'interfaz de usuario', 'sistema de pagos',
+    'notificaciones', 'reportes', 'dashboard', 'filtros avanzados', 'exportación de datos',
+]
+PRIORITIES = ['low', 'medium', 'high']
+PRIORITY_WEIGHTS = [3, 5, 2]
+HISTORY_FIELDS = ['status', 'priority', 'assignee', 'due_date', 'title']
+
+# Parámetro de la ley de potencias de tareas por proyecto (menor = más sesgo)
+PROJECT_PARETO_ALPHA = 1.16
+# Duración de sprint para agrupar las fechas límite
+SPRINT_DAYS = 14
+HISTORY_SPAN_DAYS = 730
+
+
+@lru_cache(maxsize=None)
+def vocabulary(seed):
+    """Textos generados una sola vez con Faker; por fila solo se elige de estas listas"""
+    fake = Faker(['es_ES'])
+    fake.seed_instance(seed)
+    return {
+        'first_names': [fake.first_name() for _ in range(400)],
+        'last_names': [fake.last_name() for _ in range(400)],
+        'companies': [fake.company() for _ in range(400)],
+        'sentences': [fake.sentence(nb_words=12) for _ in range(2000)],
+        'paragraphs': [fake.text(max_nb_chars=200) for _ in range(500)],
+    }
+
+
+@lru_cache(maxsize=None)
+def project_weights(seed, count):
+    """Pesos acumulados de tareas por proyecto (Pareto), iguales en todos los procesos"""
+    rng = random.Random(f'{seed}:project_weights')
+    cumulative = []
+    total = 0.0
+    for _ in range(count):
+        total += rng.paretovariate(PROJECT_PARETO_ALPHA)
+        cumulative.append(total)
+    return cumulative
+
+
+def timeline(plan, table, index):
+    """
+    Fecha de creación de la fila `index`: los ids crecen con el tiempo, como en
+    producción, así que cada tabla se reparte a lo largo de HISTORY_SPAN_DAYS.
+    """
+    fraction = index / max(plan['counts'][table], 1)
+    return plan['start'] + timedelta(days=HISTORY_SPAN_DAYS * fraction)
+
+
+def skewed_index(rng, count, exponent):
+    """Índice en [0, count) sesgado hacia los primeros valores (exponent > 1)"""
+    return int(count * rng.random() ** exponent)
+
+
+def next_sprint_end(value, start):
+    sprints = (value - start).days // SPRINT_DAYS + 1
+    return start + timedelta(days=sprints * SPRINT_DAYS, hours=18)
+
+
+def generate_users(plan, rng, words, indexes):
+    offset = plan['offsets']['users']
+    for i in indexes:
+        first = rng.choice(words['first_names'])
+        last = rng.choice(words['last_names'])
+        username = f"{first.lower()}.{last.lower()}.{offset + i + 1}".replace(' ', '')
+        yield (
+            offset + i + 1, plan['password'], username, f'{username}@example.com', first, last,
+            rng.random() > 0.05, False, False, timeline(plan, 'users', i),
+        )
+
+
+def generate_projects(plan, rng, words, indexes):
+    offset = plan['offsets']['projects']
+    users = plan['counts']['users']
+    for i in indexes:
+        created_at = timeline(plan, 'projects', i)
+        owner = plan['offsets']['users'] + skewed_index(rng, users, 1.5) + 1
+        yield (
+            offset + i + 1,
+            f"{rng.choice(PROJECT_TYPES)} - {rng.choice(words['companies'])}",
+            rng.choice(words['paragraphs']),
+            owner,
+            created_at,
+            min(created_at + timedelta(days=rng.expovariate(1 / 30)), plan['anchor']),
+        )
+
+
+def generate_tasks(plan, rng, words, indexes):
+    offset = plan['offsets']['tasks']
+    counts = plan['counts']
+    cumulative = project_weights(plan['seed'], counts['projects'])
+    anchor = plan['anchor']
+    for i in indexes:
+        created_at = timeline(plan, 'tasks', i) + timedelta(seconds=rng.randint(0, 3600))
+        # Solo proyectos ya creados en esa fecha, con peso Pareto
+        eligible = max(1, min(counts['projects'], int(counts['projects'] * (i + 1) / counts['tasks']) + 1))
+        project = bisect_left(cumulative, rng.random() * cumulative[eligible - 1])
+        age_days = (anchor - created_at).days
+        roll = rng.random()
+        if roll < min(0.9, age_days / 120):
+            status = 'completed'
+        elif roll < min(0.95, age_days / 60):
+            status = 'in_progress'
+        else:
+            status = 'pending'
+        # Las fechas límite se agrupan en los cierres de sprint
+        due_date = None
+        if rng.random() > 0.15:
+            sprints = rng.choice([0, 0, 1, 1, 1, 2, 3])
+            due_date = next_sprint_end(created_at, plan['start']) + timedelta(days=SPRINT_DAYS * sprints)
+        yield (
+            offset + i + 1,
+            rng.choice(TASK_TEMPLATES).format(feature=rng.choice(FEATURES)),
+            rng.choice(words['sentences']),
+            status == 'completed',
+            status,
+            rng.choices(PRIORITIES, weights=PRIORITY_WEIGHTS)[0],
+            created_at,
+            min(created_at + timedelta(days=rng.expovariate(1 / 7)), anchor),
+            due_date,
+            # Como Task.check_overdue(), frente a la hora real y no al ancla
+            status != 'completed' and due_date is not None and due_date <= plan['now'],
+            plan['offsets']['projects'] + project + 1,
+            plan['offsets']['users'] + skewed_index(rng, counts['users'], 1.5) + 1,
+        )
+
+
+def _task_activity(plan, rng):
+    """Tarea (sesgada hacia las más antiguas), usuario y fecha de una actividad"""
+    counts = plan['counts']
+    task = skewed_index(rng, counts['tasks'], 2)
+    when = min(
+        timeline(plan, 'tasks', task) + timedelta(days=rng.expovariate(1 / 5)),
+        plan['anchor'],
+    )
+    user = plan['offsets']['users'] + skewed_index(rng, counts['users'], 1.5) + 1
+    return plan['offsets']['tasks'] + task + 1, user, when
+
+
+def generate_comments(plan, rng, words, indexes):
+    offset = plan['offsets']['comments']
+    for i in indexes:
+        task, user, created_at = _task_activity(plan, rng)
+        yield (offset + i + 1, rng.choice(words['sentences']), created_at, created_at, task, user)
+
+
+def generate_task_history(plan, rng, words, indexes):
+    offset = plan['offsets']['task_history']
+    for i in indexes:
+        task, user, changed_at = _task_activity(plan, rng)
+        field_name = rng.choice(HISTORY_FIELDS)
+        if field_name == 'status':
+            old_value, new_value = rng.choice([('pending', 'in_progress'), ('in_progress', 'completed')])
+        elif field_name == 'priority':
+            old_value, new_value = rng.sample(PRIORITIES, 2)
+        elif field_name == 'assignee':
+            old_value, new_value = (str(rng.randint(1, 1000)) for _ in range(2))
+        elif field_name == 'due_date':
+            old_value = (changed_at + timedelta(days=rng.randint(1, 14))).date().isoformat()
+            new_value = (changed_at + timedelta(days=rng.randint(15, 30))).date().isoformat()
+        else:
+            old_value, new_value = rng.sample(words['sentences'], 2)
+        yield (offset + i + 1, field_name, old_value, new_value, changed_at, task, user)
+
+
+GENERATORS = {
+    'users': generate_users,
+    'projects': generate_projects,
+    'tasks': generate_tasks,
+    'comments': generate_comments,
+    'task_history': generate_task_history,
+}
+
+
+def write_chunk(plan, table, start, count):
+    """
+    Generar y escribir un bloque de filas. El generador aleatorio depende solo
+    de la semilla, la tabla y el bloque, así que el resultado es el mismo con
+    cualquier número de procesos.
+    """
+    rng = random.Random(f"{plan['seed']}:{table}:{start}")
+    rows = GENERATORS[table](plan, rng, vocabulary(plan['seed']), range(start, start + count))
+    model = MODELS[table]
+    columns = COLUMNS[table]
+
+    try:
+        with transaction.atomic():
+            if plan['use_copy']:
+                buffer = io.StringIO()
+                for row in rows:
+                    buffer.write('\t'.join(copy_value(value) for value in row))
+                    buffer.write('\n')
+                buffer.seek(0)
+                quote = connection.ops.quote_name
+                column_list = ', '.join(quote(model._meta.get_field(name).column) for name in columns)
+                with connection.cursor() as cursor:
+                    cursor.cursor.copy_expert(
+                        f'COPY {quote(model._meta.db_table)} ({column_list}) FROM STDIN', buffer
+                    )
+            else:
+                with keep_timestamps(model):
+                    model.objects.bulk_create(
+                        [model(**dict(zip(columns, row))) for row in rows], batch_size=2000
+                    )
+    finally:
+        if plan['workers'] > 1:
+            connections.close_all()
+    return table, count
+
+
+class Command(BaseCommand):
+    help = 'Genera un conjunto de datos sintético a gran escala (millones de filas) para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Multiplicador de los tamaños por defecto, ~10M filas con 1.0 (default: 1.0)',
+        )
+        for table, default in DEFAULT_COUNTS.items():
+            parser.add_argument(
+                f"--{table.replace('_', '-')}",
+                dest=table,
+                type=int,
+                help=f'Número de filas de {table} (default: {default} x scale)',
+            )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semilla; misma semilla y --anchor producen los mismos datos (default: 42)',
+        )
+        parser.add_argument(
+            '--anchor',
+            help='Fecha final de los datos generados, YYYY-MM-DD (default: hoy)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Procesos en paralelo; con SQLite siempre 1 (default: 4)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50000,
+            help='Filas por bloque y transacción (default: 50000)',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Usar bulk_create aunque el motor sea PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        counts = {
+            table: options[table] if options[table] is not None else int(default * options['scale'])
+            for table, default in DEFAULT_COUNTS.items()
+        }
+        for parent, children in (('users', 'projects'), ('projects', 'tasks'), ('tasks', 'comments'),
+                                 ('tasks', 'task_history')):
+            if counts[children] and not counts[parent]:
+                raise CommandError(f'No se pueden generar {children} sin {parent}')
+
+        if options['anchor']:
+            anchor = timezone.make_aware(datetime.strptime(options['anchor'], '%Y-%m-%d'))
+        else:
+            anchor = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        workers = options['workers']
+        if connection.vendor == 'sqlite' and workers > 1:
+            self.stdout.write(self.style.WARNING('⚠️  SQLite no admite escrituras en paralelo, se usa 1 proceso'))
+            workers = 1
+        use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+
+        plan = {
+            'seed': options['seed'],
+            'counts': counts,
+            'anchor': anchor,
+            'now': timezone.now(),
+            'start': anchor - timedelta(days=HISTORY_SPAN_DAYS),
+            # Se añade a los datos existentes, a continuación del id máximo
+            'offsets': {
+                table: model.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+                for table, model in MODELS.items()
+            },
+            # Un único hash para todos los usuarios en lugar de uno por fila, con
+            # sal fija para que el resultado también dependa solo de la semilla
+            'password': make_password('test123', salt=f"seed{options['seed']}"),
+            'use_copy': use_copy,
+            'workers': workers,
+        }
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🚀 Generando {sum(counts.values()):,} filas (semilla {plan['seed']}, "
+            f"{workers} procesos, {'COPY' if use_copy else 'bulk_create'})..."
+        ))
+
+        total_start = time.monotonic()
+        for phase in PHASES:
+            jobs = [
+                (table, start, min(options['chunk_size'], counts[table] - start))
+                for table in phase
+                for start in range(0, counts[table], options['chunk_size'])
+            ]
+            if not jobs:
+                continue
+            phase_start = time.monotonic()
+            self.run_jobs(plan, jobs, workers)
+            elapsed = time.monotonic() - phase_start
+            rows = sum(counts[table] for table in phase)
+            rate = rows / elapsed if elapsed else rows
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {' + '.join(phase)}: {rows:,} filas en {elapsed:.1f}s ({rate:,.0f} filas/s)"
+            ))
+
+        # Ajustar las secuencias tras insertar con ids explícitos
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), list(MODELS.values())):
+                cursor.execute(sql)
+
+        total_elapsed = time.monotonic() - total_start
+        total_rows = sum(counts.values())
+        self.stdout.write('\n📊 Resumen:')
+        self.stdout.write(f'   Filas: {total_rows:,}')
+        self.stdout.write(f'   Tiempo: {total_elapsed:.1f}s')
+        self.stdout.write(f'   Rendimiento: {total_rows / total_elapsed if total_elapsed else 0:,.0f} filas/s')
+
+    def run_jobs(self, plan, jobs, workers):
+        if workers <= 1:
+            for job in jobs:
+                write_chunk(plan, *job)
+            return
+        # Cada proceso abre su propia conexión; no heredar la del proceso padre
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(write_chunk, plan, *job) for job in jobs]
+            for future in as_completed(futures):
+                future.result()
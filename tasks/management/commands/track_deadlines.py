@@ -0,0 +1,106 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from datetime import timedelta
+import heapq
+import logging
+import signal
+import time
+
+from tasks import deadlines
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Marca las tareas como vencidas (Task.is_overdue) en el momento en que pasa su '
+        'fecha límite y lo notifica con la señal task_overdue'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lookahead',
+            type=int,
+            default=getattr(settings, 'DEADLINE_LOOKAHEAD', 3600),
+            help='Segundos de fechas límite que se cargan en cada recarga (por defecto DEADLINE_LOOKAHEAD)'
+        )
+        parser.add_argument(
+            '--reload-interval',
+            type=int,
+            default=getattr(settings, 'DEADLINE_RELOAD_INTERVAL', 60),
+            help='Segundos entre recargas de las fechas límite (por defecto DEADLINE_RELOAD_INTERVAL)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Corregir las marcas, marcar las tareas ya vencidas y terminar'
+        )
+
+    def handle(self, *args, **options):
+        lookahead = options['lookahead']
+        reload_interval = options['reload_interval']
+        if reload_interval < 1:
+            raise CommandError('--reload-interval debe ser al menos 1')
+        if lookahead < reload_interval:
+            raise CommandError('--lookahead no puede ser menor que --reload-interval')
+
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            if not stopping:
+                self.stdout.write(self.style.WARNING('⏹️  Deteniendo...'))
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'⏰ Siguiendo fechas límite (ventana {lookahead}s, recarga cada {reload_interval}s)'
+        ))
+
+        # (due_date, id) de las tareas por vencer; la consulta las devuelve
+        # ordenadas, que ya es un heap válido
+        heap = []
+        next_reload = 0.0
+        while not stopping:
+            try:
+                if time.monotonic() >= next_reload:
+                    now = timezone.now()
+                    cleared = deadlines.clear_stale(now)
+                    if cleared:
+                        self.stdout.write(f'🧹 {cleared} tareas ya no están vencidas')
+                    heap = deadlines.upcoming(now + timedelta(seconds=lookahead))
+                    next_reload = time.monotonic() + reload_interval
+
+                now = timezone.now()
+                if heap and heap[0][0] <= now:
+                    while heap and heap[0][0] <= now:
+                        heapq.heappop(heap)
+                    # Marca también las vencidas que no estaban en el heap
+                    # (creadas o cambiadas desde la última carga)
+                    marked = deadlines.mark_overdue(now)
+                    if marked:
+                        self.stdout.write(f'🔔 {len(marked)} tareas vencidas')
+            except Exception as e:
+                # Un fallo puntual de la base de datos no detiene el planificador
+                logger.exception('Error siguiendo las fechas límite')
+                self.stdout.write(self.style.ERROR(f'❌ {e}'))
+                next_reload = time.monotonic() + reload_interval
+            finally:
+                # La conexión no se queda abierta mientras duerme
+                connections.close_all()
+
+            if options['once']:
+                break
+            while not stopping:
+                wait = next_reload - time.monotonic()
+                if heap:
+                    wait = min(wait, (heap[0][0] - timezone.now()).total_seconds())
+                if wait <= 0:
+                    break
+                time.sleep(min(wait, 1.0))
+
+        self.stdout.write(self.style.SUCCESS('✅ Seguimiento de fechas límite detenido'))
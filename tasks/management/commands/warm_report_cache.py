@@ -0,0 +1,155 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+import logging
+import signal
+import time
+
+from config.cron import CronSpec
+from tasks import report_cache
+from tasks.models import ReportVariant
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula en segundo plano las variantes de gráficos y reportes más pedidas '
+        'antes de que caduquen en la caché, según una expresión cron'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schedule',
+            default=getattr(settings, 'REPORT_WARM_SCHEDULE', '* * * * *'),
+            help='Expresión cron de las pasadas (por defecto REPORT_WARM_SCHEDULE)'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=getattr(settings, 'REPORT_WARM_TOP_VARIANTS', 20),
+            help='Variantes más pedidas que se mantienen calientes (por defecto REPORT_WARM_TOP_VARIANTS)'
+        )
+        parser.add_argument(
+            '--window-hours',
+            type=int,
+            default=getattr(settings, 'REPORT_WARM_WINDOW_HOURS', 24),
+            help='Solo variantes pedidas en las últimas N horas (por defecto REPORT_WARM_WINDOW_HOURS)'
+        )
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=getattr(settings, 'REPORT_WARM_AHEAD', 120),
+            help='Recalcular las variantes que caducan en menos de N segundos (por defecto REPORT_WARM_AHEAD)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Hacer una sola pasada y terminar'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Mostrar las variantes seleccionadas y su estado en caché sin recalcular nada'
+        )
+
+    def handle(self, *args, **options):
+        ttl = report_cache.cache_ttl()
+        if not ttl:
+            raise CommandError('La caché de reportes está desactivada (REPORT_CACHE_TTL=0)')
+        if options['top'] < 1:
+            raise CommandError('--top debe ser al menos 1')
+        try:
+            schedule = CronSpec(options['schedule'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['ahead'] >= ttl:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  --ahead ({options["ahead"]}s) no es menor que REPORT_CACHE_TTL ({ttl}s): '
+                'todas las variantes se recalcularán en cada pasada'
+            ))
+
+        if options['list']:
+            self._list(options)
+            return
+
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            if not stopping:
+                self.stdout.write(self.style.WARNING('⏹️  Deteniendo tras la variante en curso...'))
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'🔥 Precalentando las {options["top"]} variantes más pedidas según "{schedule}" '
+            f'(TTL {ttl}s, antelación {options["ahead"]}s)'
+        ))
+
+        # Primera pasada al arrancar: tras un despliegue la caché puede estar vacía
+        self._warm_pass(options, lambda: stopping)
+        while not options['once'] and not stopping:
+            next_run = schedule.next_after(timezone.localtime())
+            while not stopping and timezone.localtime() < next_run:
+                time.sleep(min(1.0, max((next_run - timezone.localtime()).total_seconds(), 0)))
+            if not stopping:
+                self._warm_pass(options, lambda: stopping)
+
+        self.stdout.write(self.style.SUCCESS('✅ Precalentamiento detenido'))
+
+    def _warm_pass(self, options, is_stopping):
+        started = time.monotonic()
+        warmed = fresh = busy = failed = 0
+        try:
+            forgotten = report_cache.decay_hits(options['window_hours'])
+            if forgotten:
+                self.stdout.write(f'🧹 {forgotten} variantes sin peticiones recientes olvidadas')
+
+            for variant in report_cache.top_variants(options['top'], options['window_hours']):
+                if is_stopping():
+                    break
+                if not report_cache.needs_warming(variant, options['ahead']):
+                    fresh += 1
+                    continue
+                try:
+                    duration = report_cache.warm(variant)
+                except Exception as e:
+                    failed += 1
+                    logger.exception('Error precalentando %s %s', variant.report, variant.params)
+                    self.stdout.write(self.style.ERROR(f'❌ {variant.report} {variant.params}: {e}'))
+                    continue
+                if duration is None:
+                    # Una petición o otro proceso la está calculando ya
+                    busy += 1
+                    continue
+                warmed += 1
+                ReportVariant.objects.filter(pk=variant.pk).update(
+                    last_warmed_at=timezone.now(), last_duration_ms=int(duration * 1000)
+                )
+                self.stdout.write(f'♨️  {variant.report} {variant.params} en {duration * 1000:.0f} ms')
+        finally:
+            # La conexión no se queda abierta hasta la siguiente pasada
+            connections.close_all()
+
+        if warmed or failed:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Pasada en {time.monotonic() - started:.1f}s: {warmed} recalculadas, '
+                f'{fresh} vigentes, {busy} en curso, {failed} con error'
+            ))
+
+    def _list(self, options):
+        variants = report_cache.top_variants(options['top'], options['window_hours'])
+        if not variants:
+            self.stdout.write('📭 No hay variantes pedidas en la ventana indicada')
+            return
+        for variant in variants:
+            entry, generation = report_cache.lookup(variant.key)
+            if not report_cache.is_fresh(entry, generation):
+                state = 'fría' if entry is None else 'obsoleta'
+            else:
+                state = f'caduca en {entry["expires_at"] - time.time():.0f}s'
+            self.stdout.write(f'📊 {variant.hits:>6} peticiones  {variant.report} {variant.params}  ({state})')
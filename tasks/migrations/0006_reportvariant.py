@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('report', models.CharField(max_length=50)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('last_requested_at', models.DateTimeField()),
+                ('last_warmed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_duration_ms', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-hits'],
+                'indexes': [models.Index(fields=['last_requested_at', 'hits'], name='tasks_repor_last_re_8e0f52_idx')],
+            },
+        ),
+    ]
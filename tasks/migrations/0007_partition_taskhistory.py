@@ -0,0 +1,133 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations, models
+
+TABLE = 'tasks_taskhistory'
+OLD_TABLE = 'tasks_taskhistory_unpartitioned'
+SEQUENCE = 'tasks_taskhistory_id_seq'
+# Meses creados por adelantado al convertir la tabla
+PARTITIONS_AHEAD = 3
+
+
+def _next_month(month):
+    index = month.year * 12 + month.month
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _months(first, last):
+    month = first
+    while month <= last:
+        yield month
+        month = _next_month(month)
+
+
+def partition_history(apps, schema_editor):
+    """Convertir tasks_taskhistory en una tabla particionada por mes (solo PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT min(changed_at), max(changed_at) FROM "{TABLE}"')
+        oldest, newest = cursor.fetchone()
+        cursor.execute(
+            'SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = %s',
+            [TABLE, 'f'],
+        )
+        foreign_keys = [row[0] for row in cursor.fetchall()]
+        cursor.execute('SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname != %s',
+                       [TABLE, f'{TABLE}_pkey'])
+        indexes = [row[0] for row in cursor.fetchall()]
+
+    execute(f'ALTER TABLE "{TABLE}" RENAME TO "{OLD_TABLE}"')
+    # La columna identidad no se admite en tablas particionadas hasta PostgreSQL 17
+    execute(f'ALTER TABLE "{OLD_TABLE}" ALTER COLUMN id DROP IDENTITY IF EXISTS')
+    execute(f'ALTER TABLE "{OLD_TABLE}" ALTER COLUMN id DROP DEFAULT')
+    execute(f'ALTER TABLE "{OLD_TABLE}" RENAME CONSTRAINT "{TABLE}_pkey" TO "{OLD_TABLE}_pkey"')
+    for name in foreign_keys:
+        execute(f'ALTER TABLE "{OLD_TABLE}" DROP CONSTRAINT "{name}"')
+    for name in indexes:
+        execute(f'DROP INDEX "{name}"')
+
+    # Tras deshacer la migración la secuencia ya existe (ver unpartition_history)
+    execute(f'ALTER SEQUENCE IF EXISTS "{SEQUENCE}" OWNED BY NONE')
+    execute(f'CREATE SEQUENCE IF NOT EXISTS "{SEQUENCE}"')
+    execute(
+        f'CREATE TABLE "{TABLE}" (LIKE "{OLD_TABLE}", PRIMARY KEY (id, changed_at)) '
+        f'PARTITION BY RANGE (changed_at)'
+    )
+    execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval(\'"{SEQUENCE}"\')')
+    execute(f'ALTER SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}".id')
+
+    now = datetime.now(dt_timezone.utc)
+    first = (oldest or now).astimezone(dt_timezone.utc)
+    last = max(newest or now, now).astimezone(dt_timezone.utc)
+    first = datetime(first.year, first.month, 1, tzinfo=dt_timezone.utc)
+    last = datetime(last.year, last.month, 1, tzinfo=dt_timezone.utc)
+    for _ in range(PARTITIONS_AHEAD):
+        last = _next_month(last)
+    for month in _months(first, last):
+        execute(
+            f'CREATE TABLE "{TABLE}_p{month.year:04d}_{month.month:02d}" PARTITION OF "{TABLE}" '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [month, _next_month(month)],
+        )
+    execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+    execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{OLD_TABLE}"')
+    execute(
+        f'SELECT setval(\'"{SEQUENCE}"\', GREATEST(COALESCE((SELECT max(id) FROM "{TABLE}"), 0) + 1, '
+        f'(SELECT last_value + is_called::int FROM "{SEQUENCE}")), false)'
+    )
+    execute(f'DROP TABLE "{OLD_TABLE}"')
+
+    # Índices y claves ajenas tras la carga (en la tabla padre se propagan a las particiones)
+    execute(f'CREATE INDEX "{TABLE}_task_id_3c50c29d" ON "{TABLE}" (task_id)')
+    execute(f'CREATE INDEX "{TABLE}_user_id_cc374940" ON "{TABLE}" (user_id)')
+    execute(
+        f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_task_id_3c50c29d_fk_tasks_task_id" '
+        f'FOREIGN KEY (task_id) REFERENCES tasks_task(id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    execute(
+        f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_user_id_cc374940_fk_users_customuser_id" '
+        f'FOREIGN KEY (user_id) REFERENCES users_customuser(id) DEFERRABLE INITIALLY DEFERRED'
+    )
+
+
+def unpartition_history(apps, schema_editor):
+    """Volver a una tabla normal con todas las filas de las particiones"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    execute(f'CREATE TABLE "{OLD_TABLE}" (LIKE "{TABLE}" INCLUDING DEFAULTS)')
+    execute(f'INSERT INTO "{OLD_TABLE}" SELECT * FROM "{TABLE}"')
+    # La secuencia pasa a la tabla nueva para que no se borre con la particionada
+    execute(f'ALTER SEQUENCE "{SEQUENCE}" OWNED BY NONE')
+    execute(f'DROP TABLE "{TABLE}"')
+    execute(f'ALTER TABLE "{OLD_TABLE}" RENAME TO "{TABLE}"')
+    execute(f'ALTER SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}".id')
+    execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY (id)')
+    execute(f'CREATE INDEX "{TABLE}_task_id_3c50c29d" ON "{TABLE}" (task_id)')
+    execute(f'CREATE INDEX "{TABLE}_user_id_cc374940" ON "{TABLE}" (user_id)')
+    execute(
+        f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_task_id_3c50c29d_fk_tasks_task_id" '
+        f'FOREIGN KEY (task_id) REFERENCES tasks_task(id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    execute(
+        f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_user_id_cc374940_fk_users_customuser_id" '
+        f'FOREIGN KEY (user_id) REFERENCES users_customuser(id) DEFERRABLE INITIALLY DEFERRED'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_reportvariant'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_history, unpartition_history),
+        migrations.AddIndex(
+            model_name='taskhistory',
+            index=models.Index(fields=['task', 'changed_at'], name='tasks_history_task_changed'),
+        ),
+    ]
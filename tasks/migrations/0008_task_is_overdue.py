@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:34
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_overdue(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.filter(completed=False, due_date__lte=timezone.now()).update(is_overdue=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_partition_taskhistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='is_overdue',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.RunPython(mark_overdue, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed', False), ('due_date__isnull', False), ('is_overdue', False)), fields=['due_date'], name='tasks_task_upcoming_due'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_task_is_overdue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedTable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_sha256', models.CharField(max_length=64)),
+                ('table', models.CharField(max_length=50)),
+                ('id_map', models.JSONField(blank=True, default=dict)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('imported_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-imported_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importedtable',
+            constraint=models.UniqueConstraint(fields=('source_sha256', 'table'), name='tasks_importedtable_source_table'),
+        ),
+    ]
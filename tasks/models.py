@@ -1,5 +1,15 @@
+import uuid
+
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
+from django.utils import timezone
+
+
+class TaskQuerySet(models.QuerySet):
+    def alive(self):
+        """Tareas de proyectos que no se están borrando en segundo plano"""
+        return self.filter(project__deleting_at__isnull=True)
 
 
 class Task(models.Model):
@@ -33,7 +43,11 @@ class Task(models.Model):
         default='medium'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     due_date = models.DateTimeField(null=True, blank=True)
+    # Pendiente con la fecha límite ya pasada. Lo recalcula save() y lo activa
+    # manage.py track_deadlines en cuanto vence la tarea (ver tasks/deadlines.py)
+    is_overdue = models.BooleanField(default=False, db_index=True)
     project = models.ForeignKey(
         'projects.Project',
         on_delete=models.CASCADE,
@@ -45,11 +59,36 @@ class Task(models.Model):
         related_name='assigned_tasks'
     )
 
+    objects = TaskQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.is_overdue = self.check_overdue()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'completed', 'due_date'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'is_overdue'}
+        super().save(*args, **kwargs)
+
+    def check_overdue(self, now=None):
+        return not self.completed and self.due_date is not None and self.due_date <= (now or timezone.now())
+
     class Meta:
         ordering = ['-created_at']
+        # Rango de fechas límite que recorre el planificador (solo tareas por vencer)
+        indexes = [
+            models.Index(
+                fields=['due_date'], name='tasks_task_upcoming_due',
+                condition=Q(completed=False, is_overdue=False, due_date__isnull=False),
+            ),
+        ]
+
+
+class CommentQuerySet(models.QuerySet):
+    def alive(self):
+        """Comentarios de tareas de proyectos que no se están borrando"""
+        return self.filter(task__project__deleting_at__isnull=True)
 
 
 class Comment(models.Model):
@@ -71,6 +110,8 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
     def __str__(self):
         return f'Comment by {self.user.username} on {self.task.title}'
 
@@ -103,4 +144,113 @@ class TaskHistory(models.Model):
 
     class Meta:
         ordering = ['-changed_at']
-        verbose_name_plural = 'Task histories' 
\ No newline at end of file
+        verbose_name_plural = 'Task histories'
+        # En PostgreSQL la tabla está particionada por mes de changed_at (ver tasks/history_partitions.py)
+        indexes = [models.Index(fields=['task', 'changed_at'], name='tasks_history_task_changed')]
+
+
+class DeletedRecord(models.Model):
+    """
+    DeletedRecord model (tombstone) for incremental exports.
+    Records which object was deleted and when, so deletions can be replayed
+    in another environment.
+    """
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.model} #{self.object_id} deleted on {self.deleted_at}'
+
+    class Meta:
+        ordering = ['-deleted_at']
+
+
+class ReportJob(models.Model):
+    """
+    ReportJob model for reports computed in the background.
+    A worker (manage.py run_report_worker) claims queued jobs and writes the
+    result as a JSON file in REPORT_JOBS_DIR.
+    """
+    REPORT_CHOICES = [
+        ('projects_report', 'Reporte de proyectos'),
+        ('project_time_report', 'Reporte de tiempo por proyecto'),
+        ('user_productivity_report', 'Reporte de productividad'),
+    ]
+
+    STATUS_CHOICES = [
+        ('queued', 'En cola'),
+        ('running', 'En ejecución'),
+        ('done', 'Completado'),
+        ('failed', 'Fallido'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report = models.CharField(max_length=50, choices=REPORT_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='report_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    result_file = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f'{self.report} ({self.status}) requested by {self.requested_by_id}'
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+
+
+class ReportVariant(models.Model):
+    """
+    ReportVariant model: how often each combination of report and filters is
+    requested. The cache warmer (manage.py warm_report_cache) recomputes the
+    most requested variants before their cached result expires.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    report = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    hits = models.PositiveIntegerField(default=0)
+    last_requested_at = models.DateTimeField()
+    last_warmed_at = models.DateTimeField(null=True, blank=True)
+    last_duration_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.report} {self.params} ({self.hits} hits)'
+
+    class Meta:
+        ordering = ['-hits']
+        indexes = [models.Index(fields=['last_requested_at', 'hits'])]
+
+
+class ImportedTable(models.Model):
+    """
+    ImportedTable model: a table of a full export already loaded by
+    scripts/import_postgresql_data.py, identified by the SHA-256 of its file.
+    Saved in the same transaction as the rows, so re-running an import skips
+    the tables it already loaded and reuses how their ids were reassigned.
+    """
+    source_sha256 = models.CharField(max_length=64)
+    table = models.CharField(max_length=50)
+    id_map = models.JSONField(default=dict, blank=True)
+    rows = models.PositiveIntegerField(default=0)
+    imported_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.table} {self.source_sha256[:12]} ({self.rows} rows)'
+
+    class Meta:
+        ordering = ['-imported_at']
+        constraints = [
+            models.UniqueConstraint(fields=['source_sha256', 'table'], name='tasks_importedtable_source_table'),
+        ]
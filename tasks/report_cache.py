@@ -0,0 +1,443 @@
+"""
+Caché de los gráficos y reportes de ChartsViewSet.
+
+Cada variante (reporte + filtros que usa) se guarda en la caché por defecto
+durante REPORT_CACHE_TTL segundos (TTL duro). Cualquier cambio en tareas,
+proyectos o usuarios incrementa una generación global (ver tasks/signals.py).
+
+Stale-while-revalidate: un resultado de la generación actual con menos de
+REPORT_CACHE_SOFT_TTL segundos se sirve tal cual. Si es más antiguo o de una
+generación anterior, se sirve igualmente al momento y se recalcula en un hilo
+en segundo plano (uno por variante entre todos los procesos). Solo cuando no
+hay resultado, porque nunca se calculó o pasó el TTL duro, la petición espera
+al cálculo. Las respuestas llevan la cabecera Age con los segundos desde que
+se calculó el resultado.
+
+Las peticiones también cuentan cuántas veces se pide cada variante; los
+contadores se acumulan en memoria y se vuelcan a ReportVariant como mucho cada
+REPORT_VARIANT_FLUSH_INTERVAL segundos. manage.py warm_report_cache usa esos
+contadores para recalcular en segundo plano las variantes más pedidas antes de
+que caduquen o queden obsoletas, de modo que los usuarios casi siempre
+encuentran el resultado ya calculado.
+
+Si varias peticiones piden a la vez una variante que no está en caché, solo
+una la calcula (single-flight): toma un candado en la caché con una concesión
+de REPORT_SINGLE_FLIGHT_LEASE segundos y las demás esperan hasta
+REPORT_SINGLE_FLIGHT_WAIT segundos a que guarde el resultado. Si la espera se
+agota, REPORT_SINGLE_FLIGHT_FALLBACK decide si lo calculan ellas mismas
+('compute') o responden 503 con Retry-After ('unavailable').
+
+Los workers web y el proceso de precalentamiento deben compartir la caché
+(Redis en producción); con LocMemCache cada proceso tiene la suya.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from config.db_routers import reset_replica, use_replica
+from config.metrics import registry
+from .jobs import REPORT_PARAMS
+from .models import ReportVariant
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'report_cache'
+GENERATION_KEY = f'{CACHE_PREFIX}:generation'
+DECAY_KEY = f'{CACHE_PREFIX}:decay_due'
+
+# Acción de ChartsViewSet -> filtros que afectan al resultado. El resto de
+# parámetros (format, _profile, ...) no forma parte de la variante.
+CACHED_REPORTS = {
+    'dashboard': (),
+    'tasks_completed_by_period': (),
+    'project_progress': (),
+    'priority_distribution': (),
+    'user_activity': (),
+    'dashboard_stats': (),
+    'tasks_detailed_report': REPORT_PARAMS + ('priority',),
+    'temporal_comparison': REPORT_PARAMS + ('period',),
+    'project_time_report': REPORT_PARAMS,
+    'user_productivity_report': REPORT_PARAMS,
+    'projects_report': REPORT_PARAMS,
+}
+
+
+def cache_ttl():
+    return getattr(settings, 'REPORT_CACHE_TTL', 300)
+
+
+def soft_ttl():
+    return getattr(settings, 'REPORT_CACHE_SOFT_TTL', 60)
+
+
+def variant_params(report, query_params):
+    """Filtros de la petición que definen la variante (los vacíos equivalen a no enviarlos)"""
+    params = {}
+    for name in CACHED_REPORTS[report]:
+        value = query_params.get(name)
+        if value not in (None, ''):
+            params[name] = str(value)
+    return params
+
+
+def variant_key(report, params):
+    payload = json.dumps([report, params], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _entry_key(key):
+    return f'{CACHE_PREFIX}:{key}'
+
+
+def lookup(key):
+    """(entrada guardada o None, generación actual) en un solo viaje a la caché"""
+    values = cache.get_many([_entry_key(key), GENERATION_KEY])
+    return values.get(_entry_key(key)), values.get(GENERATION_KEY)
+
+
+def is_fresh(entry, generation):
+    return entry is not None and entry['generation'] == generation
+
+
+def store(key, data, generation, duration):
+    ttl = cache_ttl()
+    now = time.time()
+    cache.set(_entry_key(key), {
+        'data': data,
+        'generation': generation,
+        'computed_at': now,
+        'expires_at': now + ttl,
+        'duration': duration,
+    }, ttl)
+
+
+class ReportBusy(APIException):
+    """Otra petición está calculando el reporte y la espera se agotó"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'El reporte se está calculando. Inténtalo de nuevo en unos segundos.'
+    default_code = 'report_busy'
+
+    def __init__(self, wait):
+        super().__init__()
+        # El manejador de excepciones de DRF lo envía como cabecera Retry-After
+        self.wait = wait
+
+
+class _NotCacheable(Exception):
+    """La acción respondió con un error: se devuelve tal cual y no se guarda"""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+def _lock_key(key, generation):
+    return f'{CACHE_PREFIX}:lock:{key}:{generation}'
+
+
+def acquire(key, generation):
+    """Candado de cálculo de una variante; devuelve el token o None si ya lo tiene otro"""
+    token = uuid.uuid4().hex
+    lease = getattr(settings, 'REPORT_SINGLE_FLIGHT_LEASE', 120)
+    if cache.add(_lock_key(key, generation), token, lease):
+        return token
+    return None
+
+
+def release(key, generation, token):
+    # Si la concesión caducó y el candado es ya de otro, no se toca
+    if cache.get(_lock_key(key, generation)) == token:
+        cache.delete(_lock_key(key, generation))
+
+
+def single_flight(key, generation, compute_data):
+    """
+    Resultado de la variante para la generación dada, calculándolo con
+    compute_data() solo si ninguna otra petición lo está calculando ya.
+    Devuelve (datos, 'miss' si se calculó aquí o 'coalesced' si se esperó)
+    """
+    wait = getattr(settings, 'REPORT_SINGLE_FLIGHT_WAIT', 30)
+    deadline = time.monotonic() + wait
+    delay = 0.05
+    while True:
+        token = acquire(key, generation)
+        if token is not None:
+            try:
+                # Quien tenía el candado puede haber terminado justo antes
+                entry, _ = lookup(key)
+                if entry is not None and entry['generation'] == generation:
+                    return entry['data'], 'coalesced'
+                started = time.monotonic()
+                data = compute_data()
+                store(key, data, generation, time.monotonic() - started)
+                return data, 'miss'
+            finally:
+                release(key, generation, token)
+
+        entry, _ = lookup(key)
+        if entry is not None and entry['generation'] == generation:
+            return entry['data'], 'coalesced'
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.5)
+
+    if getattr(settings, 'REPORT_SINGLE_FLIGHT_FALLBACK', 'compute') == 'unavailable':
+        raise ReportBusy(wait=max(int(wait), 1))
+    logger.warning('Espera agotada (%ss) por el cálculo de %s; se calcula de nuevo', wait, key)
+    started = time.monotonic()
+    data = compute_data()
+    store(key, data, generation, time.monotonic() - started)
+    return data, 'miss'
+
+
+def invalidate():
+    """Dejar obsoletos todos los resultados guardados (se llama al cambiar los datos)"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # Primera invalidación o clave desalojada: un valor que no puede
+        # coincidir con el de ninguna entrada anterior
+        cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+class _PendingHits:
+    """Peticiones por variante del proceso, pendientes de volcar a ReportVariant"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.variants = {}
+        self.last_flush = time.monotonic()
+
+    def add(self, key, report, params):
+        with self.lock:
+            pending = self.variants.get(key)
+            if pending is None:
+                self.variants[key] = [report, params, 1]
+            else:
+                pending[2] += 1
+
+    def take(self, force=False):
+        interval = getattr(settings, 'REPORT_VARIANT_FLUSH_INTERVAL', 30)
+        with self.lock:
+            if not self.variants or (not force and time.monotonic() - self.last_flush < interval):
+                return {}
+            variants, self.variants = self.variants, {}
+            self.last_flush = time.monotonic()
+            return variants
+
+
+pending_hits = _PendingHits()
+
+
+def flush_hits(force=False):
+    """Sumar a ReportVariant las peticiones acumuladas, como mucho cada REPORT_VARIANT_FLUSH_INTERVAL"""
+    variants = pending_hits.take(force)
+    now = timezone.now()
+    for key, (report, params, hits) in variants.items():
+        try:
+            updated = ReportVariant.objects.filter(key=key).update(
+                hits=F('hits') + hits, last_requested_at=now
+            )
+            if updated:
+                continue
+            try:
+                with transaction.atomic():
+                    ReportVariant.objects.create(
+                        key=key, report=report, params=params, hits=hits, last_requested_at=now
+                    )
+            except IntegrityError:
+                # Otro proceso la creó a la vez
+                ReportVariant.objects.filter(key=key).update(hits=F('hits') + hits, last_requested_at=now)
+        except DatabaseError:
+            # Las estadísticas no deben romper la petición que las vuelca
+            logger.warning('No se pudieron guardar las peticiones de %s', report, exc_info=True)
+    return len(variants)
+
+
+_revalidator = None
+_revalidator_pid = None
+_revalidator_lock = threading.Lock()
+
+
+def _executor():
+    """Pool de hilos de revalidación del proceso (los hilos no sobreviven al fork)"""
+    global _revalidator, _revalidator_pid
+    if _revalidator_pid != os.getpid():
+        with _revalidator_lock:
+            if _revalidator_pid != os.getpid():
+                _revalidator = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'REPORT_REVALIDATE_WORKERS', 2),
+                    thread_name_prefix='report-revalidate',
+                )
+                _revalidator_pid = os.getpid()
+    return _revalidator
+
+
+def _revalidate(report, key, params, generation, token):
+    # Un resultado que ya se sirve con retraso tolera el de las réplicas
+    replica_token = use_replica(True)
+    try:
+        started = time.monotonic()
+        data = compute(report, params)
+        store(key, data, generation, time.monotonic() - started)
+    except Exception:
+        logger.exception('Error recalculando en segundo plano %s %s', report, params)
+    finally:
+        reset_replica(replica_token)
+        release(key, generation, token)
+        connections.close_all()
+
+
+def revalidate(report, key, params, generation):
+    """Recalcular la variante en segundo plano si nadie lo está haciendo ya"""
+    token = acquire(key, generation)
+    if token is not None:
+        _executor().submit(_revalidate, report, key, params, generation, token)
+
+
+def _cached_response(data, result, age):
+    response = Response(data)
+    response['X-Cache'] = result.upper()
+    response['Age'] = str(max(int(age), 0))
+    return response
+
+
+def cached_report(view_method):
+    """
+    Decorador para las acciones de ChartsViewSet: responde desde la caché
+    (revalidando en segundo plano si el resultado es antiguo) y, si no hay
+    resultado, lo calcula una sola vez para todas las peticiones simultáneas
+    """
+    report = view_method.__name__
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not cache_ttl():
+            return view_method(self, request, *args, **kwargs)
+
+        params = variant_params(report, request.query_params)
+        key = variant_key(report, params)
+        pending_hits.add(key, report, params)
+        # En una copia del contexto: la escritura en ReportVariant fijaría el
+        # resto de la petición a la principal (db_for_write) y el reporte no
+        # se leería de la réplica
+        contextvars.copy_context().run(flush_hits)
+
+        entry, generation = lookup(key)
+        if entry is not None:
+            age = time.time() - entry['computed_at']
+            if is_fresh(entry, generation) and age < soft_ttl():
+                result = 'hit'
+            else:
+                result = 'stale'
+                revalidate(report, key, params, generation)
+            registry.inc('report_cache_requests_total', {'report': report, 'result': result})
+            return _cached_response(entry['data'], result, age)
+
+        def compute_data():
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                raise _NotCacheable(response)
+            return response.data
+
+        try:
+            data, result = single_flight(key, generation, compute_data)
+        except _NotCacheable as e:
+            return e.response
+        registry.inc('report_cache_requests_total', {'report': report, 'result': result})
+        return _cached_response(data, result, 0)
+
+    return wrapper
+
+
+def compute(report, params):
+    """Calcular una variante fuera de una petición, con la acción sin caché"""
+    from .views_charts import ChartsViewSet
+
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(mutable=True)
+    http_request.GET.update(params)
+    request = Request(http_request)
+
+    view = ChartsViewSet(action=report, request=request, args=(), kwargs={}, format_kwarg=None)
+    response = getattr(ChartsViewSet, report).__wrapped__(view, request)
+    if response.status_code != 200:
+        raise ValueError(f'{report} {params} respondió {response.status_code}: {response.data}')
+    return response.data
+
+
+def warm(variant):
+    """
+    Recalcular y guardar una variante; devuelve la duración en segundos, o None
+    si otro proceso la está calculando ya
+    """
+    _, generation = lookup(variant.key)
+    token = acquire(variant.key, generation)
+    if token is None:
+        return None
+    try:
+        started = time.monotonic()
+        data = compute(variant.report, variant.params)
+        duration = time.monotonic() - started
+        store(variant.key, data, generation, duration)
+        return duration
+    finally:
+        release(variant.key, generation, token)
+
+
+def needs_warming(variant, ahead):
+    """Si la variante no está en caché, es de otra generación o caduca en menos de ahead segundos"""
+    entry, generation = lookup(variant.key)
+    if not is_fresh(entry, generation):
+        return True
+    return entry['expires_at'] - time.time() < ahead
+
+
+def top_variants(limit, window_hours):
+    """Variantes más pedidas entre las solicitadas en las últimas window_hours horas"""
+    since = timezone.now() - timedelta(hours=window_hours)
+    return list(
+        ReportVariant.objects.filter(report__in=CACHED_REPORTS, last_requested_at__gte=since)
+        .order_by('-hits', '-last_requested_at')[:limit]
+    )
+
+
+def decay_hits(window_hours):
+    """
+    Una vez al día (entre todos los procesos): reducir los contadores a la
+    mitad para que pesen más las peticiones recientes, y olvidar las variantes
+    que no se piden desde hace más de window_hours horas
+    """
+    now = time.time()
+    due = cache.get(DECAY_KEY)
+    if due is None:
+        cache.add(DECAY_KEY, now + 24 * 3600, None)
+    if due is None or now < due:
+        return 0
+    cache.set(DECAY_KEY, now + 24 * 3600, None)
+    ReportVariant.objects.update(hits=F('hits') / 2)
+    since = timezone.now() - timedelta(hours=window_hours)
+    return ReportVariant.objects.filter(last_requested_at__lt=since).delete()[0]
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Task, Comment, TaskHistory
+from .models import Task, Comment, TaskHistory, ReportJob
+from .jobs import REPORT_PARAMS
 from users.serializers import UserSerializer
 from projects.serializers import ProjectSerializer
 
@@ -15,9 +16,9 @@ class TaskSerializer(serializers.ModelSerializer):
         model = Task
         fields = [
             'id', 'title', 'description', 'completed', 'status', 'priority', 'created_at', 
-            'due_date', 'project', 'assignee', 'project_id', 'assignee_id'
+            'due_date', 'is_overdue', 'project', 'assignee', 'project_id', 'assignee_id'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'is_overdue']
     
     def create(self, validated_data):
         # Manejar project_id
@@ -48,9 +49,9 @@ class TaskListSerializer(serializers.ModelSerializer):
         model = Task
         fields = [
             'id', 'title', 'description', 'completed', 'status', 'priority', 'created_at', 
-            'due_date', 'project', 'assignee'
+            'due_date', 'is_overdue', 'project', 'assignee'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'is_overdue']
 
 
 class TaskUpdateSerializer(serializers.ModelSerializer):
@@ -105,4 +106,35 @@ class TaskHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = TaskHistory
         fields = ['id', 'task', 'user', 'field_name', 'old_value', 'new_value', 'changed_at']
-        read_only_fields = ['id', 'user', 'changed_at'] 
\ No newline at end of file
+        read_only_fields = ['id', 'user', 'changed_at']
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """Serializer para los reportes en segundo plano"""
+    result_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'report', 'params', 'status', 'attempts', 'error',
+            'created_at', 'started_at', 'finished_at', 'result_url'
+        ]
+        read_only_fields = ['id', 'status', 'attempts', 'error', 'created_at', 'started_at', 'finished_at']
+    
+    def validate_params(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('Debe ser un objeto con los filtros del reporte')
+        unknown = set(value) - set(REPORT_PARAMS)
+        if unknown:
+            raise serializers.ValidationError(
+                f'Filtros no soportados: {", ".join(sorted(unknown))}. Opciones: {", ".join(REPORT_PARAMS)}'
+            )
+        return value
+    
+    def get_result_url(self, obj):
+        if obj.status != 'done':
+            return None
+        request = self.context.get('request')
+        path = f'/api/report-jobs/{obj.pk}/result/'
+        return request.build_absolute_uri(path) if request else path
+
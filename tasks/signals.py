@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+
+from projects.models import Project
+from .models import Task, Comment, DeletedRecord
+from . import report_cache
+
+# Tareas que acaban de vencer (las envía manage.py track_deadlines):
+# task_overdue.send(sender=Task, task_ids=[...], now=...)
+task_overdue = Signal()
+
+
+def record_deletion(sender, instance, origin=None, **kwargs):
+    """
+    Registrar un tombstone solo para el objeto que originó el borrado; los
+    objetos borrados en cascada se borran igualmente en cascada al aplicarlo.
+    """
+    if origin is not None and origin is not instance:
+        origin_model = getattr(origin, 'model', type(origin))
+        if origin_model is not sender:
+            return
+    DeletedRecord.objects.create(model=sender._meta.label, object_id=instance.pk)
+
+
+def invalidate_reports(sender, update_fields=None, **kwargs):
+    """Los gráficos y reportes en caché dejan de ser válidos al cambiar los datos que agregan"""
+    # Iniciar sesión solo guarda last_login, que no aparece en ningún reporte
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    report_cache.invalidate()
+
+
+def connect_signals():
+    for model in (get_user_model(), Project, Task, Comment):
+        post_delete.connect(
+            record_deletion, sender=model, dispatch_uid=f'record_deletion_{model._meta.label}'
+        )
+    for model in (get_user_model(), Project, Task):
+        for signal in (post_save, post_delete):
+            signal.connect(
+                invalidate_reports, sender=model, dispatch_uid=f'invalidate_reports_{model._meta.label}'
+            )
+    # Las tareas vencidas cambian los conteos de los reportes
+    task_overdue.connect(invalidate_reports, sender=Task, dispatch_uid='invalidate_reports_task_overdue')
@@ -0,0 +1,19 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Al elegir un objeto en un AutocompleteFilter se recarga el changelist
+    // con ese filtro, conservando los demás parámetros salvo la página
+    $(function() {
+        $('.autocomplete-filter select').on('change', function() {
+            const params = new URLSearchParams(window.location.search);
+            if (this.value) {
+                params.set(this.name, this.value);
+            } else {
+                params.delete(this.name);
+            }
+            params.delete('p');
+            window.location.search = params.toString();
+        });
+    });
+}
@@ -1 +1,860 @@
- 
\ No newline at end of file
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from config import db_routers, metrics, profiling, slow_queries
+from config.pagination import EstimatedCountPaginator
+from config.middleware import ReplicaRoutingMiddleware
+from projects.models import Project
+
+from . import deadlines, deletion, history_archive, report_cache
+from .models import Comment, DeletedRecord, ReportVariant, Task, TaskHistory
+from .signals import task_overdue
+from .views import TaskViewSet
+from .views_charts import ChartsViewSet
+
+
+def run_concurrently(target, count):
+    """Ejecutar target(i) en count hilos que arrancan a la vez; devuelve sus resultados"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    errors = []
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+class CountingComputation:
+    """Cálculo lento que cuenta cuántas veces se ejecuta"""
+
+    def __init__(self, result, duration=0.3):
+        self.result = result
+        self.duration = duration
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.duration)
+        return self.result
+
+
+@override_settings(REPORT_CACHE_TTL=300, REPORT_SINGLE_FLIGHT_WAIT=10, REPORT_SINGLE_FLIGHT_LEASE=60)
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_callers_share_one_computation(self):
+        computation = CountingComputation({'total': 42})
+
+        results = run_concurrently(lambda i: report_cache.single_flight('variant', 1, computation), 20)
+
+        self.assertEqual(computation.calls, 1)
+        self.assertTrue(all(data == {'total': 42} for data, _ in results))
+        self.assertEqual(sorted(result for _, result in results), ['coalesced'] * 19 + ['miss'])
+        entry, _ = report_cache.lookup('variant')
+        self.assertEqual(entry['data'], {'total': 42})
+
+    def test_new_generation_is_computed_again(self):
+        computation = CountingComputation({'total': 1}, duration=0)
+
+        report_cache.single_flight('variant', 1, computation)
+        report_cache.single_flight('variant', 1, computation)
+        report_cache.single_flight('variant', 2, computation)
+
+        self.assertEqual(computation.calls, 2)
+
+    def test_failed_computation_releases_the_lock(self):
+        def failing():
+            raise RuntimeError('fallo')
+
+        with self.assertRaises(RuntimeError):
+            report_cache.single_flight('variant', 1, failing)
+
+        data, result = report_cache.single_flight('variant', 1, CountingComputation({'ok': True}, duration=0))
+        self.assertEqual((data, result), ({'ok': True}, 'miss'))
+
+    @override_settings(REPORT_SINGLE_FLIGHT_WAIT=0.2, REPORT_SINGLE_FLIGHT_FALLBACK='unavailable')
+    def test_wait_timeout_responds_unavailable(self):
+        self.assertIsNotNone(report_cache.acquire('variant', 1))
+        computation = CountingComputation({'total': 1}, duration=0)
+
+        with self.assertRaises(report_cache.ReportBusy) as raised:
+            report_cache.single_flight('variant', 1, computation)
+
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(computation.calls, 0)
+
+    @override_settings(REPORT_SINGLE_FLIGHT_WAIT=0.2, REPORT_SINGLE_FLIGHT_FALLBACK='compute')
+    def test_wait_timeout_falls_back_to_computing(self):
+        self.assertIsNotNone(report_cache.acquire('variant', 1))
+        computation = CountingComputation({'total': 1}, duration=0)
+
+        data, result = report_cache.single_flight('variant', 1, computation)
+
+        self.assertEqual((data, result), ({'total': 1}, 'miss'))
+        self.assertEqual(computation.calls, 1)
+
+
+@override_settings(
+    REPORT_CACHE_TTL=300, REPORT_SINGLE_FLIGHT_WAIT=10, REPORT_SINGLE_FLIGHT_LEASE=60,
+    REPORT_VARIANT_FLUSH_INTERVAL=3600,
+)
+class ChartsSingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model()(username='tester')
+        self.factory = APIRequestFactory()
+        self.view = ChartsViewSet.as_view({'get': 'projects_report'})
+
+    def get(self, params):
+        request = self.factory.get('/api/charts/projects_report/', params)
+        force_authenticate(request, user=self.user)
+        return self.view(request)
+
+    def test_concurrent_identical_requests_compute_once(self):
+        computation = CountingComputation({'summary': {'totalProjects': 3}})
+
+        with mock.patch.object(ChartsViewSet, 'projects_report_data', computation):
+            responses = run_concurrently(lambda i: self.get({'start_date': '2025-01-01'}), 12)
+
+        self.assertEqual(computation.calls, 1)
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertTrue(all(response.data == {'summary': {'totalProjects': 3}} for response in responses))
+        self.assertEqual(sorted(response['X-Cache'] for response in responses), ['COALESCED'] * 11 + ['MISS'])
+
+    def test_different_filters_are_computed_separately(self):
+        computation = CountingComputation({'summary': {}}, duration=0.1)
+
+        with mock.patch.object(ChartsViewSet, 'projects_report_data', computation):
+            run_concurrently(lambda i: self.get({'project_id': str(i % 2 + 1)}), 6)
+
+        self.assertEqual(computation.calls, 2)
+
+
+@override_settings(
+    REPORT_CACHE_TTL=300, REPORT_CACHE_SOFT_TTL=60, REPORT_SINGLE_FLIGHT_WAIT=10,
+    REPORT_SINGLE_FLIGHT_LEASE=60, REPORT_VARIANT_FLUSH_INTERVAL=3600,
+)
+class StaleWhileRevalidateTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model()(username='tester')
+        self.factory = APIRequestFactory()
+        self.view = ChartsViewSet.as_view({'get': 'dashboard_stats'})
+        self.key = report_cache.variant_key('dashboard_stats', {})
+
+    def get(self):
+        request = self.factory.get('/api/charts/dashboard_stats/')
+        force_authenticate(request, user=self.user)
+        return self.view(request)
+
+    def store_aged(self, data, age, generation=None):
+        report_cache.store(self.key, data, generation, 0)
+        entry, _ = report_cache.lookup(self.key)
+        entry['computed_at'] -= age
+        cache.set(f'{report_cache.CACHE_PREFIX}:{self.key}', entry, 300)
+
+    def test_recent_result_is_a_hit_with_age(self):
+        self.store_aged({'totalTasks': 1}, age=10)
+
+        with mock.patch.object(report_cache, 'revalidate') as revalidate:
+            response = self.get()
+
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response['Age'], '10')
+        self.assertEqual(response.data, {'totalTasks': 1})
+        revalidate.assert_not_called()
+
+    def test_result_past_soft_ttl_is_served_and_recomputed_in_background(self):
+        self.store_aged({'totalTasks': 1}, age=90)
+        done = threading.Event()
+
+        def slow_compute(report, params):
+            done.wait(5)
+            return {'totalTasks': 2}
+
+        with mock.patch.object(report_cache, 'compute', side_effect=slow_compute) as compute:
+            responses = [self.get() for _ in range(5)]
+            # Las respuestas no esperan al cálculo, que se lanza una sola vez
+            self.assertTrue(all(response['X-Cache'] == 'STALE' for response in responses))
+            self.assertTrue(all(response.data == {'totalTasks': 1} for response in responses))
+            self.assertEqual(responses[0]['Age'], '90')
+            done.set()
+            for _ in range(50):
+                entry, _ = report_cache.lookup(self.key)
+                if entry['data'] == {'totalTasks': 2}:
+                    break
+                time.sleep(0.05)
+
+        self.assertEqual(compute.call_count, 1)
+        response = self.get()
+        self.assertEqual((response['X-Cache'], response.data), ('HIT', {'totalTasks': 2}))
+
+    def test_result_of_previous_generation_is_served_stale(self):
+        self.store_aged({'totalTasks': 1}, age=5)
+        report_cache.invalidate()
+
+        with mock.patch.object(report_cache, 'revalidate') as revalidate:
+            response = self.get()
+
+        self.assertEqual(response['X-Cache'], 'STALE')
+        revalidate.assert_called_once()
+
+    def test_missing_result_blocks_until_computed(self):
+        with mock.patch.object(ChartsViewSet, '_dashboard_stats_data', return_value={'totalTasks': 3}), \
+                mock.patch.object(ChartsViewSet, '_counts_by_project', return_value={}), \
+                mock.patch('tasks.views_charts.Project.objects') as projects:
+            projects.alive.return_value.count.return_value = 0
+            response = self.get()
+
+        self.assertEqual((response['X-Cache'], response['Age']), ('MISS', '0'))
+        self.assertEqual(response.data, {'totalTasks': 3})
+
+
+@skipUnless('replica_1' in settings.DATABASES, 'necesita config.settings.test (principal y replica_1 en SQLite)')
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    Con dos SQLite distintas se ve de qué base de datos sale cada lectura: cada
+    una tiene un usuario que no existe en la otra.
+    """
+    databases = {'default', 'replica_1'}
+
+    def setUp(self):
+        cache.clear()
+        db_routers._replica_lag.clear()
+        self.users = get_user_model().objects
+        self.users.db_manager('default').create(username='en-principal')
+        self.users.db_manager('replica_1').create(username='en-replica')
+
+    def usernames(self):
+        return set(self.users.values_list('username', flat=True))
+
+    def test_reads_go_to_primary_unless_enabled(self):
+        self.assertEqual(self.usernames(), {'en-principal'})
+
+    def test_reads_go_to_the_replica(self):
+        token = db_routers.use_replica(True)
+        try:
+            self.assertEqual(self.usernames(), {'en-replica'})
+        finally:
+            db_routers.reset_replica(token)
+
+    def test_write_pins_the_rest_of_the_context_to_primary(self):
+        token = db_routers.use_replica(True)
+        try:
+            self.users.create(username='nuevo')
+            self.assertEqual(self.usernames(), {'en-principal', 'nuevo'})
+        finally:
+            db_routers.reset_replica(token)
+
+    @override_settings(REPORT_CACHE_TTL=300, REPORT_VARIANT_FLUSH_INTERVAL=0)
+    def test_report_variant_stats_do_not_pin_the_report_to_primary(self):
+        seen = []
+
+        @report_cache.cached_report
+        def dashboard_stats(view, request):
+            seen.append(self.usernames())
+            return Response({})
+
+        request = APIRequestFactory().get('/api/charts/dashboard_stats/')
+        token = db_routers.use_replica(True)
+        try:
+            dashboard_stats(None, Request(request))
+        finally:
+            db_routers.reset_replica(token)
+
+        self.assertEqual(seen, [{'en-replica'}])
+        self.assertTrue(ReportVariant.objects.filter(report='dashboard_stats').exists())
+
+    def test_middleware_resets_the_pin_after_each_request(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.usernames())
+            if request.GET.get('write'):
+                self.users.create(username=f'nuevo-{len(seen)}')
+                seen.append(self.usernames())
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        factory = RequestFactory()
+        middleware(factory.get('/api/tasks/', {'write': '1'}))
+        middleware(factory.get('/api/tasks/'))
+
+        self.assertEqual(seen, [{'en-replica'}, {'en-principal', 'nuevo-1'}, {'en-replica'}])
+        self.assertEqual(self.usernames(), {'en-principal', 'nuevo-1'})
+
+
+class MetricsRetireTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = self.tmp.name
+        self.registry = mock.patch.object(metrics, 'registry', metrics.Registry())
+        self.registry.start()
+        self.addCleanup(self.registry.stop)
+
+    def write_worker(self, pid, requests):
+        path = os.path.join(self.directory, f'metrics_{pid}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([['http_requests_total', [['status', '200']], requests]], f)
+
+    def total(self):
+        with override_settings(METRICS_DIR=self.directory):
+            totals = metrics.collect()
+        return totals.get(('http_requests_total', (('status', '200'),)), 0)
+
+    def test_dead_workers_are_merged_and_removed(self):
+        self.write_worker(101, 3)
+        self.write_worker(102, 4)
+
+        metrics.retire(101, self.directory)
+        metrics.retire(102, self.directory)
+
+        self.assertEqual(self.total(), 7)
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory) if not name.startswith(f'metrics_{os.getpid()}')),
+            [metrics.RETIRED_FILE],
+        )
+
+    def test_worker_file_left_behind_is_not_counted_twice(self):
+        self.write_worker(101, 3)
+        with mock.patch.object(metrics.os, 'remove'):
+            metrics.retire(101, self.directory)
+
+        self.assertEqual(self.total(), 3)
+
+
+class ProfileRetentionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = self.tmp.name
+        for profile_id, extension in [('20260101_000000_a', '.prof'), ('20260102_000000_b', '.folded'),
+                                      ('20260103_000000_c', '.prof')]:
+            for name in (profile_id + '.json', profile_id + extension):
+                open(os.path.join(self.directory, name), 'w').close()
+
+    def test_only_newest_profiles_are_kept(self):
+        self.assertEqual(profiling.purge_profiles(self.directory, 1), 2)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['20260103_000000_c.json', '20260103_000000_c.prof'])
+
+    def test_zero_disables_the_cap(self):
+        self.assertEqual(profiling.purge_profiles(self.directory, 0), 0)
+        self.assertEqual(len(os.listdir(self.directory)), 6)
+
+
+class RepeatedQueryTests(SimpleTestCase):
+
+    def run_queries(self, count):
+        query_log = slow_queries.QueryLog(('TaskViewSet', 'list'))
+        for i in range(count):
+            query_log(lambda *args: None, f'SELECT * FROM tasks_task WHERE id = {i}', None, False, {})
+        return query_log.report_repeated()
+
+    @override_settings(SLOW_QUERY_REPEAT_THRESHOLD=3)
+    def test_repeated_query_is_reported_with_its_location(self):
+        with self.assertLogs('slow_queries', 'WARNING') as logs:
+            repeated = self.run_queries(3)
+
+        self.assertEqual(len(repeated), 1)
+        self.assertIn('repetida 3 veces', logs.output[0])
+        self.assertIn('tasks/tests.py', logs.output[0])
+
+    @override_settings(SLOW_QUERY_REPEAT_THRESHOLD=1)
+    def test_threshold_of_one_reports_single_queries(self):
+        with self.assertLogs('slow_queries', 'WARNING') as logs:
+            repeated = self.run_queries(1)
+
+        self.assertEqual(len(repeated), 1)
+        self.assertIn('tasks/tests.py', logs.output[0])
+
+
+class ReportJobCreateTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('reportes', password='x'))
+
+    def test_new_job_is_accepted_and_identical_pending_job_is_reused(self):
+        first = self.client.post('/api/report-jobs/', {'report': 'projects_report'}, format='json')
+        second = self.client.post('/api/report-jobs/', {'report': 'projects_report'}, format='json')
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['id'], first.data['id'])
+
+
+class CommentDestroyTests(TestCase):
+
+    def setUp(self):
+        users = get_user_model().objects
+        self.author = users.create_user('autor', password='x')
+        self.other = users.create_user('otro', password='x')
+        project = Project.objects.create(name='Proyecto', description='', owner=self.author)
+        self.task = Task.objects.create(title='Tarea', description='', project=project, assignee=self.author)
+        self.comment = Comment.objects.create(task=self.task, user=self.author, content='Hola')
+        self.client = APIClient()
+
+    def delete(self, user):
+        self.client.force_authenticate(user)
+        return self.client.delete(f'/api/tasks/{self.task.pk}/comments/{self.comment.pk}/')
+
+    def test_author_deletes_only_the_comment(self):
+        self.assertEqual(self.delete(self.author).status_code, 204)
+        self.assertFalse(Comment.objects.filter(pk=self.comment.pk).exists())
+        self.assertTrue(Task.objects.filter(pk=self.task.pk).exists())
+
+    def test_other_users_cannot_delete_it(self):
+        self.assertEqual(self.delete(self.other).status_code, 403)
+        self.assertTrue(Comment.objects.filter(pk=self.comment.pk).exists())
+
+
+@override_settings(REPORT_CACHE_TTL=0)
+class ScheduledProjectDeletionTests(TestCase):
+    """Los proyectos marcados para borrar en segundo plano dejan de verse en todas partes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('admin', password='x', is_superuser=True)
+        kept = Project.objects.create(name='Sigue', description='', owner=self.user)
+        doomed = Project.objects.create(name='Se borra', description='', owner=self.user)
+        Task.objects.create(title='Viva', description='', project=kept, assignee=self.user)
+        self.task = Task.objects.create(title='Muerta', description='', project=doomed, assignee=self.user)
+        Comment.objects.create(task=self.task, user=self.user, content='Hola')
+        deletion.schedule_project(doomed)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_models_expose_only_alive_rows(self):
+        self.assertEqual(list(Project.objects.alive().values_list('name', flat=True)), ['Sigue'])
+        self.assertEqual(list(Task.objects.alive().values_list('title', flat=True)), ['Viva'])
+        self.assertFalse(Comment.objects.alive().exists())
+
+    def test_charts_and_comments_skip_the_project(self):
+        stats = self.client.get('/api/charts/dashboard_stats/').data
+        self.assertEqual((stats['totalProjects'], stats['totalTasks']), (1, 1))
+        report = self.client.get('/api/charts/tasks_detailed_report/').data
+        self.assertEqual([task['title'] for task in report['pendingTasks']], ['Viva'])
+        comments = self.client.get(f'/api/tasks/{self.task.pk}/comments/').data
+        self.assertEqual(comments['count'] if isinstance(comments, dict) else len(comments), 0)
+
+
+class DeadlineTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('plazos', password='x')
+        self.project = Project.objects.create(name='Plazos', description='', owner=self.user)
+        self.now = timezone.now()
+
+    def task(self, **fields):
+        return Task.objects.create(
+            title='Tarea', description='', project=self.project, assignee=self.user, **fields
+        )
+
+    def test_save_computes_is_overdue(self):
+        self.assertTrue(self.task(due_date=self.now - timedelta(hours=1)).is_overdue)
+        self.assertFalse(self.task(due_date=self.now + timedelta(hours=1)).is_overdue)
+        self.assertFalse(self.task(due_date=self.now - timedelta(hours=1), completed=True).is_overdue)
+
+    def test_save_with_update_fields_also_writes_is_overdue(self):
+        task = self.task(due_date=self.now - timedelta(hours=1))
+        task.completed = True
+        task.save(update_fields=['completed'])
+
+        self.assertFalse(Task.objects.get(pk=task.pk).is_overdue)
+
+    def test_mark_overdue_flags_due_tasks_and_sends_the_signal(self):
+        due = self.task(due_date=self.now + timedelta(minutes=5))
+        later = self.task(due_date=self.now + timedelta(days=1))
+        done = self.task(due_date=self.now + timedelta(minutes=5), completed=True)
+        received = []
+        task_overdue.connect(lambda sender, task_ids, **kwargs: received.extend(task_ids), weak=False,
+                             dispatch_uid='deadline_test')
+        self.addCleanup(task_overdue.disconnect, dispatch_uid='deadline_test')
+
+        marked = deadlines.mark_overdue(now=self.now + timedelta(minutes=10))
+
+        self.assertEqual(marked, [due.pk])
+        self.assertEqual(received, [due.pk])
+        self.assertEqual(
+            set(Task.objects.filter(is_overdue=True).values_list('pk', flat=True)), {due.pk}
+        )
+        self.assertFalse(Task.objects.get(pk=later.pk).is_overdue)
+        self.assertFalse(Task.objects.get(pk=done.pk).is_overdue)
+        self.assertEqual(deadlines.mark_overdue(now=self.now + timedelta(minutes=10)), [])
+
+    def test_clear_stale_unflags_tasks_changed_without_save(self):
+        task = self.task(due_date=self.now - timedelta(hours=1))
+        Task.objects.filter(pk=task.pk).update(due_date=self.now + timedelta(days=1))
+        completed = self.task(due_date=self.now - timedelta(hours=1))
+        Task.objects.filter(pk=completed.pk).update(completed=True)
+        still_due = self.task(due_date=self.now - timedelta(hours=1))
+
+        self.assertEqual(deadlines.clear_stale(now=self.now), 2)
+        self.assertEqual(
+            set(Task.objects.filter(is_overdue=True).values_list('pk', flat=True)), {still_due.pk}
+        )
+
+
+class EstimatedCountPaginatorTests(SimpleTestCase):
+
+    def paginator(self, rows, estimate):
+        patcher = mock.patch('config.pagination.estimated_count', return_value=(estimate, False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return EstimatedCountPaginator(list(range(rows)), 10)
+
+    def test_last_page_replaces_an_overestimate(self):
+        paginator = self.paginator(25, estimate=1000)
+        self.assertEqual(paginator.num_pages, 100)
+
+        page = paginator.page(3)
+
+        self.assertEqual(list(page), list(range(20, 25)))
+        self.assertFalse(page.has_next())
+        self.assertEqual((paginator.count, paginator.num_pages), (25, 3))
+        self.assertTrue(paginator.count_is_exact)
+
+    def test_pages_beyond_an_underestimate_are_served(self):
+        paginator = self.paginator(45, estimate=10)
+
+        self.assertEqual(paginator.validate_number(4), 4)
+        page = paginator.page(4)
+
+        self.assertEqual(list(page), list(range(30, 40)))
+        self.assertTrue(page.has_next())
+        self.assertFalse(paginator.count_is_exact)
+        self.assertGreaterEqual(paginator.count, 41)
+        self.assertEqual(paginator.num_pages, 5)
+
+    def test_page_past_the_real_end_is_empty(self):
+        paginator = self.paginator(45, estimate=1000)
+
+        with self.assertRaises(EmptyPage):
+            paginator.page(6)
+        with self.assertRaises(EmptyPage):
+            paginator.validate_number(0)
+
+
+@override_settings(PROJECT_DELETE_BATCH_SIZE=2, PROJECT_DELETE_BACKGROUND_THRESHOLD=5)
+class ProjectDeletionTests(TestCase):
+    """Borrado por lotes sin el Collector: cascada, tombstones e invalidación de los reportes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('borrador', password='x', is_superuser=True)
+        self.other = Project.objects.create(name='Otro', description='', owner=self.user)
+        self.other_task = self.create_task(self.other)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_task(self, project):
+        task = Task.objects.create(title='Tarea', description='', project=project, assignee=self.user)
+        Comment.objects.create(task=task, user=self.user, content='Hola')
+        TaskHistory.objects.create(task=task, user=self.user, field_name='title', old_value='a', new_value='b')
+        return task
+
+    def create_project(self, tasks):
+        project = Project.objects.create(name='Se borra', description='', owner=self.user)
+        for _ in range(tasks):
+            self.create_task(project)
+        return project
+
+    def assert_only_other_project_left(self):
+        self.assertEqual(list(Project.objects.values_list('pk', flat=True)), [self.other.pk])
+        self.assertEqual(list(Task.objects.values_list('pk', flat=True)), [self.other_task.pk])
+        self.assertEqual(list(Comment.objects.values_list('task_id', flat=True)), [self.other_task.pk])
+        self.assertEqual(list(TaskHistory.objects.values_list('task_id', flat=True)), [self.other_task.pk])
+
+    def generation(self):
+        return report_cache.lookup('cualquiera')[1]
+
+    def test_small_project_is_deleted_at_once(self):
+        project = self.create_project(tasks=5)
+        generation = self.generation()
+
+        response = self.client.delete(f'/api/projects/{project.pk}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assert_only_other_project_left()
+        self.assertEqual(
+            list(DeletedRecord.objects.values_list('model', 'object_id')), [('projects.Project', project.pk)]
+        )
+        self.assertNotEqual(self.generation(), generation)
+
+    def test_large_project_is_scheduled_and_deleted_by_the_worker(self):
+        project = self.create_project(tasks=6)
+
+        response = self.client.delete(f'/api/projects/{project.pk}/')
+
+        self.assertEqual((response.status_code, response.data['status']), (202, 'deleting'))
+        project.refresh_from_db()
+        self.assertIsNotNone(project.deleting_at)
+        self.assertEqual(Task.objects.filter(project=project).count(), 6)
+        self.assertEqual(deletion.next_pending(), project.pk)
+        self.assertFalse(DeletedRecord.objects.exists())
+
+        generation = self.generation()
+        # run() cierra las conexiones del hilo del pool; aquí es la del test
+        with mock.patch('tasks.deletion.connections'):
+            self.assertEqual(deletion.run(project.pk), 6)
+
+        self.assert_only_other_project_left()
+        self.assertIsNone(deletion.next_pending())
+        self.assertEqual(
+            list(DeletedRecord.objects.values_list('model', 'object_id')), [('projects.Project', project.pk)]
+        )
+        self.assertNotEqual(self.generation(), generation)
+
+    def test_deleting_twice_records_one_tombstone(self):
+        project = self.create_project(tasks=3)
+
+        deletion.delete_project(project.pk)
+        self.assertEqual(deletion.delete_project(project.pk), 0)
+
+        self.assertEqual(DeletedRecord.objects.filter(object_id=project.pk).count(), 1)
+
+    def test_task_delete_removes_its_rows_and_records_only_the_task(self):
+        project = self.create_project(tasks=1)
+        task = project.tasks.get()
+        generation = self.generation()
+
+        response = self.client.delete(f'/api/tasks/{task.pk}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Comment.objects.filter(task_id=task.pk).exists())
+        self.assertFalse(TaskHistory.objects.filter(task_id=task.pk).exists())
+        self.assertEqual(list(DeletedRecord.objects.values_list('model', 'object_id')), [('tasks.Task', task.pk)])
+        self.assertNotEqual(self.generation(), generation)
+
+
+class HistoryArchiveTests(TestCase):
+    """Archivo de TaskHistory en ficheros (tabla sin particionar, como en SQLite)"""
+
+    month = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        archive_settings = override_settings(TASK_HISTORY_ARCHIVE_DIR=tmp.name)
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+        self.user = get_user_model().objects.create_user('historia', password='x', is_superuser=True)
+        project = Project.objects.create(name='Historia', description='', owner=self.user)
+        self.tasks = [
+            Task.objects.create(title=f'Tarea {i}', description='', project=project, assignee=self.user)
+            for i in range(3)
+        ]
+        Task.objects.update(created_at=self.month - timedelta(days=30))
+
+    def change(self, task, when, value):
+        change = TaskHistory.objects.create(
+            task=task, user=self.user, field_name='title', old_value='', new_value=value
+        )
+        # changed_at es auto_now_add: se fija con update()
+        TaskHistory.objects.filter(pk=change.pk).update(changed_at=when)
+        return change.pk
+
+    def fill_month(self, per_task=4):
+        """Cambios de cada tarea en el mes, dos de ellos con la misma fecha"""
+        ids = {}
+        for task in self.tasks:
+            ids[task.pk] = [
+                self.change(task, self.month + timedelta(days=min(day, 2)), f'{task.pk}-{day}')
+                for day in range(per_task)
+            ]
+        return ids
+
+    def archived_ids(self, task):
+        return [row['id'] for row in history_archive.task_history(task.pk)]
+
+    def test_archived_month_leaves_the_database(self):
+        ids = self.fill_month()
+        later = self.change(self.tasks[0], self.month + timedelta(days=40), 'febrero')
+
+        self.assertEqual(history_archive.archive_month(self.month), 12)
+
+        self.assertEqual(list(TaskHistory.objects.values_list('pk', flat=True)), [later])
+        self.assertEqual(history_archive.archived_months(), [self.month])
+        for task in self.tasks:
+            self.assertEqual(sorted(self.archived_ids(task)), sorted(ids[task.pk]))
+
+    def test_history_endpoint_includes_archived_rows(self):
+        ids = self.fill_month()
+        later = self.change(self.tasks[1], self.month + timedelta(days=40), 'febrero')
+        history_archive.archive_month(self.month)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f'/api/tasks/{self.tasks[1].pk}/history/'
+
+        live = client.get(url).data
+        full = client.get(url, {'include_archived': 'true'}).data
+
+        self.assertEqual([row['id'] for row in live], [later])
+        self.assertEqual([row['id'] for row in full][0], later)
+        self.assertEqual(sorted(row['id'] for row in full[1:]), sorted(ids[self.tasks[1].pk]))
+        self.assertEqual(full[-1]['user']['username'], 'historia')
+
+    def test_rearchiving_merges_new_rows_without_duplicates(self):
+        ids = self.fill_month()
+        # Ejecución interrumpida: fichero escrito, filas sin borrar
+        history_archive.write_month(self.month, history_archive.month_rows(self.month))
+        late = self.change(self.tasks[0], self.month + timedelta(days=1), 'tarde')
+
+        self.assertEqual(history_archive.archive_month(self.month), 13)
+
+        self.assertFalse(TaskHistory.objects.exists())
+        rows = list(history_archive.read_month(self.month))
+        self.assertEqual(len({row['id'] for row in rows}), 13)
+        self.assertEqual(rows, sorted(rows, key=history_archive._sort_key))
+        self.assertEqual(sorted(self.archived_ids(self.tasks[0])), sorted(ids[self.tasks[0].pk] + [late]))
+
+    def test_small_blocks_are_found_by_task(self):
+        ids = self.fill_month(per_task=6)
+
+        with mock.patch.object(history_archive, 'BLOCK_BYTES', 300):
+            history_archive.archive_month(self.month)
+
+        blocks = history_archive.load_index(self.month)['blocks']
+        self.assertGreater(len(blocks), len(self.tasks))
+        self.assertEqual(sum(block[4] for block in blocks), 18)
+        for task in self.tasks:
+            self.assertEqual(sorted(self.archived_ids(task)), sorted(ids[task.pk]))
+        self.assertEqual(history_archive.task_history(self.tasks[-1].pk + 1), [])
+
+
+class TaskFullCursorTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('cursor', password='x', is_superuser=True)
+        project = Project.objects.create(name='Cursor', description='', owner=self.user)
+        self.task = Task.objects.create(title='Tarea', description='', project=project, assignee=self.user)
+        comments = Comment.objects.bulk_create([
+            Comment(task=self.task, user=self.user, content=str(i)) for i in range(47)
+        ])
+        # Grupos de comentarios con la misma fecha, también en los cortes de página
+        base = timezone.now()
+        for i, comment in enumerate(comments):
+            Comment.objects.filter(pk=comment.pk).update(created_at=base - timedelta(minutes=i // 7))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_comments_cursor_returns_every_comment_once(self):
+        first = self.client.get(f'/api/tasks/{self.task.pk}/full/').data
+        page = first['comments']
+        seen = [row['id'] for row in page['results']]
+        pages = 1
+        while page['next']:
+            self.assertIn('comments_cursor=', page['next'])
+            page = self.client.get(page['next']).data['comments']
+            seen += [row['id'] for row in page['results']]
+            pages += 1
+
+        self.assertGreater(pages, 2)
+        expected = list(
+            Comment.objects.filter(task=self.task).order_by('-created_at', '-pk').values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(set(seen)), 47)
+
+    def test_malformed_cursor_is_not_found(self):
+        url = f'/api/tasks/{self.task.pk}/full/'
+        for cursor in ('no-es-un-cursor', 'YWJj', 'MjAyNS0wMS0wMXx4'):
+            self.assertEqual(self.client.get(url, {'comments_cursor': cursor}).status_code, 404, cursor)
+
+
+@override_settings(REPORT_CACHE_TTL=0)
+class ExportTests(TestCase):
+
+    def setUp(self):
+        users = get_user_model().objects
+        self.user = users.create_user('exporta', password='x', is_superuser=True)
+        self.worker = users.create_user('trabaja', password='x')
+        kept = Project.objects.create(name='Sigue', description='', owner=self.user)
+        doomed = Project.objects.create(name='Se borra', description='', owner=self.user)
+        for i in range(7):
+            Task.objects.create(
+                title=f'Tarea "{i}", con comas', description='', project=kept, assignee=self.worker,
+                priority='high' if i % 2 else 'low', completed=i < 3,
+            )
+        for i in range(4):
+            Task.objects.create(title='Oculta', description='', project=doomed, assignee=self.worker, priority='high')
+        deletion.schedule_project(doomed)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, url, params=None):
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def csv_rows(self, url, params=None):
+        content = self.download(url, params).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(content[1:])))
+
+    def test_tasks_detailed_report_csv(self):
+        rows = self.csv_rows('/api/charts/tasks_detailed_report/export/', {'priority': 'high'})
+
+        self.assertEqual(rows[0][:3], ['ID', 'Título', 'Proyecto'])
+        expected = Task.objects.alive().filter(priority='high')
+        self.assertEqual(len(rows) - 1, expected.count())
+        self.assertEqual({int(row[0]) for row in rows[1:]}, set(expected.values_list('pk', flat=True)))
+        self.assertIn('Tarea "1", con comas', [row[1] for row in rows[1:]])
+
+    def test_tasks_xlsx(self):
+        content = self.download('/api/tasks/export/', {'export_format': 'xlsx', 'completed': 'false'})
+
+        with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+            self.assertIsNone(workbook.testzip())
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        header = [label for _, label in TaskViewSet.EXPORT_COLUMNS]
+        self.assertIn(''.join(f'<c t="inlineStr"><is><t xml:space="preserve">{label}</t></is></c>' for label in header),
+                      sheet)
+        self.assertEqual(sheet.count('<row '), 1 + Task.objects.alive().filter(completed=False).count())
+
+    def test_user_productivity_export_skips_projects_being_deleted(self):
+        rows = self.csv_rows('/api/charts/user_productivity_report/export/', {'user_id': self.worker.pk})
+
+        header, row = rows[0], rows[1]
+        self.assertEqual(len(rows), 2)
+        values = dict(zip(header, row))
+        self.assertEqual((values['Usuario'], values['Tareas'], values['Completadas']), ('trabaja', '7', '3'))
@@ -2,10 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import TaskViewSet, CommentViewSet
 from .views_charts import ChartsViewSet
+from .views_jobs import ReportJobViewSet
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet, basename='task')
 router.register(r'charts', ChartsViewSet, basename='charts')
+router.register(r'report-jobs', ReportJobViewSet, basename='report-job')
 
 urlpatterns = [
     path('api/', include(router.urls)),
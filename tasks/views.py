@@ -1,16 +1,45 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Prefetch, Q, prefetch_related_objects
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from config.tracing import TracedGenericViewMixin
+from . import deletion
+from .exports import export_response, queryset_rows
+from .history_archive import archived_history
 from .models import Task, Comment, TaskHistory
 from .serializers import (
     TaskSerializer, TaskListSerializer, TaskUpdateSerializer,
     CommentSerializer, TaskHistorySerializer
 )
 
+# Listas que devuelve la acción full: modelo, campo de orden y serializer
+FULL_RELATIONS = {
+    'comments': (Comment, 'created_at', CommentSerializer),
+    'history': (TaskHistory, 'changed_at', TaskHistorySerializer),
+}
+
+
+def encode_cursor(timestamp, pk):
+    return base64.urlsafe_b64encode(f'{timestamp.isoformat()}|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(timestamp, pk) de un cursor de encode_cursor"""
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeError):
+        raise NotFound('Cursor no válido')
+
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(TracedGenericViewMixin, viewsets.ModelViewSet):
     """ViewSet para el modelo Task"""
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -19,6 +48,7 @@ class TaskViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'description']
     ordering_fields = ['title', 'created_at', 'due_date', 'completed', 'priority']
     ordering = ['-created_at']
+    full_page_size = 20
     
     def get_queryset(self):
         """Filtrar tareas por proyectos del usuario o tareas asignadas al usuario"""
@@ -30,12 +60,18 @@ class TaskViewSet(viewsets.ModelViewSet):
         
         # Si es superusuario, puede ver todas las tareas
         if user.is_superuser:
-            return Task.objects.all()
+            queryset = Task.objects.all()
+        else:
+            # Usuarios normales ven tareas de sus proyectos o tareas asignadas a ellos
+            queryset = Task.objects.filter(
+                project__owner=user
+            ) | Task.objects.filter(assignee=user)
+        # Ni las de proyectos que se están borrando en segundo plano
+        queryset = queryset.alive()
         
-        # Usuarios normales ven tareas de sus proyectos o tareas asignadas a ellos
-        return Task.objects.filter(
-            project__owner=user
-        ) | Task.objects.filter(assignee=user)
+        if self.action == 'full':
+            queryset = queryset.select_related('project__owner', 'assignee')
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -52,6 +88,10 @@ class TaskViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
     
+    def perform_destroy(self, instance):
+        """Borrar la tarea, sus comentarios y su historial sin cargarlos en memoria"""
+        deletion.delete_task(instance)
+    
     def perform_update(self, serializer):
         """Registrar cambios en el historial antes de actualizar"""
         instance = serializer.instance
@@ -140,25 +180,110 @@ class TaskViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def overdue(self, request):
-        """Obtener tareas vencidas"""
-        from django.utils import timezone
-        tasks = self.get_queryset().filter(
-            completed=False,
-            due_date__lt=timezone.now().date()
-        )
+        """Obtener tareas vencidas (marcadas por manage.py track_deadlines)"""
+        tasks = self.get_queryset().filter(is_overdue=True).select_related('project__owner', 'assignee')
         serializer = TaskListSerializer(tasks, many=True)
         return Response(serializer.data)
     
+    # Columnas de la exportación de tareas: campo (o relación) y cabecera
+    EXPORT_COLUMNS = [
+        ('id', 'ID'),
+        ('title', 'Título'),
+        ('description', 'Descripción'),
+        ('project__name', 'Proyecto'),
+        ('assignee__username', 'Asignado a'),
+        ('priority', 'Prioridad'),
+        ('status', 'Estado'),
+        ('completed', 'Completada'),
+        ('created_at', 'Creada'),
+        ('updated_at', 'Actualizada'),
+        ('due_date', 'Fecha límite'),
+    ]
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Exportar todas las tareas filtradas (mismos filtros que el listado) a CSV o XLSX"""
+        queryset = self.filter_queryset(self.get_queryset())
+        fields, header = zip(*self.EXPORT_COLUMNS)
+        return export_response(request, 'tareas', header, queryset_rows(queryset, fields))
+    
+    @action(detail=True, methods=['get'])
+    def full(self, request, pk=None):
+        """
+        Obtener la tarea con la primera página de comentarios y de historial.
+        
+        Cada lista incluye 'next', la URL para continuar con ?comments_cursor= o
+        ?history_cursor=. Con un cursor solo se devuelve la lista que continúa.
+        """
+        task = self.get_object()
+        page_size = self.full_page_size
+        cursors = {
+            name: request.query_params[f'{name}_cursor']
+            for name in FULL_RELATIONS if request.query_params.get(f'{name}_cursor')
+        }
+        
+        if cursors:
+            pages = {}
+            for name, cursor in cursors.items():
+                model, order_field, _ = FULL_RELATIONS[name]
+                timestamp, last_pk = decode_cursor(cursor)
+                items = list(
+                    model.objects.filter(task=task)
+                    .filter(Q(**{f'{order_field}__lt': timestamp}) | Q(**{order_field: timestamp, 'pk__lt': last_pk}))
+                    .select_related('user')
+                    .order_by(f'-{order_field}', '-pk')[:page_size + 1]
+                )
+                pages[name] = self._full_page(request, name, items)
+            return Response(pages)
+        
+        # Un prefetch por relación, limitado a la primera página (+1 para saber si hay más)
+        prefetch_related_objects([task], *[
+            Prefetch(
+                name,
+                queryset=model.objects.select_related('user').order_by(f'-{order_field}', '-pk')[:page_size + 1],
+                to_attr=f'first_{name}',
+            )
+            for name, (model, order_field, _) in FULL_RELATIONS.items()
+        ])
+        data = {'task': self.get_serializer(task).data}
+        for name in FULL_RELATIONS:
+            data[name] = self._full_page(request, name, getattr(task, f'first_{name}'))
+        return Response(data)
+    
+    def _full_page(self, request, name, items):
+        """Página de una lista de full: resultados y URL de la siguiente"""
+        _, order_field, serializer_class = FULL_RELATIONS[name]
+        page_size = self.full_page_size
+        next_url = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            last = items[-1]
+            next_url = request.build_absolute_uri()
+            for other in FULL_RELATIONS:
+                next_url = remove_query_param(next_url, f'{other}_cursor')
+            next_url = replace_query_param(
+                next_url, f'{name}_cursor', encode_cursor(getattr(last, order_field), last.pk)
+            )
+        return {
+            'next': next_url,
+            'results': serializer_class(items, many=True).data,
+        }
+    
     @action(detail=True, methods=['get'])
     def history(self, request, pk=None):
-        """Obtener historial de cambios de una tarea"""
+        """
+        Obtener historial de cambios de una tarea. Con ?include_archived=true
+        se añaden los meses ya archivados en ficheros (más lento)
+        """
         task = self.get_object()
-        history = TaskHistory.objects.filter(task=task)
+        history = list(TaskHistory.objects.filter(task=task).select_related('user'))
+        if request.query_params.get('include_archived', '').lower() in ('1', 'true', 'yes'):
+            history += archived_history(task)
         serializer = TaskHistorySerializer(history, many=True)
         return Response(serializer.data)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(TracedGenericViewMixin, viewsets.ModelViewSet):
     """ViewSet para el modelo Comment"""
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -167,7 +292,7 @@ class CommentViewSet(viewsets.ModelViewSet):
         """Filtrar comentarios por tarea"""
         task_id = self.kwargs.get('task_pk')
         if task_id:
-            return Comment.objects.filter(task_id=task_id)
+            return Comment.objects.alive().filter(task_id=task_id)
         return Comment.objects.none()
     
     def perform_create(self, serializer):
@@ -179,11 +304,11 @@ class CommentViewSet(viewsets.ModelViewSet):
         """Solo permitir edición de comentarios propios"""
         comment = self.get_object()
         if comment.user != self.request.user:
-            raise permissions.PermissionDenied("No puedes editar comentarios de otros usuarios")
+            raise PermissionDenied("No puedes editar comentarios de otros usuarios")
         serializer.save()
     
     def perform_destroy(self, instance):
         """Solo permitir eliminación de comentarios propios"""
         if instance.user != self.request.user:
-            raise permissions.PermissionDenied("No puedes eliminar comentarios de otros usuarios")
+            raise PermissionDenied("No puedes eliminar comentarios de otros usuarios")
         instance.delete() 
\ No newline at end of file
@@ -2,11 +2,15 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 from django.db.models import Count, Q, F
+from django.db.models.functions import ExtractWeekDay, TruncMonth
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from collections import defaultdict
 import calendar
 
+from config.tracing import TracedViewMixin
+from .exports import export_response, queryset_rows
+from .report_cache import cached_report
 from .models import Task, Comment, TaskHistory
 from projects.models import Project
 from django.contrib.auth import get_user_model
@@ -14,177 +18,226 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 
-class ChartsViewSet(ViewSet):
+def project_status(progress, overdue_tasks):
+    """Estado de un proyecto (código y etiqueta) según su progreso y tareas vencidas"""
+    if progress >= 100:
+        return 'completed', 'Completado'
+    if overdue_tasks > 0:
+        return 'at_risk', 'En Riesgo'
+    if progress >= 75:
+        return 'on_track', 'En Progreso'
+    if progress >= 25:
+        return 'in_progress', 'En Desarrollo'
+    return 'planning', 'Planificación'
+
+
+class ChartsViewSet(TracedViewMixin, ViewSet):
     """
     ViewSet para proporcionar datos para gráficos del dashboard
     """
     
-    @action(detail=False, methods=['get'])
-    def tasks_completed_by_period(self, request):
-        """
-        Retorna datos de tareas completadas por período (últimos 6 meses)
-        """
-        # Obtener fecha de hace 6 meses
-        six_months_ago = timezone.now() - timedelta(days=180)
-        
-        # Filtrar tareas completadas (sin restricción de fecha para mostrar datos históricos)
-        completed_tasks = Task.objects.filter(
-            completed=True
-        ).order_by('created_at')
-        
-        # Agrupar por mes
+    # Los widgets del dashboard se calculan a partir de dos agregaciones
+    # agrupadas sobre Task (por proyecto/estado/prioridad y por mes/día de la
+    # semana), en lugar de recorrer las tareas o contar proyecto a proyecto.
+    # Las fechas se agrupan en UTC, como hacía strftime sobre created_at.
+
+    def _counts_by_project(self):
+        """Tareas por proyecto, completada y prioridad (con las creadas esta semana)"""
+        week_ago = timezone.now() - timedelta(days=7)
+        return list(
+            Task.objects.alive().order_by()
+            .values('project_id', 'completed', 'priority')
+            .annotate(
+                total=Count('id'),
+                this_week=Count('id', filter=Q(created_at__gte=week_ago)),
+            )
+        )
+
+    def _counts_by_period(self):
+        """Tareas por mes y día de la semana de creación (y cuántas están completadas)"""
+        return list(
+            Task.objects.alive().order_by()
+            .annotate(
+                month=TruncMonth('created_at', tzinfo=dt_timezone.utc),
+                weekday=ExtractWeekDay('created_at', tzinfo=dt_timezone.utc),
+            )
+            .values('month', 'weekday')
+            .annotate(total=Count('id'), completed=Count('id', filter=Q(completed=True)))
+        )
+
+    def _tasks_completed_by_period_data(self, period_counts):
         monthly_data = defaultdict(int)
-        for task in completed_tasks:
-            month_key = task.created_at.strftime('%Y-%m')
-            monthly_data[month_key] += 1
+        for row in period_counts:
+            if row['completed']:
+                monthly_data[(row['month'].year, row['month'].month)] += row['completed']
         
-        # Generar datos para los meses donde hay tareas completadas
         labels = []
         data = []
         
-        # Si hay datos, mostrar los meses con tareas
+        # Si hay datos, mostrar los meses con tareas completadas
         if monthly_data:
-            for month_key in sorted(monthly_data.keys()):
-                # Convertir YYYY-MM a nombre del mes
-                year, month = month_key.split('-')
-                month_name = calendar.month_name[int(month)][:3]  # Primeras 3 letras
-                labels.append(month_name)
-                data.append(monthly_data[month_key])
+            for year, month in sorted(monthly_data):
+                labels.append(calendar.month_name[month][:3])  # Primeras 3 letras
+                data.append(monthly_data[(year, month)])
         else:
             # Si no hay datos, mostrar los últimos 6 meses vacíos
             current_date = timezone.now()
             for i in range(6):
                 if current_date.month - i <= 0:
                     month = 12 + (current_date.month - i)
-                    year = current_date.year - 1
                 else:
                     month = current_date.month - i
-                    year = current_date.year
                 
                 month_name = calendar.month_name[month][:3]  # Primeras 3 letras
                 labels.insert(0, month_name)
                 data.insert(0, 0)
         
-        return Response({
+        return {
             'labels': labels,
             'datasets': [{
                 'label': 'Tareas Completadas',
                 'data': data
             }]
-        })
-    
-    @action(detail=False, methods=['get'])
-    def project_progress(self, request):
-        """
-        Retorna el progreso de los proyectos basado en tareas completadas
-        """
-        projects = Project.objects.all()
+        }
+
+    def _project_progress_data(self, project_counts, projects):
+        totals = defaultdict(lambda: [0, 0])
+        for row in project_counts:
+            totals[row['project_id']][0] += row['total']
+            if row['completed']:
+                totals[row['project_id']][1] += row['total']
         
         labels = []
         data = []
         
-        for project in projects:
-            total_tasks = Task.objects.filter(project=project).count()
-            completed_tasks = Task.objects.filter(project=project, completed=True).count()
-            
+        for project_id, name in projects:
+            total_tasks, completed_tasks = totals.get(project_id, (0, 0))
             if total_tasks > 0:
                 progress = round((completed_tasks / total_tasks) * 100, 1)
-                labels.append(project.name[:20] + ('...' if len(project.name) > 20 else ''))
+                labels.append(name[:20] + ('...' if len(name) > 20 else ''))
                 data.append(progress)
         
-        return Response({
+        return {
             'labels': labels,
             'datasets': [{
                 'label': 'Progreso (%)',
                 'data': data
             }]
-        })
-    
-    @action(detail=False, methods=['get'])
-    def priority_distribution(self, request):
-        """
-        Retorna la distribución de tareas por prioridad
-        """
+        }
+
+    def _priority_distribution_data(self, project_counts):
         priority_choices = ['low', 'medium', 'high']
         priority_labels = ['Baja', 'Media', 'Alta']
         
-        data = []
-        for priority in priority_choices:
-            count = Task.objects.filter(priority=priority).count()
-            data.append(count)
+        counts = defaultdict(int)
+        for row in project_counts:
+            counts[row['priority']] += row['total']
         
-        return Response({
+        return {
             'labels': priority_labels,
             'datasets': [{
-                'data': data
+                'data': [counts[priority] for priority in priority_choices]
             }]
-        })
-    
-    @action(detail=False, methods=['get'])
-    def user_activity(self, request):
-        """
-        Retorna la actividad de usuarios (tareas creadas por día de la semana)
-        """
-        # Obtener todas las tareas (sin filtro de fecha para mostrar datos históricos)
-        all_tasks = Task.objects.all()
-        
-        # Agrupar por día de la semana
+        }
+
+    def _user_activity_data(self, period_counts):
+        # ExtractWeekDay: 1 = domingo ... 7 = sábado
         daily_data = defaultdict(int)
-        for task in all_tasks:
-            day_name = task.created_at.strftime('%a')  # Lun, Mar, etc.
-            daily_data[day_name] += 1
+        for row in period_counts:
+            daily_data[row['weekday']] += row['total']
         
-        # Ordenar días de la semana
-        days_order = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+        days_order = [2, 3, 4, 5, 6, 7, 1]
         days_spanish = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom']
         
-        labels = []
-        data = []
-        
-        for i, day in enumerate(days_order):
-            labels.append(days_spanish[i])
-            data.append(daily_data.get(day, 0))
-        
-        return Response({
-            'labels': labels,
+        return {
+            'labels': days_spanish,
             'datasets': [{
                 'label': 'Tareas Creadas',
-                'data': data
+                'data': [daily_data[day] for day in days_order]
             }]
-        })
-    
-    @action(detail=False, methods=['get'])
-    def dashboard_stats(self, request):
-        """
-        Retorna estadísticas generales del dashboard
-        """
-        total_projects = Project.objects.count()
-        total_tasks = Task.objects.count()
-        completed_tasks = Task.objects.filter(completed=True).count()
-        pending_tasks = total_tasks - completed_tasks
+        }
+
+    def _dashboard_stats_data(self, project_counts, total_projects):
+        total_tasks = sum(row['total'] for row in project_counts)
+        completed_tasks = sum(row['total'] for row in project_counts if row['completed'])
         
         # Tareas completadas esta semana
-        week_ago = timezone.now() - timedelta(days=7)
-        completed_this_week = Task.objects.filter(
-            completed=True,
-            created_at__gte=week_ago
-        ).count()
+        completed_this_week = sum(row['this_week'] for row in project_counts if row['completed'])
         
         # Proyectos activos (con tareas pendientes)
-        active_projects = Project.objects.filter(
-            tasks__completed=False
-        ).distinct().count()
+        active_projects = len({row['project_id'] for row in project_counts if not row['completed']})
         
-        return Response({
+        return {
             'totalProjects': total_projects,
             'totalTasks': total_tasks,
             'completedTasks': completed_tasks,
-            'pendingTasks': pending_tasks,
+            'pendingTasks': total_tasks - completed_tasks,
             'completedThisWeek': completed_this_week,
             'activeProjects': active_projects
+        }
+
+    @action(detail=False, methods=['get'])
+    @cached_report
+    def dashboard(self, request):
+        """
+        Retorna todos los widgets del dashboard en una sola respuesta, con la
+        misma forma que sus endpoints individuales
+        """
+        project_counts = self._counts_by_project()
+        period_counts = self._counts_by_period()
+        projects = list(Project.objects.alive().values_list('id', 'name'))
+        
+        return Response({
+            'dashboardStats': self._dashboard_stats_data(project_counts, len(projects)),
+            'tasksCompletedByPeriod': self._tasks_completed_by_period_data(period_counts),
+            'projectProgress': self._project_progress_data(project_counts, projects),
+            'priorityDistribution': self._priority_distribution_data(project_counts),
+            'userActivity': self._user_activity_data(period_counts),
         })
+
+    @action(detail=False, methods=['get'])
+    @cached_report
+    def tasks_completed_by_period(self, request):
+        """
+        Retorna datos de tareas completadas por período (meses con tareas completadas)
+        """
+        return Response(self._tasks_completed_by_period_data(self._counts_by_period()))
     
     @action(detail=False, methods=['get'])
+    @cached_report
+    def project_progress(self, request):
+        """
+        Retorna el progreso de los proyectos basado en tareas completadas
+        """
+        projects = Project.objects.alive().values_list('id', 'name')
+        return Response(self._project_progress_data(self._counts_by_project(), projects))
+    
+    @action(detail=False, methods=['get'])
+    @cached_report
+    def priority_distribution(self, request):
+        """
+        Retorna la distribución de tareas por prioridad
+        """
+        return Response(self._priority_distribution_data(self._counts_by_project()))
+    
+    @action(detail=False, methods=['get'])
+    @cached_report
+    def user_activity(self, request):
+        """
+        Retorna la actividad de usuarios (tareas creadas por día de la semana)
+        """
+        return Response(self._user_activity_data(self._counts_by_period()))
+    
+    @action(detail=False, methods=['get'])
+    @cached_report
+    def dashboard_stats(self, request):
+        """
+        Retorna estadísticas generales del dashboard
+        """
+        return Response(self._dashboard_stats_data(self._counts_by_project(), Project.objects.alive().count()))
+    
+    @action(detail=False, methods=['get'])
+    @cached_report
     def tasks_detailed_report(self, request):
         """
         Retorna reporte detallado de tareas para la página de reportes
@@ -210,7 +263,7 @@ class ChartsViewSet(ViewSet):
             filters['priority'] = priority
         
         # Obtener tareas con filtros
-        tasks = Task.objects.filter(**filters).select_related('project', 'assignee')
+        tasks = Task.objects.alive().filter(**filters).select_related('project', 'assignee')
         
         # Separar tareas completadas y pendientes
         completed_tasks = tasks.filter(completed=True)
@@ -223,8 +276,7 @@ class ChartsViewSet(ViewSet):
         
         # Tareas vencidas (pendientes con fecha límite pasada)
         now = timezone.now()
-        overdue_tasks = pending_tasks.filter(due_date__lt=now)
-        total_overdue = overdue_tasks.count()
+        total_overdue = tasks.filter(is_overdue=True).count()
         
         # Tiempo promedio de completado (en días)
         if total_completed > 0:
@@ -243,8 +295,8 @@ class ChartsViewSet(ViewSet):
             priority_tasks = tasks.filter(priority=priority)
             priority_breakdown[priority] = {
                 'completed': priority_tasks.filter(completed=True).count(),
-                'pending': priority_tasks.filter(completed=False, due_date__gte=now).count(),
-                'overdue': priority_tasks.filter(completed=False, due_date__lt=now).count()
+                'pending': priority_tasks.filter(completed=False, is_overdue=False, due_date__isnull=False).count(),
+                'overdue': priority_tasks.filter(is_overdue=True).count()
             }
         
         # Preparar datos de tareas completadas
@@ -293,6 +345,7 @@ class ChartsViewSet(ViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @cached_report
     def temporal_comparison(self, request):
         """
         Retorna datos para comparativas temporales con gráficos
@@ -316,7 +369,7 @@ class ChartsViewSet(ViewSet):
             filters['assignee_id'] = user_id
         
         # Obtener tareas con filtros
-        tasks = Task.objects.filter(**filters).select_related('project', 'assignee')
+        tasks = Task.objects.alive().filter(**filters).select_related('project', 'assignee')
         
         # Generar datos temporales según el período
         if period == 'daily':
@@ -512,15 +565,20 @@ class ChartsViewSet(ViewSet):
         }
     
     @action(detail=False, methods=['get'])
+    @cached_report
     def project_time_report(self, request):
         """
         Retorna reporte detallado de tiempo por proyecto
         """
+        return Response(self.project_time_report_data(request.query_params))
+    
+    def project_time_report_data(self, params):
+        """Datos de project_time_report para los filtros de params (también lo usan los report jobs)"""
         # Obtener parámetros de filtro
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        project_id = request.query_params.get('project_id')
-        user_id = request.query_params.get('user_id')
+        start_date = params.get('start_date')
+        end_date = params.get('end_date')
+        project_id = params.get('project_id')
+        user_id = params.get('user_id')
         
         # Construir filtros base
         filters = {}
@@ -535,7 +593,7 @@ class ChartsViewSet(ViewSet):
         
         # Obtener proyectos con sus tareas
         from projects.models import Project
-        projects = Project.objects.all()
+        projects = Project.objects.alive()
         if project_id:
             projects = projects.filter(id=project_id)
         
@@ -554,11 +612,7 @@ class ChartsViewSet(ViewSet):
             pending_tasks = total_tasks - completed_tasks
             
             # Tareas vencidas
-            now = timezone.now()
-            overdue_tasks = project_tasks.filter(
-                completed=False,
-                due_date__lt=now
-            ).count()
+            overdue_tasks = project_tasks.filter(is_overdue=True).count()
             
             # Tiempo estimado vs real (simulado)
             estimated_hours = total_tasks * 8  # 8 horas por tarea estimado
@@ -629,7 +683,7 @@ class ChartsViewSet(ViewSet):
         total_estimated_hours = sum(p['estimatedHours'] for p in project_data)
         total_actual_hours = sum(p['actualHours'] for p in project_data)
         
-        return Response({
+        return {
             'projects': project_data,
             'summary': {
                 'totalProjects': total_projects,
@@ -638,18 +692,23 @@ class ChartsViewSet(ViewSet):
                 'totalActualHours': total_actual_hours,
                 'efficiency': round((total_actual_hours / total_estimated_hours * 100), 1) if total_estimated_hours > 0 else 0
             }
-        })
+        }
     
     @action(detail=False, methods=['get'])
+    @cached_report
     def user_productivity_report(self, request):
         """
         Retorna reporte detallado de productividad por usuario
         """
+        return Response(self.user_productivity_report_data(request.query_params))
+    
+    def user_productivity_report_data(self, params):
+        """Datos de user_productivity_report para los filtros de params (también lo usan los report jobs)"""
         # Obtener parámetros de filtro
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        project_id = request.query_params.get('project_id')
-        user_id = request.query_params.get('user_id')
+        start_date = params.get('start_date')
+        end_date = params.get('end_date')
+        project_id = params.get('project_id')
+        user_id = params.get('user_id')
         
         # Construir filtros base
         filters = {}
@@ -672,7 +731,7 @@ class ChartsViewSet(ViewSet):
         
         for user in users:
             # Obtener tareas del usuario con filtros
-            user_tasks = Task.objects.filter(
+            user_tasks = Task.objects.alive().filter(
                 assignee=user,
                 **filters
             ).select_related('project')
@@ -684,10 +743,7 @@ class ChartsViewSet(ViewSet):
             
             # Tareas vencidas
             now = timezone.now()
-            overdue_tasks = user_tasks.filter(
-                completed=False,
-                due_date__lt=now
-            ).count()
+            overdue_tasks = user_tasks.filter(is_overdue=True).count()
             
             # Tiempo estimado vs real (simulado)
             estimated_hours = total_tasks * 8  # 8 horas por tarea estimado
@@ -769,7 +825,7 @@ class ChartsViewSet(ViewSet):
         total_actual_hours = sum(u['actualHours'] for u in user_data)
         avg_efficiency = round(sum(u['efficiency'] for u in user_data) / total_users, 1) if total_users > 0 else 0
         
-        return Response({
+        return {
             'users': user_data,
             'summary': {
                 'totalUsers': total_users,
@@ -779,18 +835,23 @@ class ChartsViewSet(ViewSet):
                 'avgEfficiency': avg_efficiency,
                 'activeUsers': len([u for u in user_data if u['totalTasks'] > 0])
             }
-        })
+        }
     
     @action(detail=False, methods=['get'])
+    @cached_report
     def projects_report(self, request):
         """
         Retorna reporte detallado de proyectos
         """
+        return Response(self.projects_report_data(request.query_params))
+    
+    def projects_report_data(self, params):
+        """Datos de projects_report para los filtros de params (también lo usan los report jobs)"""
         # Obtener parámetros de filtro
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        project_id = request.query_params.get('project_id')
-        user_id = request.query_params.get('user_id')
+        start_date = params.get('start_date')
+        end_date = params.get('end_date')
+        project_id = params.get('project_id')
+        user_id = params.get('user_id')
         
         # Construir filtros base
         filters = {}
@@ -805,7 +866,7 @@ class ChartsViewSet(ViewSet):
         
         # Obtener proyectos
         from projects.models import Project
-        projects = Project.objects.all()
+        projects = Project.objects.alive()
         if project_id:
             projects = projects.filter(id=project_id)
         
@@ -825,10 +886,7 @@ class ChartsViewSet(ViewSet):
             
             # Tareas vencidas
             now = timezone.now()
-            overdue_tasks = project_tasks.filter(
-                completed=False,
-                due_date__lt=now
-            ).count()
+            overdue_tasks = project_tasks.filter(is_overdue=True).count()
             
             # Tiempo estimado vs real (simulado)
             estimated_hours = total_tasks * 8  # 8 horas por tarea estimado
@@ -891,27 +949,13 @@ class ChartsViewSet(ViewSet):
             ).count()
             
             # Estado del proyecto basado en progreso y tareas vencidas
-            if progress >= 100:
-                project_status = 'completed'
-                status_label = 'Completado'
-            elif overdue_tasks > 0:
-                project_status = 'at_risk'
-                status_label = 'En Riesgo'
-            elif progress >= 75:
-                project_status = 'on_track'
-                status_label = 'En Progreso'
-            elif progress >= 25:
-                project_status = 'in_progress'
-                status_label = 'En Desarrollo'
-            else:
-                project_status = 'planning'
-                status_label = 'Planificación'
+            status, status_label = project_status(progress, overdue_tasks)
             
             project_data.append({
                 'id': project.id,
                 'name': project.name,
                 'description': project.description or 'Sin descripción',
-                'status': project_status,
+                'status': status,
                 'statusLabel': status_label,
                 'totalTasks': total_tasks,
                 'completedTasks': completed_tasks,
@@ -949,7 +993,7 @@ class ChartsViewSet(ViewSet):
             'planning': len([p for p in project_data if p['status'] == 'planning'])
         }
         
-        return Response({
+        return {
             'projects': project_data,
             'summary': {
                 'totalProjects': total_projects,
@@ -960,4 +1004,173 @@ class ChartsViewSet(ViewSet):
                 'statusCounts': status_counts,
                 'activeProjects': len([p for p in project_data if p['totalTasks'] > 0])
             }
-        })
+        }
+    
+    # Exportaciones de los reportes a CSV/XLSX (?export_format=csv|xlsx). Cada
+    # una exporta el conjunto completo de filas, sin los límites de los
+    # reportes JSON, calculando las métricas por fila en la propia consulta.
+    
+    def _report_filters(self, request, with_priority=False):
+        """Filtros de tareas de los reportes (start_date, end_date, project_id, user_id)"""
+        filters = {}
+        if request.query_params.get('start_date'):
+            filters['created_at__gte'] = request.query_params['start_date']
+        if request.query_params.get('end_date'):
+            filters['created_at__lte'] = request.query_params['end_date']
+        if request.query_params.get('project_id'):
+            filters['project_id'] = request.query_params['project_id']
+        if request.query_params.get('user_id'):
+            filters['assignee_id'] = request.query_params['user_id']
+        if with_priority and request.query_params.get('priority'):
+            filters['priority'] = request.query_params['priority']
+        return filters
+    
+    def _task_count_annotations(self, relation, filters):
+        """Conteos de tareas de un proyecto o usuario (a través de relation) con los filtros del reporte"""
+        now = timezone.now()
+        base = Q(**{f'{relation}__{key}': value for key, value in filters.items()})
+        
+        def count(**conditions):
+            return Count(relation, filter=base & Q(**{f'{relation}__{key}': value for key, value in conditions.items()}))
+        
+        annotations = {
+            'total': count(),
+            'completed_count': count(completed=True),
+            'overdue': count(is_overdue=True),
+            'recent_completed': count(completed=True, created_at__gte=now - timedelta(days=30)),
+            'weekly_completed': count(completed=True, created_at__gte=now - timedelta(days=7)),
+        }
+        for priority, label in Task.PRIORITY_CHOICES:
+            annotations[f'{priority}_total'] = count(priority=priority)
+            annotations[f'{priority}_completed'] = count(priority=priority, completed=True)
+        return annotations
+    
+    def _count_columns(self):
+        columns = ['total', 'completed_count', 'overdue', 'recent_completed', 'weekly_completed']
+        for priority, label in Task.PRIORITY_CHOICES:
+            columns += [f'{priority}_total', f'{priority}_completed']
+        return columns
+    
+    def _metrics_row(self, counts):
+        """Métricas derivadas de los conteos, como en los reportes JSON"""
+        total, completed, overdue, recent_completed, weekly_completed = counts[:5]
+        estimated_hours = total * 8
+        actual_hours = completed * 6
+        row = [
+            total, completed, total - completed, overdue,
+            round((completed / total * 100), 1) if total > 0 else 0,
+            estimated_hours, actual_hours,
+            round(actual_hours / completed, 1) if completed > 0 else 0,
+            round((actual_hours / estimated_hours * 100), 1) if estimated_hours > 0 else 0,
+            recent_completed, weekly_completed,
+        ]
+        priority_counts = counts[5:]
+        for i in range(0, len(priority_counts), 2):
+            row += [priority_counts[i], priority_counts[i + 1], priority_counts[i] - priority_counts[i + 1]]
+        return row
+    
+    def _metrics_header(self):
+        header = [
+            'Tareas', 'Completadas', 'Pendientes', 'Vencidas', 'Progreso (%)',
+            'Horas estimadas', 'Horas reales', 'Horas por tarea', 'Eficiencia (%)',
+            'Completadas 30 días', 'Completadas 7 días',
+        ]
+        for priority, label in Task.PRIORITY_CHOICES:
+            header += [f'{label}: total', f'{label}: completadas', f'{label}: pendientes']
+        return header
+    
+    def _projects_export(self, request, filename, with_status):
+        filters = self._report_filters(request)
+        projects = Project.objects.alive()
+        if 'project_id' in filters:
+            projects = projects.filter(id=filters.pop('project_id'))
+        projects = projects.annotate(**self._task_count_annotations('tasks', filters))
+        rows = queryset_rows(projects, ['id', 'name', 'description', 'created_at'] + self._count_columns())
+        
+        header = ['ID', 'Proyecto', 'Descripción', 'Creado'] + self._metrics_header()
+        if with_status:
+            header += ['Estado']
+        
+        def project_rows():
+            for project_id, name, description, created_at, *counts in rows:
+                row = [project_id, name, description or 'Sin descripción', created_at] + self._metrics_row(counts)
+                if with_status:
+                    progress, overdue = row[8], row[7]
+                    row.append(project_status(progress, overdue)[1])
+                yield row
+        
+        return export_response(request, filename, header, project_rows())
+    
+    @action(detail=False, methods=['get'], url_path='projects_report/export')
+    def projects_report_export(self, request):
+        """
+        Exporta el reporte de proyectos completo (una fila por proyecto)
+        """
+        return self._projects_export(request, 'reporte_proyectos', with_status=True)
+    
+    @action(detail=False, methods=['get'], url_path='project_time_report/export')
+    def project_time_report_export(self, request):
+        """
+        Exporta el reporte de tiempo por proyecto (una fila por proyecto)
+        """
+        return self._projects_export(request, 'reporte_tiempo_proyectos', with_status=False)
+    
+    @action(detail=False, methods=['get'], url_path='user_productivity_report/export')
+    def user_productivity_report_export(self, request):
+        """
+        Exporta el reporte de productividad (una fila por usuario)
+        """
+        filters = self._report_filters(request)
+        users = User.objects.all()
+        if 'assignee_id' in filters:
+            users = users.filter(id=filters.pop('assignee_id'))
+        # Sin las tareas de proyectos que se están borrando (Task.objects.alive())
+        filters['project__deleting_at__isnull'] = True
+        users = users.annotate(**self._task_count_annotations('assigned_tasks', filters))
+        rows = queryset_rows(
+            users, ['id', 'username', 'first_name', 'last_name', 'email', 'last_login'] + self._count_columns()
+        )
+        header = ['ID', 'Usuario', 'Nombre', 'Apellidos', 'Email', 'Último acceso'] + self._metrics_header()
+        
+        def user_rows():
+            for user_id, username, first_name, last_name, email, last_login, *counts in rows:
+                yield [user_id, username, first_name, last_name, email, last_login or 'Nunca'] + self._metrics_row(counts)
+        
+        return export_response(request, 'reporte_productividad', header, user_rows())
+    
+    @action(detail=False, methods=['get'], url_path='tasks_detailed_report/export')
+    def tasks_detailed_report_export(self, request):
+        """
+        Exporta todas las tareas del reporte detallado (sin el límite de 10 por lista)
+        """
+        tasks = Task.objects.alive().filter(**self._report_filters(request, with_priority=True)).order_by('-created_at')
+        rows = queryset_rows(tasks, [
+            'id', 'title', 'project__name', 'assignee__first_name', 'assignee__username',
+            'priority', 'completed', 'created_at', 'due_date',
+        ])
+        header = ['ID', 'Título', 'Proyecto', 'Asignado a', 'Prioridad', 'Estado', 'Creada', 'Fecha límite', 'Días de retraso']
+        now = timezone.now()
+        
+        def task_rows():
+            for task_id, title, project, first_name, username, priority, completed, created_at, due_date in rows:
+                days_overdue = (now - due_date).days if not completed and due_date and due_date < now else 0
+                if completed:
+                    status = 'completed'
+                else:
+                    status = 'overdue' if days_overdue > 0 else 'pending'
+                yield [
+                    task_id, title, project or 'Sin proyecto', first_name or username or 'Sin asignar',
+                    priority, status, created_at, due_date, days_overdue,
+                ]
+        
+        return export_response(request, 'reporte_tareas', header, task_rows())
+    
+    @action(detail=False, methods=['get'], url_path='temporal_comparison/export')
+    def temporal_comparison_export(self, request):
+        """
+        Exporta la comparativa temporal (una fila por período)
+        """
+        data = self.temporal_comparison(request).data
+        header = ['Período', 'Tareas creadas', 'Tareas completadas']
+        rows = zip(data['labels'], data['datasets'][0]['data'], data['datasets'][1]['data'])
+        return export_response(request, f"comparativa_{data['period']}", header, rows)
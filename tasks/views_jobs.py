@@ -0,0 +1,62 @@
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.http import FileResponse
+
+from config.tracing import TracedGenericViewMixin
+from . import jobs
+from .models import ReportJob
+from .serializers import ReportJobSerializer
+
+
+class ReportJobViewSet(TracedGenericViewMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                       mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    ViewSet para los reportes en segundo plano: se encolan con POST, se consulta
+    su estado y se descarga el resultado cuando el worker lo ha calculado
+    """
+    serializer_class = ReportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        """Cada usuario ve sus propios reportes; el superusuario, todos"""
+        if not self.request.user.is_authenticated:
+            return ReportJob.objects.none()
+        if self.request.user.is_superuser:
+            return ReportJob.objects.all()
+        return ReportJob.objects.filter(requested_by=self.request.user)
+    
+    def create(self, request, *args, **kwargs):
+        """Encolar un reporte (202) o devolver uno idéntico ya pendiente (200)"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job, created = jobs.submit(
+            serializer.validated_data['report'],
+            serializer.validated_data.get('params', {}),
+            request.user,
+        )
+        response = Response(
+            self.get_serializer(job).data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+        )
+        response['Location'] = request.build_absolute_uri(f'/api/report-jobs/{job.pk}/')
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def result(self, request, pk=None):
+        """Resultado del reporte: el mismo JSON que el endpoint síncrono"""
+        job = self.get_object()
+        if job.status in ('queued', 'running'):
+            response = Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+            response['Retry-After'] = '2'
+            return response
+        if job.status == 'failed':
+            return Response(
+                {'detail': 'El reporte no se pudo calcular', 'error': job.error.strip().splitlines()[-1:]},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            result = open(jobs.result_path(job), 'rb')
+        except FileNotFoundError:
+            return Response({'detail': 'El resultado ya no está disponible'}, status=status.HTTP_410_GONE)
+        return FileResponse(result, content_type='application/json')
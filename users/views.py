@@ -8,6 +8,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from config.tracing import TracedGenericViewMixin
 from .serializers import UserSerializer, UserCreateSerializer, UserUpdateSerializer
 
 User = get_user_model()
@@ -67,7 +68,7 @@ def register_view(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(TracedGenericViewMixin, viewsets.ModelViewSet):
     """ViewSet para el modelo CustomUser"""
     queryset = User.objects.all()
     serializer_class = UserSerializer